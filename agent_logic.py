@@ -1,6 +1,6 @@
 import os
 from openai import OpenAI
-from duckduckgo_search import DDGS
+from research_cache import search_web
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,10 +16,9 @@ def research_artist(artist_name):
     Searches for recent news or interesting facts about the artist.
     """
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(f"{artist_name} band news 2026", max_results=3))
-            search_data = "\n".join([f"- {r['title']}: {r['body']}" for r in results])
-            return search_data
+        results = search_web(f"{artist_name} band news 2026", max_results=3, namespace="artist")
+        search_data = "\n".join([f"- {r['title']}: {r['body']}" for r in results])
+        return search_data
     except Exception as e:
         print(f"Search error: {e}")
         return "No specific recent data found, but they are trending globally."
@@ -0,0 +1,70 @@
+"""
+asset_cache.py — Registro en memoria de fuentes y templates ya decodificados.
+
+- Fuentes: una instancia de ImageFont por (rutas, tamaño).
+- Templates / fondos: la imagen ya convertida y redimensionada por (ruta, tamaño de canvas, modo).
+  Se entrega siempre una copia, porque los composers dibujan encima.
+- Cada entrada guarda la huella (mtime_ns, tamaño) de los archivos de los que depende;
+  si cambian (p. ej. "Cargar Diseño" en el dashboard reemplaza template.png) se recarga.
+- Thread-safe (lock por registro + lock por clave); el scheduler y Streamlit corren en
+  procesos distintos y cada uno invalida por su cuenta al ver el nuevo mtime.
+"""
+
+import logging
+import threading
+from typing import Callable, Hashable, Iterable
+
+from render_cache import file_fingerprint
+
+logger = logging.getLogger("asset_cache")
+
+
+class AssetCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (stamp, value)
+        self._key_locks = {}
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key: Hashable, paths: Iterable[str], loader: Callable):
+        """
+        Devuelve el valor cacheado para `key` si ninguno de `paths` cambió; si no, llama a
+        `loader()` (una sola vez aunque varios hilos lo pidan a la vez) y lo guarda.
+        """
+        paths = tuple(paths)
+        stamp = tuple(file_fingerprint(p) for p in paths)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+            value = loader()
+            with self._lock:
+                self._entries[key] = (stamp, value)
+            if entry is not None:
+                logger.info(f"asset_cache: recargado {key} (cambió {', '.join(paths)})")
+            return value
+
+    def font(self, loader: Callable, path_primary: str, path_fallback: str, size: int):
+        """Fuente cacheada por (rutas, tamaño). `loader(path_primary, path_fallback, size)`."""
+        key = ("font", loader.__module__, path_primary, path_fallback, size)
+        return self.get(key, (path_primary, path_fallback), lambda: loader(path_primary, path_fallback, size))
+
+    def image(self, key: Hashable, path: str, loader: Callable):
+        """Imagen decodificada/redimensionada por `loader()`; devuelve una copia (o None)."""
+        img = self.get(("image",) + tuple(key), (path,), loader)
+        return img.copy() if img is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Registro compartido por image_composer y video_composer
+assets = AssetCache()
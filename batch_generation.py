@@ -0,0 +1,150 @@
+"""
+batch_generation.py — Genera una tanda de drafts (p. ej. la semana entera) en una sola corrida.
+
+- El pool de productos se trae una sola vez (woocommerce_node.fetch_product_pool) y se
+  filtra una sola vez contra lo ya publicado/en cola (draft_store).
+- Los N posts se reparten en los horarios de publicación (10:00 y 18:00) del rango de
+  fechas, salteando los horarios que ya tienen un draft. El tipo de post (sales/content)
+  sale del calendario de woocommerce_node según el día de cada horario.
+- N productos distintos; si el pool es más chico que N se repiten (con aviso).
+- Investigación, copy y crítica corren para todos en un solo event loop con concurrencia
+  acotada (BATCH_CONCURRENCY) sobre graph.draft_app, que guarda cada uno como draft pendiente.
+
+Uso:
+    python batch_generation.py 14 --start 2026-10-19 --end 2026-10-25
+"""
+
+import os
+import random
+import asyncio
+import argparse
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from draft_store import draft_store
+from nodes.woocommerce_node import (
+    fetch_product_pool,
+    load_weekly_theme,
+    post_type_for,
+    unpublished_products,
+)
+
+AR_TZ = pytz.timezone("America/Argentina/Buenos_Aires")
+
+DRAFT_DIR = "./brain/drafts"
+PUBLISH_SLOTS = ((10, 0), (18, 0))  # Mismos horarios que la generación automática
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def publish_slots(n, date_range=None, now=None, taken=()) -> list:
+    """
+    Próximos `n` horarios libres (datetime naive, hora Argentina) dentro de date_range.
+    date_range = (desde, hasta) como date o "YYYY-MM-DD"; `hasta` puede ser None (sin límite).
+    Puede devolver menos de n si el rango no alcanza. `taken` (timestamps) se compara al minuto.
+    """
+    now = now or datetime.now(AR_TZ).replace(tzinfo=None)
+    start, end = date_range or (now.date(), None)
+    day = max(_as_date(start), now.date())
+    end = _as_date(end) if end else None
+    taken = {int(ts // 60) * 60 for ts in taken}
+
+    slots = []
+    while len(slots) < n and (end is None or day <= end):
+        for hour, minute in PUBLISH_SLOTS:
+            dt = datetime(day.year, day.month, day.day, hour, minute)
+            if dt <= now or int(AR_TZ.localize(dt).timestamp()) in taken:
+                continue
+            slots.append(dt)
+            if len(slots) == n:
+                break
+        day += timedelta(days=1)
+    return slots
+
+
+def assign_products(pool, slots) -> list:
+    """Un producto distinto por horario, con el tipo de post del calendario. Returns [(slot, product)]."""
+    chosen = random.sample(pool, min(len(pool), len(slots)))
+    if len(chosen) < len(slots):
+        print(f"⚠️ [Batch] Solo hay {len(pool)} productos para {len(slots)} horarios: se repiten.")
+        while len(chosen) < len(slots):
+            chosen.extend(random.sample(pool, min(len(pool), len(slots) - len(chosen))))
+
+    assigned = []
+    for slot, product in zip(slots, chosen):
+        product = dict(product)
+        product["post_type"] = post_type_for(slot.weekday())
+        product["target_weekday"] = slot.weekday()
+        assigned.append((slot, product))
+    return assigned
+
+
+async def generate_batch_async(n, date_range=None, concurrency=BATCH_CONCURRENCY) -> list:
+    """Versión async de generate_batch (para llamarla desde un loop ya corriendo)."""
+    from graph import draft_app
+
+    print(f"--- [Batch] Generando {n} drafts (concurrencia {concurrency}) ---")
+    pool = await asyncio.to_thread(fetch_product_pool, load_weekly_theme())
+    if not pool:
+        print("❌ [Batch] No hay productos disponibles.")
+        return []
+    pool = unpublished_products(pool)
+
+    slots = publish_slots(n, date_range, taken=draft_store.scheduled_slots())
+    if len(slots) < n:
+        print(f"⚠️ [Batch] El rango solo tiene {len(slots)} horarios libres.")
+    if not slots:
+        return []
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def generate_one(slot, product):
+        async with semaphore:
+            state = {
+                "selected_product": product,
+                "target_publish_time_iso": slot.isoformat(),
+                "retry_count": 0,
+                "status": "researching",
+            }
+            try:
+                result = await draft_app.ainvoke(state)
+            except Exception as e:
+                print(f"❌ [Batch] Falló {product.get('name')} ({slot:%d/%m %H:%M}): {e}")
+                return None
+            print(f"✅ [Batch] {slot:%d/%m %H:%M} — {product.get('name')}")
+            return os.path.join(DRAFT_DIR, f"draft_{result['id']}.json")
+
+    paths = await asyncio.gather(*(generate_one(slot, product) for slot, product in assign_products(pool, slots)))
+    paths = [p for p in paths if p]
+    print(f"--- [Batch] {len(paths)}/{len(slots)} drafts guardados ---")
+    return paths
+
+
+def generate_batch(n, date_range=None, concurrency=BATCH_CONCURRENCY) -> list:
+    """
+    Genera `n` drafts repartidos en los horarios de date_range. Returns las rutas de los JSON guardados.
+    """
+    return asyncio.run(generate_batch_async(n, date_range, concurrency))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Genera una tanda de drafts repartidos en los horarios de publicación.")
+    parser.add_argument("n", type=int, help="Cantidad de drafts")
+    parser.add_argument("--start", help="Primer día (YYYY-MM-DD). Default: hoy")
+    parser.add_argument("--end", help="Último día (YYYY-MM-DD). Default: sin límite")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    date_range = (args.start or date.today(), args.end) if (args.start or args.end) else None
+    generate_batch(args.n, date_range, args.concurrency)
@@ -0,0 +1,195 @@
+"""
+browser_pool.py — Chromium "caliente" compartido por la automatización de Instagram y Gemini.
+
+- Un solo event loop en un hilo dedicado es dueño de Playwright y de los navegadores
+  (los objetos de Playwright no se pueden usar desde otro loop). Los callers mandan
+  corutinas con run() (síncrono) o submit() (concurrent Future, para asyncio.wrap_future).
+- Un navegador por modo (headless / visible) y un contexto persistente por cuenta
+  ("instagram", "gemini"), creado con la fábrica que pasa cada módulo (sesión, UA, scripts).
+- lease(cuenta) presta una página nueva del contexto de esa cuenta (una a la vez por cuenta)
+  y la cierra al devolverla.
+- Health-check antes de cada préstamo; el contexto se recicla después de
+  BROWSER_POOL_MAX_USES usos, si la página/contexto crashea, si el navegador se desconecta
+  o si el caller lo descarta con discard(cuenta) (sesión vencida, error manejado).
+"""
+
+import os
+import atexit
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("browser_pool")
+
+MAX_USES = int(os.getenv("BROWSER_POOL_MAX_USES", "20"))
+HEALTH_TIMEOUT = 10  # segundos para el chequeo de un contexto reutilizado
+
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-infobars",
+    "--window-size=1280,900",
+]
+
+
+class _AccountSlot:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.context = None
+        self.headless = None
+        self.uses = 0
+        self.discarded = False
+
+
+class BrowserPool:
+    def __init__(self, max_uses: int = MAX_USES):
+        self.max_uses = max_uses
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._playwright = None
+        self._browsers = {}  # headless(bool) -> Browser
+        self._slots = {}  # account -> _AccountSlot
+
+    # --- Hilo / loop dedicado ---
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def submit(self, coro):
+        """Programa `coro` en el loop del pool. Returns concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro, timeout=None):
+        """Versión síncrona de submit() (para callers fuera de asyncio, p. ej. el scheduler)."""
+        return self.submit(coro).result(timeout)
+
+    # --- Navegador ---
+    async def _get_browser(self, headless: bool):
+        browser = self._browsers.get(headless)
+        if browser is not None and browser.is_connected():
+            return browser
+        if browser is not None:
+            logger.warning("[BrowserPool] Chromium desconectado, relanzando...")
+            for slot in self._slots.values():
+                if slot.headless == headless:
+                    slot.context, slot.uses = None, 0
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        logger.info(f"[BrowserPool] Lanzando Chromium (Headless={headless})...")
+        try:
+            browser = await self._playwright.chromium.launch(headless=headless, args=LAUNCH_ARGS)
+        except Exception as e:
+            logger.error(f"[BrowserPool] Fallo al lanzar Chromium: {e}")
+            # Fallback extremo
+            browser = await self._playwright.chromium.launch(headless=True, args=["--no-sandbox"])
+        self._browsers[headless] = browser
+        return browser
+
+    # --- Contextos por cuenta ---
+    async def _close_context(self, slot: _AccountSlot, reason: str):
+        if slot.context is not None:
+            logger.info(f"[BrowserPool] Reciclando contexto ({reason})")
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        slot.context, slot.uses = None, 0
+
+    async def _healthy(self, slot: _AccountSlot) -> bool:
+        try:
+            await asyncio.wait_for(slot.context.cookies(), HEALTH_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def _get_context(self, slot: _AccountSlot, new_context, headless: bool):
+        browser = await self._get_browser(headless)
+        if slot.context is not None:
+            if slot.headless != headless:
+                await self._close_context(slot, "cambio de modo headless")
+            elif slot.uses >= self.max_uses:
+                await self._close_context(slot, f"{slot.uses} usos")
+            elif not await self._healthy(slot):
+                await self._close_context(slot, "health-check fallido")
+        if slot.context is None:
+            slot.context = await new_context(browser)
+            slot.headless = headless
+        return slot.context
+
+    @asynccontextmanager
+    async def lease(self, account: str, new_context, headless: bool = True):
+        """
+        Presta una página del contexto persistente de `account`.
+        `new_context(browser)` es una corutina que crea el contexto (sesión, viewport, UA, scripts).
+        """
+        slot = self._slots.setdefault(account, _AccountSlot())
+        async with slot.lock:
+            context = await self._get_context(slot, new_context, headless)
+            page = await context.new_page()
+            crashed = []
+            page.on("crash", lambda _page: crashed.append(True))
+            slot.uses += 1
+            slot.discarded = False
+            try:
+                yield page
+            except Exception:
+                crashed.append(True)
+                raise
+            finally:
+                try:
+                    if not page.is_closed():
+                        await page.close()
+                except Exception:
+                    crashed.append(True)
+                if crashed:
+                    await self._close_context(slot, "crash de página")
+                elif slot.discarded:
+                    await self._close_context(slot, "descartado por el caller")
+                slot.discarded = False
+
+    def discard(self, account: str):
+        """
+        Recicla el contexto de `account` al devolver el préstamo en curso. Para errores que el
+        caller maneja sin lanzar (sesión vencida, excepción capturada): el próximo lease arma
+        un contexto nuevo y vuelve a leer la sesión.
+        """
+        slot = self._slots.get(account)
+        if slot is not None:
+            slot.discarded = True
+
+    async def _shutdown(self):
+        for slot in self._slots.values():
+            await self._close_context(slot, "apagado")
+        for browser in self._browsers.values():
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._browsers.clear()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self, timeout=30):
+        if self._loop is None:
+            return
+        try:
+            self.run(self._shutdown(), timeout)
+        except Exception as e:
+            logger.debug(f"[BrowserPool] Error al apagar: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+# Pool compartido del proceso
+browser_pool = BrowserPool()
+atexit.register(browser_pool.shutdown)
@@ -0,0 +1,201 @@
+"""
+caption_index.py — Índice local de captions publicados para detectar duplicados en el critic.
+
+- Cada caption se embebe con el MiniLM local (embedding_service), sin llamadas a OpenAI.
+- En disco: brain/caption_index.npz con los vectores normalizados en float16 (~0.75 KB por post)
+  + ids (nombre del JSON en brain/archive) + product_id. Escritura atómica (tmp + os.replace).
+- En memoria: copia float32 para la búsqueda. Fuerza bruta con NumPy: un producto
+  matriz-vector (similitud coseno); a 10k posts son unos pocos ms, no hace falta HNSW.
+- add() al publicar (scheduler_service). sync_archive() agrega lo que esté en brain/archive
+  y falte en el índice (bootstrap inicial y publicaciones de otro proceso); solo lista la
+  carpeta si cambió su mtime, igual que draft_store.
+- Si otro proceso reescribió el archivo, se recarga antes de consultar (mtime).
+
+    python caption_index.py --rebuild     # reconstruye desde brain/archive
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from typing import Optional
+
+import numpy as np
+
+from embedding_service import embedding_service
+
+logger = logging.getLogger("caption_index")
+
+INDEX_PATH = os.path.join("brain", "caption_index.npz")
+ARCHIVE_DIR = os.path.join("brain", "archive")
+SIMILARITY_THRESHOLD = float(os.getenv("CAPTION_SIMILARITY_THRESHOLD", "0.92"))
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _as_int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class CaptionIndex:
+    def __init__(self, path: str = INDEX_PATH, archive_dir: str = ARCHIVE_DIR):
+        self.path = path
+        self.archive_dir = archive_dir
+        self._lock = threading.RLock()
+        self._ids = []
+        self._product_ids = []
+        self._id_set = set()
+        self._vectors = None  # float16 (lo que se guarda)
+        self._matrix = None  # float32 (lo que se consulta)
+        self._file_mtime = None
+        self._archive_mtime = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._reload_if_changed()
+            return len(self._ids)
+
+    # --- Persistencia ---
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._file_mtime:
+            return
+        with np.load(self.path, allow_pickle=False) as data:
+            self._vectors = data["vectors"].astype(np.float16)
+            self._ids = data["ids"].tolist()
+            self._product_ids = data["product_ids"].tolist()
+        self._id_set = set(self._ids)
+        self._matrix = self._vectors.astype(np.float32)
+        self._file_mtime = mtime
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, vectors=self._vectors, ids=np.array(self._ids, dtype=str),
+                     product_ids=np.array(self._product_ids, dtype=np.int64))
+        os.replace(tmp, self.path)
+        self._file_mtime = os.stat(self.path).st_mtime_ns
+
+    # --- Escritura ---
+    def add_vectors(self, ids: list, vectors, product_ids: Optional[list] = None):
+        """Agrega vectores ya calculados (los ids repetidos se ignoran) y guarda."""
+        with self._lock:
+            self._reload_if_changed()
+            product_ids = product_ids or [0] * len(ids)
+            keep = [i for i, cid in enumerate(ids) if cid not in self._id_set]
+            if not keep:
+                return 0
+            vectors = _normalize(vectors)[keep].astype(np.float16)
+            self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+            self._matrix = self._vectors.astype(np.float32)
+            for i in keep:
+                self._ids.append(ids[i])
+                self._product_ids.append(_as_int(product_ids[i]))
+                self._id_set.add(ids[i])
+            self._save()
+            return len(keep)
+
+    def add_many(self, items: list) -> int:
+        """items: [(id, caption, product_id)]. Embebe en un solo lote."""
+        items = [(cid, caption, pid) for cid, caption, pid in items if caption and cid not in self._id_set]
+        if not items:
+            return 0
+        vectors = embedding_service.encode([caption for _, caption, _ in items])
+        return self.add_vectors([cid for cid, _, _ in items], vectors, [pid for _, _, pid in items])
+
+    def add(self, caption_id: str, caption: str, product_id=None) -> bool:
+        return self.add_many([(caption_id, caption, product_id)]) > 0
+
+    def sync_archive(self) -> int:
+        """Indexa los JSON de brain/archive que falten. Returns cuántos agregó."""
+        try:
+            dir_mtime = os.stat(self.archive_dir).st_mtime_ns
+        except OSError:
+            return 0
+        if dir_mtime == self._archive_mtime:
+            return 0
+        with self._lock:
+            self._reload_if_changed()
+            missing = []
+            with os.scandir(self.archive_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".json") and entry.name not in self._id_set:
+                        missing.append(entry.path)
+            items = []
+            for path in missing:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        draft = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                product = draft.get("selected_product") or {}
+                items.append((os.path.basename(path), draft.get("draft_caption", ""), product.get("id")))
+            added = self.add_many(items)
+            self._archive_mtime = dir_mtime
+        if added:
+            logger.info(f"[CaptionIndex] {added} captions del archivo indexados ({len(self._ids)} en total)")
+        return added
+
+    def rebuild(self) -> int:
+        with self._lock:
+            self._ids, self._product_ids, self._id_set = [], [], set()
+            self._vectors = self._matrix = None
+            self._archive_mtime = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self._file_mtime = None
+        return self.sync_archive()
+
+    # --- Consulta ---
+    def search_vector(self, vector, k: int = 1) -> list:
+        """[(similitud coseno, id, product_id)] de los k más parecidos."""
+        with self._lock:
+            self._reload_if_changed()
+            if self._matrix is None or not len(self._ids):
+                return []
+            scores = self._matrix @ _normalize([vector])[0]
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self._ids[i], self._product_ids[i]) for i in top]
+
+    def nearest(self, caption: str):
+        """(similitud, id, product_id) del caption publicado más parecido, o None si el índice está vacío."""
+        self.sync_archive()
+        if not caption or not len(self):
+            return None
+        matches = self.search_vector(embedding_service.encode([caption])[0], k=1)
+        return matches[0] if matches else None
+
+
+caption_index = CaptionIndex()
+
+
+if __name__ == "__main__":
+    # Fix Windows console encoding
+    if sys.platform == "win32":
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description="Índice de captions publicados")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstruir desde brain/archive")
+    args = parser.parse_args()
+
+    started = time.time()
+    added = caption_index.rebuild() if args.rebuild else caption_index.sync_archive()
+    print(f"{added} captions agregados en {time.time() - started:.1f}s; {len(caption_index)} en el índice")
@@ -1,11 +1,11 @@
 import streamlit as st
 import os
 import json
-import glob
+import re
 from datetime import datetime
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from product_record import ProductRecord
+from llm_cache import llm_cache, prompt_template
 
 # Load environment
 load_dotenv()
@@ -43,21 +43,8 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-def refine_post(current_caption, user_instruction, product_data={}, weekly_theme=""):
-    """
-    AI Assistant that handles CAPTION refinement. (Strictly text-only).
-    """
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
-    
-    p_name = product_data.get("name", "Producto")
-    p_desc = product_data.get("description", "")[:400]
-    p_price = product_data.get("price", "")
-    
-    theme_inst = ""
-    if weekly_theme:
-        theme_inst = f"Estamos en la semana de: '{weekly_theme}'. Si tiene sentido, alineá el cambio con este tema."
-
-    prompt = ChatPromptTemplate.from_template("""
+# Template de refine_post: se compila una sola vez por proceso (prompt_template lo memoiza)
+REFINE_PROMPT = """
     Sos un **Redactor Senior y Especialista en Copywriting** para BIT Comunicaciones (Santa Fe).
     Tu misión UNICA es procesar una ORDEN del usuario para mejorar el TEXTO (Caption) de un post.
     
@@ -86,21 +73,15 @@ def refine_post(current_caption, user_instruction, product_data={}, weekly_theme
        }}
 
     SOLO respondé el JSON. Sin explicaciones.
-    """)
-    
-    chain = prompt | llm
-    
-    response = chain.invoke({
-        "current_caption": current_caption, 
-        "user_instruction": user_instruction,
-        "p_name": p_name,
-        "p_desc": p_desc,
-        "p_price": p_price,
-        "theme_inst": theme_inst
-    })
-    
+    """
+
+_CAPTION_START_RE = re.compile(r'"caption"\s*:\s*"')
+_JSON_STRING_RE = re.compile(r'((?:[^"\\]|\\.)*)"', re.S)
+_PARTIAL_ESCAPE_RE = re.compile(r'(\\u[dD][89abAB][0-9a-fA-F]{2})?(\\u[0-9a-fA-F]{0,3})?$')
+
+def _parse_refine(raw, current_caption):
     try:
-        raw = response.content.strip()
+        raw = raw.strip()
         if "```json" in raw:
             raw = raw.split("```json")[1].split("```")[0].strip()
         elif "```" in raw:
@@ -109,11 +90,89 @@ def refine_post(current_caption, user_instruction, product_data={}, weekly_theme
     except:
         return {"caption": current_caption}
 
+def _partial_caption(raw):
+    """Texto del caption ya decodificado a partir del JSON {"caption": "..."} que va llegando."""
+    start = _CAPTION_START_RE.search(raw)
+    if not start:
+        return ""
+    body = raw[start.end():]
+    done = _JSON_STRING_RE.match(body)
+    if done:
+        body = done.group(1)
+    else:
+        # No cortar un escape a la mitad (\ suelto, \u incompleto, mitad de un par surrogate)
+        if (len(body) - len(body.rstrip("\\"))) % 2:
+            body = body[:-1]
+        body = _PARTIAL_ESCAPE_RE.sub("", body)
+    try:
+        return json.loads(f'"{body}"')
+    except ValueError:
+        return ""
+
+def refine_post_stream(current_caption, user_instruction, product_data={}, weekly_theme="", result=None):
+    """
+    AI Assistant that handles CAPTION refinement. (Strictly text-only).
+    Streaming: yields the new caption text as the model writes it (for st.write_stream);
+    when done, the parsed JSON ({"caption": ...}) is stored in `result`.
+    """
+    p_name = product_data.get("name", "Producto")
+    # Drafts only carry the slim product; the full description comes from the local catalog mirror
+    # (no WooCommerce fallback: it would delay the first streamed token)
+    record = ProductRecord.from_dict(product_data)
+    p_desc = (record.local_description() or record.short_description)[:400]
+    p_price = product_data.get("price", "")
+    
+    theme_inst = ""
+    if weekly_theme:
+        theme_inst = f"Estamos en la semana de: '{weekly_theme}'. Si tiene sentido, alineá el cambio con este tema."
+
+    # LangChain / OpenAI se cargan recién en la primera edición con IA (llm_cache es lazy).
+    # Sin caché: si el usuario repite la orden es porque quiere otra versión, no la misma muestra.
+    chunks = llm_cache.stream("refine_post", prompt_template(REFINE_PROMPT), {
+        "current_caption": current_caption, 
+        "user_instruction": user_instruction,
+        "p_name": p_name,
+        "p_desc": p_desc,
+        "p_price": p_price,
+        "theme_inst": theme_inst
+    }, model="gpt-4o-mini", temperature=0.7, use_cache=False)
+    
+    raw, sent = "", 0
+    for chunk in chunks:
+        raw += chunk
+        text = _partial_caption(raw)
+        if len(text) > sent:
+            yield text[sent:]
+            sent = len(text)
+
+    if result is not None:
+        result.update(_parse_refine(raw, current_caption))
+
+def refine_post(current_caption, user_instruction, product_data={}, weekly_theme=""):
+    """
+    AI Assistant that handles CAPTION refinement. (Strictly text-only).
+    """
+    result = {}
+    for _ in refine_post_stream(current_caption, user_instruction, product_data, weekly_theme, result=result):
+        pass
+    return result
+
 # Create required directories
 for d in ["./brain/drafts", "./brain/previews", "./brain/reels", "./brand_assets"]:
     os.makedirs(d, exist_ok=True)
 draft_dir = "./brain/drafts"
 
+# Etiquetas del progreso de "Generar Nuevo Post" (nodos de graph.app)
+GENERATION_STEPS = {
+    "woocommerce": "Producto elegido",
+    "researcher": "Investigación lista",
+    "copywriter": "Caption escrito",
+    "critic": "Revisión de calidad",
+    "repair": "Caption corregido",
+    "approval": "Borrador guardado",
+    "publisher": "Publicado",
+}
+
 # Helper functions for callbacks
 def select_draft(filepath):
     st.session_state["selected_file"] = filepath
@@ -132,8 +191,22 @@ with st.sidebar:
             st.write("Analizando productos...")
             os.environ["DASHBOARD_MODE"] = "true"
             try:
-                from graph import app
-                app.invoke({"messages": [], "status": "start"})
+                from graph import stream_generation
+                # Progreso en vivo: cada nodo que termina y los tokens del caption mientras se escribe
+                live, text = st.empty(), ""
+                for kind, node, data in stream_generation():
+                    if kind == "token":
+                        text += data
+                        live.markdown(text)
+                        continue
+                    live.empty()
+                    text = ""
+                    label = GENERATION_STEPS.get(node, node)
+                    if node == "critic" and data.get("critique_feedback") not in (None, "APPROVED"):
+                        label += f" — {data['critique_feedback']}"
+                    st.write(f"✅ {label}")
+                    status.update(label=f"🤖 {label}...")
+                    live = st.empty()
                 status.update(label="¡Post generado!", state="complete", expanded=False)
                 st.rerun()
             except Exception as e:
@@ -176,9 +249,11 @@ with st.sidebar:
             st.success("¡Diseño actualizado!")
     
     st.markdown("### 📂 Posts Generados")
-    # File selector
-    draft_files = glob.glob(os.path.join(draft_dir, "*.json"))
-    draft_files.sort(key=os.path.getmtime, reverse=True)
+    # File selector (draft index: no need to open every JSON just to list it)
+    from draft_store import draft_store
+    draft_rows = draft_store.list_drafts()
+    draft_files = [path for path, _ in draft_rows]
+    draft_names = {path: name for path, name in draft_rows}
     
     # Initialize selection
     if "selected_file" not in st.session_state and draft_files:
@@ -188,12 +263,10 @@ with st.sidebar:
     
     def format_draft_name(filepath):
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                product_name = data.get("selected_product", {}).get("name", "Producto")
-                timestamp = os.path.basename(filepath).split('_')[1]
-                hhmm = os.path.basename(filepath).split('_')[2][:4]
-                return f"📝 {timestamp[6:8]}/{timestamp[4:6]} {hhmm[:2]}:{hhmm[2:]} - {product_name[:20]}"
+            product_name = draft_names.get(filepath) or "Producto"
+            timestamp = os.path.basename(filepath).split('_')[1]
+            hhmm = os.path.basename(filepath).split('_')[2][:4]
+            return f"📝 {timestamp[6:8]}/{timestamp[4:6]} {hhmm[:2]}:{hhmm[2:]} - {product_name[:20]}"
         except:
             return os.path.basename(filepath)
 
@@ -299,6 +372,8 @@ if selected_file:
                 draft["publish_time_iso"] = new_dt.isoformat()
                 with open(selected_file, "w", encoding="utf-8") as f:
                     json.dump(draft, f, indent=2, ensure_ascii=False)
+                from publish_scheduler import request_wakeup
+                request_wakeup()
                 st.toast(f"Horario actualizado", icon="⏰")
 
         except Exception as e:
@@ -482,18 +557,12 @@ if selected_file:
                             img_to_upload.append(custom_img)
                         else:
                             # Intentar bajar la imagen del producto si no es local
-                            from PIL import Image
-                            import requests
-                            import io
+                            from http_fetch import fetch_to_file
                             imgs = product.get("images", [])
                             if imgs:
-                                try:
-                                    resp = requests.get(imgs[0], timeout=10)
-                                    p_img_path = os.path.join("brain", "temp_product_img.jpg")
-                                    with open(p_img_path, "wb") as f:
-                                        f.write(resp.content)
+                                p_img_path = fetch_to_file(imgs[0], os.path.join("brain", "temp_product_img.jpg"), timeout=10)
+                                if p_img_path:
                                     img_to_upload.append(p_img_path)
-                                except: pass
                         
                         if "Sora" in provider:
                             prompt_video = f"Crea un video corporativo para: {product.get('name', 'Producto')}. Mensaje: {current_caption_val}. Estilo: Profesional."
@@ -565,8 +634,12 @@ if selected_file:
                     current_text = draft.get("draft_caption", "")
                     w_theme = st.session_state.get("weekly_theme", "")
                     
-                    with st.spinner("🤖 Escribiendo..."):
-                         ai_res = refine_post(current_text, user_prompt, product_data=product, weekly_theme=w_theme)
+                    # Streaming: el caption nuevo se ve mientras el modelo lo escribe
+                    ai_res = {}
+                    with chat_container:
+                        st.chat_message("user").write(user_prompt)
+                        st.chat_message("assistant").write_stream(
+                            refine_post_stream(current_text, user_prompt, product_data=product, weekly_theme=w_theme, result=ai_res))
                     
                     # Update draft
                     draft["draft_caption"] = ai_res.get("caption", current_text)
@@ -630,6 +703,8 @@ if selected_file:
             draft["approval_status"] = "approved"
             with open(selected_file, "w", encoding="utf-8") as f:
                 json.dump(draft, f, indent=2, ensure_ascii=False)
+            from publish_scheduler import request_wakeup
+            request_wakeup()
             
             # --- EXTERNAL SAVE LOGIC ---
             try:
@@ -0,0 +1,224 @@
+"""
+draft_store.py — Índice SQLite de los drafts JSON (brain/drafts, brain/archive, brain/errors).
+
+Los JSON siguen siendo la fuente de verdad (el dashboard y los nodos los escriben como
+siempre); este módulo mantiene un índice con columnas consultables para no tener que
+abrir y parsear cada archivo en cada pasada:
+
+    status, publish_time_iso, due_ts, product_id, format, product_name
+
+- sync() solo re-parsea archivos cuyo (mtime_ns, tamaño) cambió y borra los que ya no existen.
+- archive/ y errors/ solo reciben archivos nuevos (os.rename): si el mtime del directorio
+  no cambió, ni siquiera se listan. Así el costo no crece con el histórico publicado.
+- Las consultas usan índices: (folder, status, due_ts) y (product_id).
+- WAL + una conexión por llamada: seguro entre el scheduler y el proceso de Streamlit.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Optional
+
+import pytz
+
+logger = logging.getLogger("draft_store")
+
+AR_TZ = pytz.timezone("America/Argentina/Buenos_Aires")
+
+BRAIN_DIR = "./brain"
+FOLDERS = ("drafts", "archive", "errors")
+# Carpetas a las que solo se agregan/quitan archivos (nunca se editan en el lugar)
+APPEND_ONLY_FOLDERS = ("archive", "errors")
+INVALID_TIME_SORT = 9999999999  # Mismo fallback que usaba el scheduler para fechas inválidas
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS drafts (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    status TEXT,
+    publish_time_iso TEXT,
+    due_ts REAL,
+    sort_ts REAL,
+    product_id TEXT,
+    product_name TEXT,
+    format TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_drafts_due ON drafts (folder, status, due_ts);
+CREATE INDEX IF NOT EXISTS idx_drafts_product ON drafts (product_id);
+CREATE INDEX IF NOT EXISTS idx_drafts_mtime ON drafts (folder, mtime_ns);
+CREATE TABLE IF NOT EXISTS folder_state (
+    folder TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+def parse_publish_time(publish_time_iso) -> Optional[float]:
+    """Timestamp de publish_time_iso (naive = hora Argentina). None si falta o es inválido."""
+    if not publish_time_iso or not isinstance(publish_time_iso, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(publish_time_iso)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = AR_TZ.localize(dt)
+    return dt.timestamp()
+
+
+def _row_from_file(path: str, folder: str, st: os.stat_result) -> tuple:
+    status = publish_time_iso = product_id = product_name = fmt = None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            status = data.get("approval_status")
+            publish_time_iso = data.get("publish_time_iso")
+            fmt = data.get("preferred_format")
+            product = data.get("selected_product") or {}
+            if isinstance(product, dict):
+                product_id = str(product["id"]) if product.get("id") else None
+                product_name = product.get("name")
+    except (OSError, ValueError) as e:
+        logger.warning(f"draft_store: no se pudo leer '{path}': {e}")
+        status = "unreadable"
+
+    # Sin hora = publicar ya (orden por mtime); hora inválida = publicar ya, al final de la cola
+    due_ts = parse_publish_time(publish_time_iso)
+    if due_ts is not None:
+        sort_ts = due_ts
+    elif publish_time_iso:
+        due_ts, sort_ts = 0, INVALID_TIME_SORT
+    else:
+        due_ts, sort_ts = 0, st.st_mtime
+    if not isinstance(publish_time_iso, str):
+        publish_time_iso = None
+    return (path, folder, st.st_mtime_ns, st.st_size, status, publish_time_iso,
+            due_ts, sort_ts, product_id, product_name, fmt)
+
+
+class DraftStore:
+    def __init__(self, brain_dir: str = BRAIN_DIR, db_path: Optional[str] = None):
+        self.brain_dir = brain_dir
+        self.db_path = db_path or os.path.join(brain_dir, "draft_index.db")
+        self._sync_lock = threading.Lock()
+        self._ready = False
+
+    def folder_path(self, folder: str) -> str:
+        return os.path.join(self.brain_dir, folder)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._ready = True
+        return conn
+
+    def _sync_folder(self, conn: sqlite3.Connection, folder: str):
+        folder_dir = self.folder_path(folder)
+        try:
+            dir_mtime = os.stat(folder_dir).st_mtime_ns
+        except OSError:
+            conn.execute("DELETE FROM drafts WHERE folder = ?", (folder,))
+            conn.execute("DELETE FROM folder_state WHERE folder = ?", (folder,))
+            return
+
+        if folder in APPEND_ONLY_FOLDERS:
+            row = conn.execute("SELECT mtime_ns FROM folder_state WHERE folder = ?", (folder,)).fetchone()
+            if row and row[0] == dir_mtime:
+                return
+
+        known = {p: (m, s) for p, m, s in conn.execute(
+            "SELECT path, mtime_ns, size FROM drafts WHERE folder = ?", (folder,))}
+        seen = set()
+        changed = []
+        with os.scandir(folder_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                path = os.path.join(folder_dir, entry.name)
+                seen.add(path)
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if known.get(path) != (st.st_mtime_ns, st.st_size):
+                    changed.append(_row_from_file(path, folder, st))
+
+        gone = [(p,) for p in known if p not in seen]
+        if changed:
+            conn.executemany("INSERT OR REPLACE INTO drafts VALUES (?,?,?,?,?,?,?,?,?,?,?)", changed)
+        if gone:
+            conn.executemany("DELETE FROM drafts WHERE path = ?", gone)
+        conn.execute("INSERT OR REPLACE INTO folder_state VALUES (?, ?)", (folder, dir_mtime))
+
+    def sync(self, folders=FOLDERS):
+        """Pone el índice al día con lo que hay en disco."""
+        with self._sync_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    for folder in folders:
+                        self._sync_folder(conn, folder)
+            finally:
+                conn.close()
+
+    def _query(self, sql: str, params=()) -> list:
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    # --- Consultas ---
+    def due_approved_drafts(self, now_ts: float) -> list:
+        """Drafts aprobados cuya hora ya llegó, del más urgente al menos: [(path, publish_time_iso)]."""
+        self.sync(("drafts",))
+        return self._query(
+            "SELECT path, publish_time_iso FROM drafts "
+            "WHERE folder = 'drafts' AND status = 'approved' AND due_ts <= ? ORDER BY sort_ts",
+            (now_ts,))
+
+    def approved_queue(self) -> list:
+        """Todos los drafts aprobados: [(due_ts, sort_ts, path, format)] (para el heap del publish_scheduler)."""
+        self.sync(("drafts",))
+        return self._query(
+            "SELECT due_ts, sort_ts, path, format FROM drafts WHERE folder = 'drafts' AND status = 'approved'")
+
+    def next_approved_due_ts(self, now_ts: float) -> Optional[float]:
+        """Próximo horario programado (posterior a now_ts) entre los drafts aprobados, o None."""
+        self.sync(("drafts",))
+        row = self._query(
+            "SELECT MIN(due_ts) FROM drafts WHERE folder = 'drafts' AND status = 'approved' AND due_ts > ?",
+            (now_ts,))
+        return row[0][0] if row else None
+
+    def scheduled_slots(self) -> set:
+        """Timestamps de publicación ya tomados por drafts pendientes o aprobados, redondeados al minuto."""
+        self.sync(("drafts",))
+        return {int(r[0] // 60) * 60 for r in self._query(
+            "SELECT DISTINCT due_ts FROM drafts WHERE folder = 'drafts' AND due_ts > 0")}
+
+    def published_product_ids(self) -> set:
+        """IDs de producto ya publicados (archive) o en cola (drafts)."""
+        self.sync(("drafts", "archive"))
+        return {r[0] for r in self._query(
+            "SELECT DISTINCT product_id FROM drafts "
+            "WHERE folder IN ('drafts', 'archive') AND product_id IS NOT NULL")}
+
+    def list_drafts(self) -> list:
+        """Drafts pendientes para el dashboard, el más reciente primero: [(path, product_name)]."""
+        self.sync(("drafts",))
+        return self._query(
+            "SELECT path, product_name FROM drafts WHERE folder = 'drafts' ORDER BY mtime_ns DESC")
+
+
+# Índice compartido (rutas relativas a la raíz del proyecto, como el resto de brain/)
+draft_store = DraftStore()
@@ -0,0 +1,148 @@
+"""
+embedding_service.py — Modelo de embeddings local (all-MiniLM-L6-v2) cargado una sola vez por proceso.
+
+- Carga lazy (la primera llamada a encode) o anticipada en un thread con warm_up() (main_server),
+  así la primera investigación no paga los segundos de carga del modelo.
+- Micro-batching: las llamadas concurrentes a encode() (p. ej. las búsquedas en paralelo de
+  research_product_async) se juntan en un solo model.encode() en un thread worker: lo que llega
+  mientras el modelo está ocupado sale en el próximo lote (hasta EMBED_BATCH_SIZE textos).
+  EMBED_BATCH_WAIT_MS > 0 además espera ese tiempo a que lleguen más (por defecto no: una
+  consulta sola no paga latencia extra).
+- rag_system le pasa a ChromaDB los vectores ya calculados (query_embeddings / embeddings=)
+  en lugar de crear un SentenceTransformerEmbeddingFunction por consulta.
+- token_spans() / count_tokens() usan el tokenizer del propio modelo (el chunker de rag_system
+  corta por tokens reales, no por caracteres); sin tokenizer rápido se aproxima por palabras.
+- Mismo modelo y misma normalización que SentenceTransformerEmbeddingFunction, así que los
+  vectores ya guardados en brain/rag_knowledge siguen siendo compatibles.
+"""
+
+import os
+import re
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger("embedding_service")
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "0"))
+
+_WORD_RE = re.compile(r"\S+")
+
+
+class EmbeddingService:
+    def __init__(self, model_name: str = MODEL_NAME, batch_size: int = BATCH_SIZE,
+                 batch_wait_ms: float = BATCH_WAIT_MS):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats = {"load_ms": None, "batches": 0, "texts": 0, "encode_ms": 0.0}
+
+    # --- Modelo ---
+    def _load(self):
+        if self._model is not None:
+            return self._model
+        with self._load_lock:
+            if self._model is None:
+                started = time.time()
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+                self._stats["load_ms"] = (time.time() - started) * 1000
+                logger.info(f"[Embeddings] {self.model_name} cargado en {self._stats['load_ms']:.0f}ms")
+        return self._model
+
+    def is_ready(self) -> bool:
+        return self._model is not None
+
+    def warm_up(self):
+        """Carga el modelo en un thread daemon (no bloquea al caller)."""
+        def run():
+            try:
+                self._load()
+            except Exception as e:
+                logger.warning(f"[Embeddings] No se pudo cargar {self.model_name}: {e}")
+        threading.Thread(target=run, name="embedding-warmup", daemon=True).start()
+
+    @property
+    def max_seq_length(self) -> int:
+        """Tokens que el modelo mira de verdad (el resto se trunca al embeber)."""
+        return getattr(self._load(), "max_seq_length", None) or 256
+
+    # --- Tokens ---
+    def token_spans(self, text: str) -> list:
+        """[(inicio, fin)] en caracteres de cada token del modelo (sin tokens especiales)."""
+        tokenizer = getattr(self._load(), "tokenizer", None)
+        if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+            encoding = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+            return [tuple(span) for span in encoding["offset_mapping"]]
+        return [m.span() for m in _WORD_RE.finditer(text)]
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.token_spans(text))
+
+    # --- Micro-batching ---
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+                self._worker.start()
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        count = len(batch[0][0])
+        deadline = time.time() + self.batch_wait
+        while count < self.batch_size:
+            remaining = deadline - time.time()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            count += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                model = self._load()
+                texts = [t for texts, _ in batch for t in texts]
+                started = time.time()
+                vectors = model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True).tolist()
+                self._stats["batches"] += 1
+                self._stats["texts"] += len(texts)
+                self._stats["encode_ms"] += (time.time() - started) * 1000
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            pos = 0
+            for texts, future in batch:
+                future.set_result(vectors[pos:pos + len(texts)])
+                pos += len(texts)
+
+    def encode(self, texts) -> list:
+        """Embeddings (listas de floats) de `texts`, en el mismo orden."""
+        texts = list(texts)
+        if not texts:
+            return []
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def stats(self) -> dict:
+        st = dict(self._stats)
+        st["avg_batch"] = st["texts"] / st["batches"] if st["batches"] else 0.0
+        return st
+
+
+embedding_service = EmbeddingService()
@@ -3,13 +3,28 @@ import time
 import asyncio
 import base64
 import json as _json
-from playwright.async_api import async_playwright
+from browser_pool import browser_pool
 import logging
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Los videos pesan varios MB: timeout generoso, pero nunca infinito
+VIDEO_DOWNLOAD_TIMEOUT = 120
+
+
+def _download_video(src, final_path, timeout=VIDEO_DOWNLOAD_TIMEOUT):
+    """Descarga bloqueante por streaming; se llama con asyncio.to_thread para no frenar el loop de browser_pool."""
+    import requests
+    with requests.get(src, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        with open(final_path, 'wb') as f:
+            for chunk in r.iter_content(chunk_size=1 << 16):
+                f.write(chunk)
+    return final_path
+
+
 class GeminiClient:
     def __init__(self, session_path=None):
         # Configuración de rutas absolutas para robustez
@@ -17,60 +32,44 @@ class GeminiClient:
         self.session_path = session_path or os.path.join(ROOT_DIR, "brain", "gemini_session.json")
         self.url = "https://gemini.google.com/app"
 
+    async def _new_context(self, browser):
+        """Contexto persistente de la cuenta de Gemini (lo crea/recicla browser_pool)."""
+        # Argumentos para evadir detección de bots en Railway
+        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+        
+        # Load session
+        session_b64 = os.getenv("GEMINI_SESSION_B64")
+        if session_b64:
+            logger.info("Cargando sesión desde variable de entorno (modo Railway)...")
+            try:
+                # Playwright acepta el storage_state como dict: sin archivo temporal
+                session_data = _json.loads(base64.b64decode(session_b64).decode())
+            except Exception as e:
+                raise RuntimeError(f"Error decodificando GEMINI_SESSION_B64: {e}")
+            return await browser.new_context(storage_state=session_data, user_agent=user_agent)
+        if os.path.exists(self.session_path):
+            return await browser.new_context(storage_state=self.session_path, user_agent=user_agent)
+        raise RuntimeError(f"Sesión no encontrada en {self.session_path}. Ejecuta tools/gemini_login.py")
+
     async def generate_video(self, image_paths, prompt_text, output_dir="brain/reels"):
         """
         Automates Gemini to generate a video from images using Nano Banana.
+        Runs on browser_pool's loop, reusing the warm Chromium and the Gemini context.
         """
+        try:
+            return await asyncio.wrap_future(browser_pool.submit(self._generate_video(image_paths, prompt_text, output_dir)))
+        except Exception as e:
+            logger.error(f"Error en automatización de Gemini: {e}")
+            return None
+
+    async def _generate_video(self, image_paths, prompt_text, output_dir):
         os.makedirs(output_dir, exist_ok=True)
         
-        async with async_playwright() as p:
-            # Detectamos si estamos en Railway (via variable de entorno con contenido)
-            session_env = os.getenv("GEMINI_SESSION_B64")
-            is_railway = session_env is not None and len(session_env.strip()) > 0
-            
-            launch_args = {}
-            launch_args["headless"] = True if is_railway else False
-            
-            # Argumentos para evadir detección de bots en Railway
-            user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            
-            launch_args["args"] = [
-                "--disable-blink-features=AutomationControlled",
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                f"--user-agent={user_agent}"
-            ]
-            
-            try:
-                logger.info("Lanzando navegador Chromium...")
-                browser = await p.chromium.launch(**launch_args)
-            except Exception as le:
-                logger.error(f"Fallo al lanzar Chromium: {le}")
-                # Fallback extremo
-                browser = await p.chromium.launch(headless=True, args=["--no-sandbox"])
-            
-            # Load session
-            session_b64 = os.getenv("GEMINI_SESSION_B64")
-            if session_b64:
-                logger.info("Cargando sesión desde variable de entorno (modo Railway)...")
-                try:
-                    session_data = _json.loads(base64.b64decode(session_b64).decode())
-                    # Escribir temporalmente para que Playwright pueda leerlo
-                    import tempfile
-                    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp:
-                        _json.dump(session_data, tmp)
-                        tmp_path = tmp.name
-                    context = await browser.new_context(storage_state=tmp_path)
-                    os.unlink(tmp_path)
-                except Exception as e:
-                    logger.error(f"Error decodificando GEMINI_SESSION_B64: {e}")
-                    return None
-            elif os.path.exists(self.session_path):
-                context = await browser.new_context(storage_state=self.session_path)
-            else:
-                logger.error(f"Sesión no encontrada en {self.session_path}. Ejecuta tools/gemini_login.py")
-                return None
-            page = await context.new_page()
+        # Detectamos si estamos en Railway (via variable de entorno con contenido)
+        session_env = os.getenv("GEMINI_SESSION_B64")
+        is_railway = session_env is not None and len(session_env.strip()) > 0
+        
+        async with browser_pool.lease("gemini", self._new_context, headless=is_railway) as page:
             # Fijar un tamaño de ventana estándar
             await page.set_viewport_size({"width": 1280, "height": 800})
             
@@ -149,6 +148,7 @@ class GeminiClient:
                 
                 if not abs_paths:
                     logger.error(f"¡CRÍTICO! Ninguna imagen encontrada: {image_paths}")
+                    browser_pool.discard("gemini")
                     return None
 
                 logger.info(f"❤️ LATIDO: Iniciando subida de {len(abs_paths)} fotos...")
@@ -246,6 +246,8 @@ class GeminiClient:
                     except: pass
                 else:
                     logger.error("No se encontró área de texto.")
+                    # Síntoma típico de sesión vencida: el próximo lease rearma el contexto y relee la sesión
+                    browser_pool.discard("gemini")
                     return None
 
                 # 4. Esperar generación y descargar
@@ -290,11 +292,7 @@ class GeminiClient:
                                     final_path = os.path.join(output_dir, f"video_{int(time.time())}.mp4")
                                     
                                     if src.startswith('http'):
-                                        import requests
-                                        r = requests.get(src, timeout=30)
-                                        with open(final_path, 'wb') as f:
-                                            f.write(r.content)
-                                        return final_path
+                                        return await asyncio.to_thread(_download_video, src, final_path)
                                     elif src.startswith('blob'):
                                         # Descarga de BLOB via JS
                                         logger.info("⬇️ Descargando video BLOB mediante inyección JS...")
@@ -365,10 +363,7 @@ class GeminiClient:
                                         final_path = os.path.join(output_dir, f"video_iframe_{int(time.time())}.mp4")
                                         
                                         if src.startswith('http'):
-                                            import requests
-                                            r = requests.get(src)
-                                            with open(final_path, 'wb') as f: f.write(r.content)
-                                            return final_path
+                                            return await asyncio.to_thread(_download_video, src, final_path)
                                         elif src.startswith('blob'):
                                             # Evaluar en el frame
                                             js_code = "async (s) => { const r = await fetch(s); const b = await r.blob(); return new Promise(res => { const rd = new FileReader(); rd.onloadend = () => res(rd.result); rd.readAsDataURL(b); }); }"
@@ -387,14 +382,15 @@ class GeminiClient:
                     await page.screenshot(path="brain/gemini_error.png", full_page=True)
                     logger.info("📸 Captura de error guardada en brain/gemini_error.png")
                 except: pass
+                browser_pool.discard("gemini")
                 return None
 
             except Exception as e:
                 logger.error(f"Error en automatización de Gemini: {e}")
-                await page.screenshot(path="brain/gemini_crash.png")
+                try: await page.screenshot(path="brain/gemini_crash.png")
+                except: pass
+                browser_pool.discard("gemini")
                 return None
-            finally:
-                await browser.close()
 
 # Singleton para uso fácil
 client = GeminiClient()
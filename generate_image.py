@@ -1,13 +1,21 @@
 import os
-import requests
-from openai import OpenAI
 from dotenv import load_dotenv
 from PIL import Image, ImageDraw, ImageFont
 import io
+from http_fetch import fetch_bytes
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_client = None
+
+
+def _get_client():
+    """Cliente de OpenAI creado al primer uso (importar este módulo no carga el SDK)."""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
 
 def generate_product_image(product, custom_prompt=None):
     """
@@ -48,7 +56,7 @@ DO include: Clean professional look, subtle green/blue color accents in backgrou
         print(f"🎨 Generating image with DALL-E 3...")
         print(f"   Prompt: {prompt[:100]}...")
         
-        response = client.images.generate(
+        response = _get_client().images.generate(
             model="dall-e-3",
             prompt=prompt,
             size="1024x1024",
@@ -78,10 +86,11 @@ def add_brand_overlay(image_url, output_path="./temp_branded_image.jpg"):
     """
     try:
         # Download image
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
+        image_data = fetch_bytes(image_url, timeout=30)
+        if image_data is None:
+            raise ValueError(f"No se pudo descargar {image_url}")
         
-        img = Image.open(io.BytesIO(response.content))
+        img = Image.open(io.BytesIO(image_data))
         
         # Convert to RGB if necessary
         if img.mode != 'RGB':
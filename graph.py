@@ -1,40 +1,57 @@
 import os
+import asyncio
 import operator
 from typing import TypedDict, Annotated, List
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
-# Imported Nodes
-from nodes.woocommerce_node import woocommerce_intake
-from nodes.researcher_node import research_product
-from nodes.copywriter_node import draft_content
-from nodes.critic_node import quality_control
-from nodes.approval_node import approval_node, should_publish
-from nodes.publisher_node import publish_to_instagram
+# Tope de generaciones simultáneas por llamada (cada una son varias llamadas a LLM, DDG y WooCommerce)
+MAX_GENERATIONS = int(os.getenv("AGENT_MAX_GENERATIONS", "4"))
+
+# Imported Nodes (sync para app.invoke, *_async para app.ainvoke)
+from nodes.woocommerce_node import woocommerce_intake, woocommerce_intake_async, pick_products
+from nodes.researcher_node import research_product, research_product_async
+from nodes.copywriter_node import draft_content, draft_content_async
+from nodes.critic_node import quality_control, quality_control_async
+from nodes.repair_node import repair_draft, repair_draft_async, check_repair
+from nodes.approval_node import approval_node, approval_node_async, should_publish
+from nodes.approval_node import save_draft_node, save_draft_node_async
+from nodes.publisher_node import publish_to_instagram, publish_to_instagram_async
 
 # Define the State of the Graph
 class AgentState(TypedDict):
     status: str
-    recent_products: List[dict]
+    recent_products: List[int]  # IDs del pool candidato
     selected_product: dict
     research_summary: str
     draft_caption: str
     image_prompt: str
     image_url: str
     publish_time_iso: str  # For smart scheduling
+    target_publish_time_iso: str  # Horario ya asignado (batch_generation)
+    id: str
     critique_feedback: str
+    critique_issues: List[str]  # Códigos del critic (nodes.critic_node) que arregla repair
     retry_count: int
     approval_status: str  # 'approved', 'rejected', 'cancelled'
 
 # Initialize the Graph
 workflow = StateGraph(AgentState)
 
+# Nodes (each one runs its sync function on invoke and its coroutine on ainvoke)
+researcher_runnable = RunnableLambda(research_product, afunc=research_product_async)
+copywriter_runnable = RunnableLambda(draft_content, afunc=draft_content_async)
+critic_runnable = RunnableLambda(quality_control, afunc=quality_control_async)
+repair_runnable = RunnableLambda(repair_draft, afunc=repair_draft_async)
+
 # Add Nodes
-workflow.add_node("woocommerce", woocommerce_intake)
-workflow.add_node("researcher", research_product)
-workflow.add_node("copywriter", draft_content)
-workflow.add_node("critic", quality_control)
-workflow.add_node("approval", approval_node)
-workflow.add_node("publisher", publish_to_instagram)
+workflow.add_node("woocommerce", RunnableLambda(woocommerce_intake, afunc=woocommerce_intake_async))
+workflow.add_node("researcher", researcher_runnable)
+workflow.add_node("copywriter", copywriter_runnable)
+workflow.add_node("critic", critic_runnable)
+workflow.add_node("repair", repair_runnable)
+workflow.add_node("approval", RunnableLambda(approval_node, afunc=approval_node_async))
+workflow.add_node("publisher", RunnableLambda(publish_to_instagram, afunc=publish_to_instagram_async))
 
 # Define Edges (The Flow)
 workflow.set_entry_point("woocommerce")
@@ -52,13 +69,24 @@ def check_critique(state):
         print("⚠️ Max retries reached. Sending to manual approval.")
         return "approval"
     else:
-        return "copywriter"
+        # Arreglo puntual del caption (reglas + edición con LLM solo si hace falta), no un re-draft
+        return "repair"
 
 workflow.add_conditional_edges(
     "critic",
     check_critique,
     {
         "approval": "approval",
+        "repair": "repair"
+    }
+)
+
+# Repair vuelve al critic para verificar; si no pudo arreglar nada, re-draft completo
+workflow.add_conditional_edges(
+    "repair",
+    check_repair,
+    {
+        "critic": "critic",
         "copywriter": "copywriter"
     }
 )
@@ -78,3 +106,66 @@ workflow.add_edge("publisher", END)
 
 # Compile
 app = workflow.compile()
+
+# Draft-only graph for batch_generation: the product and publish time come preset,
+# and the result is always saved as a pending draft (no WooCommerce, no publishing).
+draft_workflow = StateGraph(AgentState)
+draft_workflow.add_node("researcher", researcher_runnable)
+draft_workflow.add_node("copywriter", copywriter_runnable)
+draft_workflow.add_node("critic", critic_runnable)
+draft_workflow.add_node("repair", repair_runnable)
+draft_workflow.add_node("save", RunnableLambda(save_draft_node, afunc=save_draft_node_async))
+draft_workflow.set_entry_point("researcher")
+draft_workflow.add_edge("researcher", "copywriter")
+draft_workflow.add_edge("copywriter", "critic")
+draft_workflow.add_conditional_edges(
+    "critic",
+    check_critique,
+    {
+        "approval": "save",
+        "repair": "repair"
+    }
+)
+draft_workflow.add_conditional_edges(
+    "repair",
+    check_repair,
+    {
+        "critic": "critic",
+        "copywriter": "copywriter"
+    }
+)
+draft_workflow.add_edge("save", END)
+draft_app = draft_workflow.compile()
+
+
+async def run_generations(count=1, inputs=None):
+    """
+    Corre `count` generaciones (máximo MAX_GENERATIONS) en paralelo en el mismo event loop (app.ainvoke).
+    Cada una recibe un producto distinto elegido de antemano (pick_products).
+    Returns una lista con el estado final de cada una, o la excepción si falló.
+    """
+    count = max(1, min(count, MAX_GENERATIONS))
+    inputs = inputs or {"messages": [], "status": "start"}
+    products = await asyncio.to_thread(pick_products, count) if count > 1 else []
+    runs = [dict(inputs, selected_product=p) for p in products] or [dict(inputs) for _ in range(count)]
+    return await asyncio.gather(
+        *(app.ainvoke(run) for run in runs),
+        return_exceptions=True,
+    )
+
+
+def stream_generation(inputs=None, graph=None):
+    """
+    Corre una generación con app.stream (o `graph`) y va avisando el progreso:
+    yields ("node", nombre, update) cuando termina cada nodo y ("token", nombre, texto)
+    por cada chunk del LLM (copywriter / repair) mientras escribe.
+    """
+    inputs = inputs or {"messages": [], "status": "start"}
+    for mode, chunk in (graph or app).stream(dict(inputs), stream_mode=["updates", "messages"]):
+        if mode == "messages":
+            message, metadata = chunk
+            if message.content:
+                yield "token", metadata.get("langgraph_node", ""), message.content
+        else:
+            for node, update in chunk.items():
+                yield "node", node, update or {}
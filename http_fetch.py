@@ -0,0 +1,197 @@
+"""
+http_fetch.py — Capa única de descarga HTTP para imágenes de producto (WooCommerce, DALL-E, etc.).
+
+- Una sola `requests.Session` con pool de conexiones y reintentos para todo el proceso.
+- Blob store direccionado por contenido en brain/blob_store (SHA-256 del contenido),
+  con evicción LRU por tamaño (FETCH_STORE_MAX_MB).
+- Revalidación con GET condicional (ETag / Last-Modified): un 304 reutiliza el blob local.
+  Dentro de FETCH_MAX_AGE_SECONDS ni siquiera se consulta la red.
+- Requests concurrentes a la misma URL se colapsan en una sola descarga (single-flight).
+"""
+
+import io
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from render_cache import RenderCache
+
+logger = logging.getLogger("http_fetch")
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(_BASE_DIR, "brain", "blob_store")
+META_DIR = os.path.join(STORE_DIR, "meta")
+
+# Antigüedad (s) durante la cual un blob se usa sin revalidar contra el servidor
+FETCH_MAX_AGE_SECONDS = int(os.getenv("FETCH_MAX_AGE_SECONDS", "600"))
+USER_AGENT = "Mozilla/5.0"
+
+blob_store = RenderCache(
+    os.path.join(STORE_DIR, "blobs"),
+    max_bytes=int(os.getenv("FETCH_STORE_MAX_MB", "500")) * 1024 * 1024,
+    ext=".blob",
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Sesión HTTP compartida (pool de conexiones keep-alive + reintentos en 5xx)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504], allowed_methods=["GET"])
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers.update({"User-Agent": USER_AGENT})
+                _session = s
+    return _session
+
+
+@contextmanager
+def _single_flight(url: str):
+    """Un solo fetch por URL a la vez; los demás esperan y luego leen el blob fresco."""
+    with _inflight_lock:
+        entry = _inflight.setdefault(url, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _inflight_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _inflight.pop(url, None)
+
+
+def _meta_path(url: str) -> str:
+    return os.path.join(META_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _load_meta(url: str) -> dict:
+    try:
+        with open(_meta_path(url), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta if meta.get("url") == url else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta(url: str, meta: dict):
+    try:
+        os.makedirs(META_DIR, exist_ok=True)
+        path = _meta_path(url)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"http_fetch: no se pudo guardar metadata de '{url}': {e}")
+
+
+def _read_blob(meta: dict) -> Optional[bytes]:
+    sha = meta.get("sha256")
+    if not sha:
+        return None
+    path = blob_store.get(sha)
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def fetch_bytes(url: str, timeout: float = 15, max_age: Optional[float] = None) -> Optional[bytes]:
+    """
+    Devuelve el contenido de `url` usando el blob store local cuando es posible.
+    Si la red falla pero hay una copia local, se devuelve la copia (aunque esté vencida).
+    Returns None si no se pudo obtener.
+    """
+    if not url or not isinstance(url, str):
+        return None
+    max_age = FETCH_MAX_AGE_SECONDS if max_age is None else max_age
+
+    with _single_flight(url):
+        meta = _load_meta(url)
+        cached = _read_blob(meta)
+        if cached is not None and time.time() - meta.get("fetched_at", 0) < max_age:
+            return cached
+
+        headers = {}
+        if cached is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            resp = get_session().get(url, headers=headers, timeout=timeout)
+            if resp.status_code == 304 and cached is not None:
+                meta["fetched_at"] = time.time()
+                _save_meta(url, meta)
+                return cached
+            resp.raise_for_status()
+            data = resp.content
+        except Exception as e:
+            if cached is not None:
+                logger.warning(f"http_fetch: fallo de red para '{url}' ({e}), usando copia local")
+                return cached
+            logger.error(f"http_fetch: no se pudo descargar '{url}': {e}")
+            return None
+
+        sha = hashlib.sha256(data).hexdigest()
+        blob_store.put_bytes(sha, data)
+        _save_meta(url, {
+            "url": url,
+            "sha256": sha,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "content_type": resp.headers.get("Content-Type"),
+            "fetched_at": time.time(),
+        })
+        return data
+
+
+def fetch_image(url: str, timeout: float = 15, mode: str = "RGBA"):
+    """Descarga (o reutiliza) una imagen y la devuelve como PIL.Image en `mode`, o None."""
+    data = fetch_bytes(url, timeout=timeout)
+    if data is None:
+        return None
+    try:
+        from PIL import Image
+        return Image.open(io.BytesIO(data)).convert(mode)
+    except Exception as e:
+        logger.error(f"http_fetch: contenido de '{url}' no es una imagen válida: {e}")
+        return None
+
+
+def fetch_to_file(url: str, path: str, timeout: float = 15) -> Optional[str]:
+    """Escribe el contenido de `url` en `path`. Returns la ruta o None."""
+    data = fetch_bytes(url, timeout=timeout)
+    if data is None:
+        return None
+    try:
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+    except OSError as e:
+        logger.error(f"http_fetch: no se pudo escribir '{path}': {e}")
+        return None
@@ -1,9 +1,11 @@
-from PIL import Image, ImageDraw, ImageFont, ImageChops
-import requests
-import io
+from PIL import Image, ImageDraw, ImageFont
 import os
 from dotenv import load_dotenv
 import textwrap
+from render_cache import post_cache, make_key, file_fingerprint, file_digest
+from http_fetch import fetch_image
+from asset_cache import assets
+import image_processing
 
 load_dotenv()
 
@@ -20,53 +22,80 @@ ROBOT_PATH = os.path.join(ASSETS_DIR, "bit_robot.png")
 FONT_BOLD_PATH = os.path.join(BASE_DIR, "Montserrat-Bold.ttf")
 FONT_REG_PATH = os.path.join(BASE_DIR, "Montserrat-Regular.ttf")
 ARIAL_BOLD_PATH = os.path.join(BASE_DIR, "arialbd.ttf")
+TEMPLATE_PATH = os.path.join(ASSETS_DIR, "template.png")
+
+# Bump when the layout changes so old cached posts are not reused
+LAYOUT_VERSION = "V37"
 
 def download_image(url):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        return Image.open(io.BytesIO(response.content)).convert("RGBA")
-    except: return None
+    return fetch_image(url, timeout=15)
 
-def get_font(path_primary, path_fallback, size):
+def _load_font(path_primary, path_fallback, size):
     try:
         if os.path.exists(path_primary): return ImageFont.truetype(path_primary, size)
     except:
         try: return ImageFont.truetype(path_fallback, size)
         except: return ImageFont.load_default()
 
+def get_font(path_primary, path_fallback, size):
+    return assets.font(_load_font, path_primary, path_fallback, size)
+
+def _load_template(mode):
+    return Image.open(TEMPLATE_PATH).convert(mode).resize(CANVAS_SIZE)
+
+def _load_robot():
+    r_img = Image.open(ROBOT_PATH).convert("RGBA")
+    ratio = 240 / r_img.height
+    return r_img.resize((int(r_img.width * ratio), 240), Image.Resampling.LANCZOS)
+
 def trim_whitespace(img):
     try:
-        bg = Image.new(img.mode, img.size, img.getpixel((0,0)))
-        diff = ImageChops.difference(img, bg)
-        diff = ImageChops.add(diff, diff, 2.0, -100)
-        bbox = diff.getbbox()
-        if bbox: return img.crop(bbox)
+        return image_processing.prepare_product(img, remove_bg=False, trim="corner", max_side=0)
     except: pass
     return img
 
 def remove_white_background(img, threshold=240):
     """V37: Balanced threshold 240."""
-    img = img.convert("RGBA")
-    grayscale = img.convert("L")
-    mask = grayscale.point(lambda x: 0 if x > threshold else 255)
-    img.putalpha(mask)
-    return img
+    return image_processing.remove_white_background(img, threshold)
+
+def _post_cache_key(product, override_image_path, remove_bg, design_settings):
+    """Everything that changes the composed pixels: image source, texts, design, assets."""
+    if override_image_path and os.path.exists(override_image_path):
+        image_source = ["override", file_digest(override_image_path)]
+    else:
+        image_source = ["url", (product.get("images") or [None])[0]]
+    return make_key(
+        LAYOUT_VERSION,
+        image_processing.PRODUCT_MAX_SIDE,
+        image_source,
+        product.get("name", "Producto"),
+        bool(remove_bg),
+        design_settings,
+        file_fingerprint(TEMPLATE_PATH),
+        file_fingerprint(ROBOT_PATH),
+    )
 
 def create_social_post(product, output_path="temp_post.png", override_image_path=None, remove_bg=False, design_settings={}):
-    """Layout V37: The Final Stable Pro Layout."""
+    """Layout V37: The Final Stable Pro Layout.
+
+    Results are cached on disk (render_cache.post_cache): a hit returns the cached PNG path
+    right away instead of re-downloading, re-processing and re-encoding.
+    """
+    cache_key = _post_cache_key(product, override_image_path, remove_bg, design_settings)
+    cached_path = post_cache.get(cache_key)
+    if cached_path:
+        return cached_path
+
     title_text = design_settings.get("title_override") or product.get("name", "Producto")
     product_scale = design_settings.get("product_scale", 1.0)
     show_logo = design_settings.get("show_logo", True)
     
-    TEMPLATE_PATH = os.path.join(ASSETS_DIR, "template.png")
     using_template = False
     
     if os.path.exists(TEMPLATE_PATH):
         try:
-            img = Image.open(TEMPLATE_PATH).convert("RGBA" if show_logo else "RGB")
-            img = img.resize(CANVAS_SIZE)
+            mode = "RGBA" if show_logo else "RGB"
+            img = assets.image((TEMPLATE_PATH, CANVAS_SIZE, mode), TEMPLATE_PATH, lambda: _load_template(mode))
             using_template = True
         except:
             img = Image.new('RGB', CANVAS_SIZE, WHITE)
@@ -99,9 +128,7 @@ def create_social_post(product, output_path="temp_post.png", override_image_path
     # --- MASCOT (No double robot if using template) ---
     if show_logo and not using_template and os.path.exists(ROBOT_PATH):
         try:
-            r_img = Image.open(ROBOT_PATH).convert("RGBA")
-            ratio = 240 / r_img.height
-            r_img = r_img.resize((int(r_img.width * ratio), 240), Image.Resampling.LANCZOS)
+            r_img = assets.image((ROBOT_PATH, 240), ROBOT_PATH, _load_robot)
             img.paste(r_img, (50, 830), r_img)
         except: pass
 
@@ -115,19 +142,10 @@ def create_social_post(product, output_path="temp_post.png", override_image_path
         if imgs: p_img = download_image(imgs[0])
 
     if p_img:
-        # 1. Transparency (Sweet spot 240)
-        if remove_bg: p_img = remove_white_background(p_img, threshold=240)
-        
-        # 2. LOGO REMOVAL (Surgical Corner-Mask BEFORE trimming)
-        if not show_logo:
-            p_draw = ImageDraw.Draw(p_img)
-            pw, ph = p_img.size
-            # Corner mask (Bottom-Left) for BIT robot
-            mw, mh = int(pw * 0.28), int(ph * 0.22)
-            p_draw.rectangle([(0, ph-mh), (mw, ph)], fill=(0,0,0,0) if p_img.mode == "RGBA" else WHITE)
-            
-        # 3. Trim (Maximizes product size)
-        p_img = trim_whitespace(p_img)
+        # Transparency (Sweet spot 240) -> Corner logo mask BEFORE trimming -> Trim -> Downscale
+        p_img = image_processing.prepare_product(
+            p_img, remove_bg=remove_bg, hide_logo=not show_logo, trim="corner",
+            threshold=240, softness=design_settings.get("bg_softness", 0))
         
         # Scale & Position
         max_w, max_h = 980 * product_scale, 650 * product_scale
@@ -141,4 +159,8 @@ def create_social_post(product, output_path="temp_post.png", override_image_path
         img.paste(p_img, (pos_x, int(pos_y)), p_img if p_img.mode == "RGBA" else None)
 
     img.save(output_path, quality=95)
+
+    # Don't cache a post whose product image failed to download
+    if p_img is not None or not product.get("images"):
+        post_cache.put(cache_key, output_path)
     return output_path
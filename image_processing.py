@@ -0,0 +1,129 @@
+"""
+image_processing.py — Pre-procesado de fotos de producto (NumPy), compartido por
+image_composer (posts) y video_composer (reels).
+
+- Quitar fondo blanco = una sola consulta a una LUT de 256 entradas sobre la luminancia,
+  con borde suave opcional (`softness`).
+- El recorte (trim) sale de la máscara alpha ya calculada, sin otra pasada sobre la imagen RGBA.
+- Originales gigantes de WooCommerce (3000px+) se reducen hacia PRODUCT_MAX_SIDE después del
+  recorte: ningún layout usa más de ~1550px de ancho.
+"""
+
+import os
+import logging
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+logger = logging.getLogger("image_processing")
+
+# Lado máximo del original antes de procesar (post: 980*1.5, reel: 920*1.12*1.5 ≈ 1545)
+PRODUCT_MAX_SIDE = int(os.getenv("PRODUCT_MAX_SIDE", "1600"))
+BG_THRESHOLD = 240 # V37 sweet spot
+TRIM_TOLERANCE = 100 # Diferencia mínima contra la esquina (trim="corner")
+
+
+def limit_size(img: Image.Image, max_side: int = PRODUCT_MAX_SIDE) -> Image.Image:
+    """
+    Reduce la imagen por un factor entero (Image.reduce, promedio por bloques) mientras
+    su lado mayor siga siendo al menos el doble de `max_side`. Nunca baja de `max_side`:
+    el resize final de cada composer hace el ajuste fino con LANCZOS.
+    """
+    if max_side <= 0:
+        return img
+    factor = max(img.size) // max_side
+    if factor < 2:
+        return img
+    return img.reduce(factor)
+
+
+@lru_cache(maxsize=16)
+def _alpha_lut(threshold: int, softness: int) -> tuple:
+    """
+    LUT luminancia -> alpha. Con softness=0 es el corte duro V37 (>threshold = transparente);
+    con softness>0 los grises en (threshold-softness, threshold] quedan semitransparentes.
+    """
+    softness = max(0, int(softness))
+    levels = np.arange(256, dtype=np.int32)
+    lut = (threshold + 1 - levels) * 255 // (softness + 1)
+    return tuple(np.clip(lut, 0, 255).tolist())
+
+
+def luminance_mask(img: Image.Image, threshold: int = BG_THRESHOLD, softness: int = 0) -> Image.Image:
+    """Máscara alpha (modo "L") que vuelve transparente el fondo blanco. Una sola pasada de LUT en C."""
+    return img.convert("L").point(list(_alpha_lut(int(threshold), int(softness))))
+
+
+def mask_bbox(mask: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box (left, upper, right, lower) de los píxeles no nulos de la máscara, o None."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    top, bottom = int(rows[0]), int(rows[-1]) + 1
+    cols = np.flatnonzero(mask[top:bottom].any(axis=0))
+    return (int(cols[0]), top, int(cols[-1]) + 1, bottom)
+
+
+def corner_diff_bbox(mask: np.ndarray, tolerance: int = TRIM_TOLERANCE) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding box de lo que difiere del valor de la esquina (0,0) en más de `tolerance`.
+    Equivale al difference/add(-100)/getbbox original de image_composer: en Pillow>=10
+    getbbox() de una imagen RGBA solo mira alpha, así que se aplica sobre la máscara alpha.
+    """
+    corner = int(mask[0, 0])
+    hi, lo = min(corner + tolerance, 255), max(corner - tolerance, 0)
+    return mask_bbox((mask > hi) | (mask < lo))
+
+
+def remove_white_background(img: Image.Image, threshold: int = BG_THRESHOLD, softness: int = 0) -> Image.Image:
+    """Versión suelta del paso de fondo: RGBA con el blanco (>threshold) transparente."""
+    img = img.convert("RGBA")
+    img.putalpha(luminance_mask(img, threshold, softness))
+    return img
+
+
+def logo_corner_box(size) -> Tuple[int, int, int, int]:
+    """Zona inferior izquierda donde suele estar el robot de BIT en las fotos."""
+    pw, ph = size
+    mw, mh = int(pw * 0.28), int(ph * 0.22)
+    return (0, ph - mh, mw, ph)
+
+
+def prepare_product(img: Image.Image, remove_bg: bool = True, hide_logo: bool = False,
+                    trim: str = "alpha", threshold: int = BG_THRESHOLD, softness: int = 0,
+                    max_side: int = PRODUCT_MAX_SIDE) -> Image.Image:
+    """
+    Pipeline completo: máscara -> tapar logo -> recortar -> reducir.
+
+    La máscara y el bbox se calculan sobre un canal de 1 byte/píxel del original;
+    solo el recorte resultante recibe el alpha y se reduce.
+
+    trim: "alpha"  = bbox de lo no transparente (trim_whitespace de video_composer)
+          "corner" = bbox por diferencia de alpha con la esquina (trim_whitespace de image_composer)
+          None     = sin recorte
+    """
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+
+    mask = luminance_mask(img, threshold, softness) if remove_bg else img.getchannel("A")
+    logo = logo_corner_box(img.size) if hide_logo else None
+    if logo:
+        x0, y0, x1, y1 = logo
+        ImageDraw.Draw(mask).rectangle([(x0, y0), (x1, y1)], fill=0)
+
+    bbox = None
+    if trim:
+        alpha = np.asarray(mask)
+        bbox = corner_diff_bbox(alpha) if trim == "corner" else mask_bbox(alpha)
+    if not bbox:
+        bbox = (0, 0) + img.size
+
+    left, top = bbox[:2]
+    out = img.crop(bbox)
+    if remove_bg:
+        out.putalpha(mask.crop(bbox))
+    if logo:
+        ImageDraw.Draw(out).rectangle([(x0 - left, y0 - top), (x1 - left, y1 - top)], fill=(0, 0, 0, 0))
+    return limit_size(out, max_side)
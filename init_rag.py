@@ -1,10 +1,17 @@
 """
 Script de inicialización del sistema RAG.
-Ejecutar una sola vez para cargar la base de conocimientos técnicos.
+Carga la base de conocimientos técnicos; se puede volver a correr después de editar un
+archivo (solo se re-embeben las secciones que cambiaron).
+
+    python init_rag.py            # sincroniza y prueba
+    python init_rag.py --watch    # sincroniza cada vez que cambia un .txt de brain/knowledge_base
 """
 # -*- coding: utf-8 -*-
 import sys
 import os
+import glob
+import time
+import argparse
 
 # Fix Windows console encoding
 if sys.platform == "win32":
@@ -12,48 +19,92 @@ if sys.platform == "win32":
 
 from rag_system import initialize_rag_system, load_knowledge_base
 
+KNOWLEDGE_DIR = "./brain/knowledge_base"
+
+
+def _snapshot(knowledge_dir):
+    """(mtime_ns, tamaño) de cada .txt: detecta ediciones, altas y bajas."""
+    snap = {}
+    for path in glob.glob(os.path.join(knowledge_dir, "*.txt")):
+        try:
+            st = os.stat(path)
+            snap[path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+    return snap
+
+
+def watch(collection, knowledge_dir=KNOWLEDGE_DIR, interval=2.0):
+    """Polling de la carpeta; cada cambio dispara una sync incremental."""
+    print(f"\n[WATCH] Observando {knowledge_dir} (Ctrl+C para salir)...")
+    last = _snapshot(knowledge_dir)
+    try:
+        while True:
+            time.sleep(interval)
+            snap = _snapshot(knowledge_dir)
+            if snap != last:
+                changed = sorted(os.path.basename(p) for p in set(snap) ^ set(last)
+                                 | {p for p in snap if p in last and snap[p] != last[p]})
+                print(f"\n[WATCH] Cambios en: {', '.join(changed)}")
+                load_knowledge_base(collection, knowledge_dir)
+                last = snap
+    except KeyboardInterrupt:
+        print("\n[WATCH] Detenido.")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inicializa / sincroniza la base de conocimientos RAG")
+    parser.add_argument("--watch", action="store_true", help="Quedarse observando la carpeta y sincronizar los cambios")
+    parser.add_argument("--interval", type=float, default=2.0, help="Segundos entre chequeos en modo --watch")
+    parser.add_argument("--skip-tests", action="store_true", help="No correr las queries de prueba")
+    args = parser.parse_args()
+
     print("=" * 80)
     print("INICIALIZACION DEL SISTEMA RAG")
     print("BIT Comunicaciones - Base de Conocimientos Tecnicos")
     print("=" * 80)
-    
-    print("\n[1] Inicializando ChromaDB con OpenAI embeddings...")
+
+    print("\n[1] Inicializando ChromaDB con embeddings locales...")
     collection = initialize_rag_system()
-    
+
     if not collection:
         print("\n[ERROR] No se pudo inicializar el sistema RAG")
-        print("Verifica que OPENAI_API_KEY este configurada en .env")
+        print("Verifica que sentence-transformers y chromadb esten instalados")
         exit(1)
-    
-    print("\n[2] Cargando archivos de conocimiento...")
-    success = load_knowledge_base(collection)
-    
+
+    print("\n[2] Sincronizando archivos de conocimiento...")
+    success = load_knowledge_base(collection, KNOWLEDGE_DIR)
+
     if not success:
         print("\n[ERROR] No se pudo cargar la base de conocimientos")
         print("Verifica que existan archivos .txt en ./brain/knowledge_base/")
         exit(1)
-    
-    print("\n[3] Verificando sistema con queries de prueba...")
-    from rag_system import query_rag
-    
-    test_queries = [
-        "baterias de notebook",
-        "SSD NVMe",
-        "memoria RAM DDR4"
-    ]
-    
-    for query in test_queries:
-        print(f"\n[TEST] '{query}'")
-        results = query_rag(query, k=1, collection=collection)
-        if results:
-            print(f"   [OK] Encontrado: {results[0]['source']} - {results[0]['section']}")
-        else:
-            print(f"   [WARNING] Sin resultados")
-    
+
+    if not args.skip_tests:
+        print("\n[3] Verificando sistema con queries de prueba...")
+        from rag_system import query_rag
+
+        test_queries = [
+            "baterias de notebook",
+            "SSD NVMe",
+            "memoria RAM DDR4"
+        ]
+
+        for query in test_queries:
+            print(f"\n[TEST] '{query}'")
+            results = query_rag(query, k=1, collection=collection)
+            if results:
+                print(f"   [OK] Encontrado: {results[0]['source']} - {results[0]['section']}")
+            else:
+                print(f"   [WARNING] Sin resultados")
+
     print("\n" + "=" * 80)
     print("[SUCCESS] SISTEMA RAG INICIALIZADO CORRECTAMENTE")
     print("=" * 80)
-    print("\nEl sistema esta listo para usar.")
-    print("Los nodos del agente ahora pueden consultar la base de conocimientos.")
-    print("\nPara probar el sistema completo, ejecuta: python main.py")
+
+    if args.watch:
+        watch(collection, KNOWLEDGE_DIR, args.interval)
+    else:
+        print("\nEl sistema esta listo para usar.")
+        print("Los nodos del agente ahora pueden consultar la base de conocimientos.")
+        print("\nPara probar el sistema completo, ejecuta: python main.py")
@@ -14,7 +14,7 @@ import sys
 import asyncio
 import logging
 import base64
-from playwright.async_api import async_playwright
+from browser_pool import browser_pool
 
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(asctime)s - %(message)s")
 logger = logging.getLogger("ig_browser")
@@ -72,11 +72,38 @@ async def _dismiss_dialogs(page):
             logger.debug(f"Error al intentar cerrar diálogo {txt}: {e}")
 
 
+async def _new_instagram_context(browser):
+    """Contexto persistente de la cuenta de Instagram (lo crea/recicla browser_pool)."""
+    context = await browser.new_context(
+        storage_state=os.path.abspath(PLAYWRIGHT_SESSION),
+        viewport={"width": 1280, "height": 900},
+        user_agent=(
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/126.0.0.0 Safari/537.36"
+        ),
+    )
+
+    # Inyectar scripts anti-detección (Stealth Evasion)
+    await context.add_init_script("""
+        Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+        window.chrome = { runtime: {} };
+        Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
+        Object.defineProperty(navigator, 'languages', { get: () => ['es-AR', 'es', 'en-US', 'en'] });
+    """)
+    return context
+
+
 async def publish_photo_browser(image_path: str, caption: str) -> dict | None:
     """
     Publica una foto en Instagram de forma 100% autónoma y Headless con medidas sigilosas (Stealth).
     Apto para Railway / servidores en la nube.
+    Corre en el loop de browser_pool (Chromium y contexto de la cuenta ya abiertos).
     """
+    return await asyncio.wrap_future(browser_pool.submit(_publish_photo(image_path, caption)))
+
+
+async def _publish_photo(image_path: str, caption: str) -> dict | None:
     _load_credentials()
     _ensure_session_file()
 
@@ -97,43 +124,7 @@ async def publish_photo_browser(image_path: str, caption: str) -> dict | None:
     # Headless=True por defecto para servidores (Railway / Cloud)
     is_headless = os.getenv("HEADLESS", "true").lower() != "false"
 
-    async with async_playwright() as p:
-        logger.info(f"Lanzando Chromium en servidor (Headless={is_headless})...")
-        try:
-            browser = await p.chromium.launch(
-                headless=is_headless,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-infobars",
-                    "--window-size=1280,900"
-                ],
-            )
-        except Exception as e:
-            logger.error(f"Error lanzando Chromium: {e}")
-            return None
-
-        context = await browser.new_context(
-            storage_state=playwright_session,
-            viewport={"width": 1280, "height": 900},
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/126.0.0.0 Safari/537.36"
-            ),
-        )
-
-        # Inyectar scripts anti-detección (Stealth Evasion)
-        await context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-            window.chrome = { runtime: {} };
-            Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
-            Object.defineProperty(navigator, 'languages', { get: () => ['es-AR', 'es', 'en-US', 'en'] });
-        """)
-
-        page = await context.new_page()
-
+    async with browser_pool.lease("instagram", _new_instagram_context, headless=is_headless) as page:
         # Activar paquete stealth_async si está disponible
         try:
             from playwright_stealth import stealth_async
@@ -154,7 +145,8 @@ async def publish_photo_browser(image_path: str, caption: str) -> dict | None:
 
             if "accounts/login" in current_url:
                 logger.error("[ERROR CRÍTICO] Sesión de Instagram expirada en Railway. Actualizar la variable INSTAGRAM_PLAYWRIGHT_SESSION_B64.")
-                await browser.close()
+                # Contexto con la sesión vencida: reciclarlo para que el próximo intento la recargue
+                browser_pool.discard("instagram")
                 return None
 
             logger.info("[OK] Sesión activa confirmada en Instagram.")
@@ -225,7 +217,6 @@ async def publish_photo_browser(image_path: str, caption: str) -> dict | None:
                 logger.info("[OK] Imagen adjuntada exitosamente al modal de Instagram.")
             else:
                 logger.error("[ERROR] No se pudo encontrar el input de archivos.")
-                await browser.close()
                 return None
 
             await asyncio.sleep(4)
@@ -296,7 +287,6 @@ async def publish_photo_browser(image_path: str, caption: str) -> dict | None:
 
             if not share_btn:
                 logger.error("[ERROR] Botón 'Share / Compartir' no encontrado en el paso final.")
-                await browser.close()
                 return None
 
             await share_btn.click(force=True)
@@ -322,23 +312,21 @@ async def publish_photo_browser(image_path: str, caption: str) -> dict | None:
                 published = True
 
             try:
-                await context.storage_state(path=playwright_session)
+                await page.context.storage_state(path=playwright_session)
             except Exception:
                 pass
 
             if published:
                 logger.info("[SUCCESS] ¡Post publicado exitosamente!")
                 target_user = USERNAME if USERNAME else "bitcomunicaciones"
-                await browser.close()
                 return {"url": f"https://www.instagram.com/{target_user}/", "media_type": "image"}
             else:
                 logger.warning("[WARN] Publicación final finalizada sin diálogo de confirmación explícito.")
-                await browser.close()
                 return {"url": f"https://www.instagram.com/{USERNAME}/", "media_type": "image", "status": "unconfirmed"}
 
         except Exception as e:
             logger.error(f"[ERROR EXCEPCIÓN] Error inesperado en Playwright: {e}")
-            await browser.close()
+            browser_pool.discard("instagram")
             return None
 
 
@@ -365,7 +353,7 @@ def publish_instagram_post_browser(image_path: str, caption: str) -> dict | None
             return None
 
     try:
-        return asyncio.run(publish_photo_browser(local_path, caption))
+        return browser_pool.run(_publish_photo(local_path, caption))
     finally:
         if temp_downloaded and os.path.exists(local_path):
             try:
@@ -1,5 +1,4 @@
 import os
-import requests
 import tempfile
 import time
 import random
@@ -166,12 +165,13 @@ def download_image_to_temp(image_url):
         from PIL import Image
         import io
         
-        logger.info(f"Descargando desde: {image_url}")
-        response = requests.get(image_url, stream=True, timeout=30)
-        response.raise_for_status()
+        from http_fetch import fetch_bytes
         
-        # Leer contenido completo
-        image_data = response.content
+        logger.info(f"Descargando desde: {image_url}")
+        image_data = fetch_bytes(image_url, timeout=30)
+        if image_data is None:
+            logger.error("[ERROR] Error descargando imagen")
+            return None
         
         # Verificar que sea una imagen válida
         try:
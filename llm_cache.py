@@ -0,0 +1,263 @@
+"""
+llm_cache.py — Caché persistente (SQLite) de respuestas del chat model + modelos y prompts memoizados.
+
+- La clave es sha256(modelo, temperatura, prompt ya renderizado): la misma generación (mismo
+  producto, mismo día/tema) no vuelve a ir a OpenAI.
+- TTL configurable (LLM_CACHE_TTL_HOURS). LLM_CACHE_ENABLED=false lo apaga entero.
+- Opt-out por llamada (use_cache=False) cuando se quiere otra muestra del modelo: el
+  copywriter lo usa en los reintentos del critic (repetir el caption rechazado no sirve) y
+  refine_post siempre (el chat es interactivo: repetir la orden es pedir otra versión).
+- get_chat_model() / prompt_template() construyen ChatOpenAI y ChatPromptTemplate una sola vez
+  por proceso (antes se rearmaban en cada generación). LangChain se importa recién al usarlos.
+- stream() / astream() van devolviendo el texto a medida que lo genera el modelo (refine_post
+  en el dashboard, copywriter dentro del grafo); un hit del caché sale en un solo chunk.
+- Contadores por nodo: llamadas, hits, latencia, tiempo al primer token, tokens y costo
+  estimado (USD), incluido lo ahorrado por los hits: stats().
+- WAL + una conexión por llamada, igual que research_cache / draft_store.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger("llm_cache")
+
+TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600
+ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
+
+# USD por millón de tokens (entrada, salida); solo para el costo estimado de stats()
+PRICES_PER_MTOK = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    latency_ms REAL NOT NULL,
+    created_ts REAL NOT NULL,
+    expires_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache (expires_ts);
+"""
+
+_COUNTERS = ("calls", "hits", "misses", "errors", "llm_ms", "saved_ms", "streams", "ttft_ms",
+             "input_tokens", "output_tokens", "cost_usd", "saved_usd")
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model: Optional[str] = None, temperature: float = 0.7):
+    """ChatOpenAI compartido por (modelo, temperatura). stream_usage: tokens también al hacer streaming."""
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model or DEFAULT_MODEL, temperature=temperature, stream_usage=True)
+
+
+@lru_cache(maxsize=None)
+def prompt_template(text: str):
+    """ChatPromptTemplate compilado una sola vez por texto."""
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_template(text)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    price_in, price_out = PRICES_PER_MTOK.get(model, (0.0, 0.0))
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+def cache_key(model: str, temperature: float, messages) -> str:
+    payload = json.dumps([model, temperature, [(m.type, m.content) for m in messages]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, db_path: str = os.path.join("brain", "llm_cache.db"), ttl: float = TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._ready = False
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            with conn:
+                conn.execute("DELETE FROM llm_cache WHERE expires_ts < ?", (time.time(),))
+            self._ready = True
+        return conn
+
+    def _record(self, node: str, **values):
+        with self._lock:
+            st = self._stats.setdefault(node, dict.fromkeys(_COUNTERS, 0))
+            st["calls"] += 1
+            for counter, value in values.items():
+                st[counter] += value
+
+    def stats(self) -> dict:
+        """Contadores por nodo desde que arrancó el proceso, con hit_rate y latencia media."""
+        with self._lock:
+            out = {}
+            for node, st in self._stats.items():
+                out[node] = dict(st, hit_rate=st["hits"] / st["calls"] if st["calls"] else 0.0,
+                                 avg_llm_ms=st["llm_ms"] / st["misses"] if st["misses"] else 0.0,
+                                 avg_ttft_ms=st["ttft_ms"] / st["streams"] if st["streams"] else 0.0)
+            return out
+
+    # --- Lectura / escritura ---
+    def get(self, key: str):
+        """(content, input_tokens, output_tokens, latency_ms, model) vigente o None."""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT content, input_tokens, output_tokens, latency_ms, model FROM llm_cache "
+                "WHERE key = ? AND expires_ts >= ?", (key, time.time())).fetchone()
+        finally:
+            conn.close()
+
+    def put(self, key: str, model: str, content: str, input_tokens: int, output_tokens: int, latency_ms: float):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             (key, model, content, input_tokens, output_tokens, latency_ms, now, now + self.ttl))
+        except sqlite3.Error as e:
+            logger.warning(f"[LLMCache] No se pudo guardar la respuesta: {e}")
+        finally:
+            conn.close()
+
+    def invalidate(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM llm_cache")
+        finally:
+            conn.close()
+
+    # --- API principal ---
+    def _lookup(self, node, model, temperature, prompt, inputs, use_cache):
+        messages = prompt.format_messages(**inputs)
+        key = cache_key(model, temperature, messages) if ENABLED and use_cache else None
+        if key is None:
+            return messages, key, None
+        row = self.get(key)
+        if row is None:
+            return messages, key, None
+        from langchain_core.messages import AIMessage
+        content, input_tokens, output_tokens, latency_ms, row_model = row
+        self._record(node, hits=1, saved_ms=latency_ms,
+                     saved_usd=estimate_cost(row_model, input_tokens, output_tokens))
+        return messages, key, AIMessage(content=content)
+
+    def _store(self, node, model, key, response, latency_ms, ttft_ms=None):
+        usage = getattr(response, "usage_metadata", None) or {}
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        streamed = {} if ttft_ms is None else {"streams": 1, "ttft_ms": ttft_ms}
+        self._record(node, misses=1, llm_ms=latency_ms, input_tokens=input_tokens, output_tokens=output_tokens,
+                     cost_usd=estimate_cost(model, input_tokens, output_tokens), **streamed)
+        if key is not None:
+            self.put(key, model, response.content, input_tokens, output_tokens, latency_ms)
+
+    def invoke(self, node: str, prompt, inputs: dict, model: Optional[str] = None,
+               temperature: float = 0.7, use_cache: bool = True):
+        """
+        prompt | chat model con caché. Returns el AIMessage (del modelo o reconstruido del caché).
+        Si el modelo falla no se guarda nada y la excepción se propaga.
+        """
+        model = model or DEFAULT_MODEL
+        messages, key, cached = self._lookup(node, model, temperature, prompt, inputs, use_cache)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        try:
+            response = get_chat_model(model, temperature).invoke(messages)
+        except Exception:
+            self._record(node, errors=1)
+            raise
+        self._store(node, model, key, response, (time.perf_counter() - started) * 1000)
+        return response
+
+    async def ainvoke(self, node: str, prompt, inputs: dict, model: Optional[str] = None,
+                      temperature: float = 0.7, use_cache: bool = True):
+        """Variante async de invoke() (cliente async de OpenAI)."""
+        model = model or DEFAULT_MODEL
+        messages, key, cached = self._lookup(node, model, temperature, prompt, inputs, use_cache)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        try:
+            response = await get_chat_model(model, temperature).ainvoke(messages)
+        except Exception:
+            self._record(node, errors=1)
+            raise
+        self._store(node, model, key, response, (time.perf_counter() - started) * 1000)
+        return response
+
+    def stream(self, node: str, prompt, inputs: dict, model: Optional[str] = None,
+               temperature: float = 0.7, use_cache: bool = True):
+        """Como invoke(), pero va devolviendo el texto (str) por chunks. Se guarda al terminar."""
+        model = model or DEFAULT_MODEL
+        messages, key, cached = self._lookup(node, model, temperature, prompt, inputs, use_cache)
+        if cached is not None:
+            yield cached.content
+            return
+        started = time.perf_counter()
+        full = ttft_ms = None
+        try:
+            for chunk in get_chat_model(model, temperature).stream(messages):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                full = chunk if full is None else full + chunk
+                if chunk.content:
+                    yield chunk.content
+        except Exception:
+            self._record(node, errors=1)
+            raise
+        if full is not None:
+            self._store(node, model, key, full, (time.perf_counter() - started) * 1000, ttft_ms)
+
+    async def astream(self, node: str, prompt, inputs: dict, model: Optional[str] = None,
+                      temperature: float = 0.7, use_cache: bool = True):
+        """Variante async de stream()."""
+        model = model or DEFAULT_MODEL
+        messages, key, cached = self._lookup(node, model, temperature, prompt, inputs, use_cache)
+        if cached is not None:
+            yield cached.content
+            return
+        started = time.perf_counter()
+        full = ttft_ms = None
+        try:
+            async for chunk in get_chat_model(model, temperature).astream(messages):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                full = chunk if full is None else full + chunk
+                if chunk.content:
+                    yield chunk.content
+        except Exception:
+            self._record(node, errors=1)
+            raise
+        if full is not None:
+            self._store(node, model, key, full, (time.perf_counter() - started) * 1000, ttft_ms)
+
+
+llm_cache = LLMCache()
+
+
+def get_stats() -> dict:
+    return llm_cache.stats()
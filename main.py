@@ -29,10 +29,6 @@ def run_agent_job():
 schedule.every().day.at("10:00").do(run_agent_job)
 schedule.every().day.at("18:00").do(run_agent_job)
 
-# Continuous Publishing: Check every minute for approved drafts
-from scheduler_service import job_publish_pending
-schedule.every(1).minutes.do(job_publish_pending)
-
 if __name__ == "__main__":
     print("BIT Community Manager (LangGraph) Iniciado.")
     print("📅 Programado para: 10:00 y 18:00 diariamente")
@@ -46,7 +42,7 @@ if __name__ == "__main__":
     print("BIT Community Manager (LangGraph) Iniciado.")
     print("📅 Procesos activos:")
     print("   1. Generación Automática (10:00 y 18:00)")
-    print("   2. Publicador Automático (Chequeo cada minuto)")
+    print("   2. Publicador Automático (al horario de cada post aprobado)")
     print("   3. Interfase Visual (Dashboard)")
     print("=" * 60)
 
@@ -58,6 +54,10 @@ if __name__ == "__main__":
     
     scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
     scheduler_thread.start()
+
+    # Continuous Publishing: event-driven, wakes up at each approved post's time
+    from publish_scheduler import PublishScheduler
+    PublishScheduler().start()
     print("✅ Motor de fondo iniciado correctamente.")
 
     # 2. Launch Interface (Blocking)
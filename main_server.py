@@ -6,6 +6,7 @@ No depende del display visual de Windows.
 import os
 import sys
 import time
+import asyncio
 import schedule
 import threading
 import subprocess
@@ -34,13 +35,20 @@ for directory in ["brain/drafts", "brain/previews", "brain/reels", "brain/archiv
 os.environ["PYTHONIOENCODING"] = "utf-8"
 os.environ["DASHBOARD_MODE"] = "true"
 
+# Generaciones por corrida programada (corren en paralelo en un solo event loop)
+GENERATIONS_PER_RUN = int(os.getenv("AGENT_GENERATIONS_PER_RUN", "1"))
+
 def run_agent_job():
     """Genera nuevos posts automaticamente (10:00 y 18:00)."""
     print("\n--- [Agente] Iniciando generacion automatica ---")
     try:
-        from graph import app
-        result = app.invoke({"messages": [], "status": "start"})
-        print(f"--- [Agente] Completado. Estado: {result.get('status')} ---")
+        from graph import run_generations
+        results = asyncio.run(run_generations(max(1, GENERATIONS_PER_RUN)))
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"--- [Agente] Error critico: {result} ---")
+            else:
+                print(f"--- [Agente] Completado. Estado: {result.get('status')} ---")
     except Exception as e:
         print(f"--- [Agente] Error critico: {e} ---")
 
@@ -57,7 +65,9 @@ def run_scheduler_loop():
                 print(f"[HEARTBEAT] {get_now_ar().strftime('%Y-%m-%d %H:%M:%S')} - El motor sigue activo.")
                 last_heartbeat = now_ts
                 
-            time.sleep(30)
+            # Dormir hasta el próximo job de generación (máx. hasta el próximo heartbeat)
+            idle = schedule.idle_seconds()
+            time.sleep(min(max(idle if idle is not None else 600, 1), 600))
         except Exception as e:
             print(f"[CRITICAL ERROR] Fallo en el loop del scheduler: {e}")
             time.sleep(60) # Esperar un poco antes de reintentar
@@ -68,19 +78,29 @@ if __name__ == "__main__":
     print(f"Hora actual (AR): {get_now_ar().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
 
-    # Importar la funcion de publicacion
-    from scheduler_service import job_publish_pending
+    # Motor de publicacion por eventos (publica cada draft aprobado al llegar su horario)
+    from publish_scheduler import PublishScheduler
 
     # Horarios (Usa la hora local del sistema que seteamos arriba con TZ)
     schedule.every().day.at("10:00").do(run_agent_job)
     schedule.every().day.at("18:00").do(run_agent_job)
-    schedule.every(1).minutes.do(job_publish_pending)
 
-    print("[OK] Scheduler configurado: 10:00 y 18:00 generacion + publicacion cada minuto")
+    print("[OK] Scheduler configurado: 10:00 y 18:00 generacion + publicacion por horario de cada post")
+
+    # La primera pasada del motor publica lo que ya esté vencido al arrancar
+    PublishScheduler().start()
+
+    # Espejo local del catálogo de WooCommerce (sync incremental periódica)
+    from product_catalog import product_catalog
+    product_catalog.start_background_refresh()
 
-    # Verificacion inmediata al arrancar
-    print("[OK] Verificando posts pendientes al inicio...")
-    job_publish_pending()
+    # Modelo de embeddings + colección RAG cargados antes de la primera investigación
+    if os.getenv("RAG_ENABLED", "true").lower() not in ("0", "false", "no"):
+        try:
+            import rag_system
+            rag_system.warm_up()
+        except Exception as e:
+            print(f"[WARN] RAG no disponible: {e}")
 
     # Correr scheduler en thread background
     t = threading.Thread(target=run_scheduler_loop, daemon=True)
@@ -1,8 +1,40 @@
 from approval_system import approval_workflow
 import os
+import asyncio
 import json
 from datetime import datetime
 
+def save_draft(state):
+    """Guarda el estado como draft pendiente en brain/drafts. Returns la ruta del JSON."""
+    # Ensure directory exists
+    draft_dir = "./brain/drafts"
+    os.makedirs(draft_dir, exist_ok=True)
+    
+    # Create unique filename with microseconds. batch_generation guarda varios a la vez desde
+    # threads: el archivo se crea en modo "x" (atómico), si otro ya tomó el nombre se suma un sufijo
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    draft_id, suffix = timestamp, 1
+    while True:
+        filename = f"{draft_dir}/draft_{draft_id}.json"
+        try:
+            f = open(filename, "x", encoding="utf-8")
+            break
+        except FileExistsError:
+            draft_id = f"{timestamp}_{suffix}"
+            suffix += 1
+    
+    # Add ID to state for easier UI tracking
+    state["id"] = draft_id
+    
+    # Save state to file
+    with f:
+        # Convert non-serializable objects (like products) if needed
+        # State is mostly strings/dicts so should be fine
+        json.dump(state, f, indent=2, ensure_ascii=False)
+        
+    print(f"✅ Draft saved to: {filename}")
+    return filename
+
 def approval_node(state):
     """
     Nodo de aprobación.
@@ -20,25 +52,7 @@ def approval_node(state):
     # Check if running in Dashboard mode (non-interactive)
     if os.getenv("DASHBOARD_MODE") == "true":
         print("ℹ️ DASHBOARD MODE: Saving draft and exiting graph.")
-        
-        # Ensure directory exists
-        draft_dir = "./brain/drafts"
-        os.makedirs(draft_dir, exist_ok=True)
-        
-        # Create unique filename with microseconds
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        filename = f"{draft_dir}/draft_{timestamp}.json"
-        
-        # Add ID to state for easier UI tracking
-        state["id"] = timestamp
-        
-        # Save state to file
-        with open(filename, "w", encoding="utf-8") as f:
-            # Convert non-serializable objects (like products) if needed
-            # State is mostly strings/dicts so should be fine
-            json.dump(state, f, indent=2, ensure_ascii=False)
-            
-        print(f"✅ Draft saved to: {filename}")
+        save_draft(state)
         
         # Mark as draft_saved to handle transition
         state["approval_status"] = "draft_saved"
@@ -49,6 +63,19 @@ def approval_node(state):
     
     return updated_state
 
+async def approval_node_async(state):
+    """Variante async (app.ainvoke): escritura del draft / input() de la CLI en un thread."""
+    return await asyncio.to_thread(approval_node, state)
+
+def save_draft_node(state):
+    """Nodo final del grafo de batch: siempre guarda el draft para revisión en el dashboard."""
+    state = dict(state)
+    save_draft(state)
+    return {"id": state["id"], "approval_status": "draft_saved"}
+
+async def save_draft_node_async(state):
+    return await asyncio.to_thread(save_draft_node, state)
+
 def should_publish(state):
     """
     Decide si publicar basado en el estado de aprobación.
@@ -1,11 +1,77 @@
 import os
-from langchain_openai import ChatOpenAI
+import json
 from langchain_core.prompts import ChatPromptTemplate
 from datetime import datetime, timedelta
+from llm_cache import llm_cache
 
-def draft_content(state):
-    print("--- [Node] Copywriter (GPT-4o-mini) ---")
-    
+# Templates compilados una sola vez por proceso (antes se armaban en cada generación)
+SALES_PROMPT = ChatPromptTemplate.from_template("""
+        Actuá como el experto técnico principal de '{store_name}', una tienda líder en hardware y repuestos en {location} (Argentina).
+        Tus seguidores son técnicos, entusiastas del hardware y clientes que buscan SOLUCIONES REALES, no solo marketing.
+        
+        {theme_inst}
+        {critique_inst}
+        
+        📅 FOCO ESTRATÉGICO ({day_name}):
+        **{daily_theme}**.
+        
+        DATOS PRECISOS DEL PRODUCTO:
+        - Nombre: {product_name}
+        - Precio: ${price}
+        - Información Técnica: {research}
+        
+        REGLAS DE RIGOR TÉCNICO Y ESTILO BIT:
+        1. **Voseo Argentino Natural**: Usá "tenés", "querés", "necesitás", "vení". Nada de "puedes" ni "tienes".
+        2. **Experto, no Vendedor**: Evitá frases genéricas como "puente mágico" o "maravilla". Sé específico. Si es un receptor WiFi, hablá de su chipset, frecuencia, compatibilidad exacta y estabilidad de señal.
+        3. **Rigor Técnico**: Explicá por qué este repuesto es la elección correcta. Mencioná compatibilidades de modelos, voltajes o especificaciones que un técnico valoraría.
+        4. **Identidad BIT**: Mantené los datos de contacto claros. Somos serios, probamos todo lo que vendemos y damos garantía.
+        
+        ESTRUCTURA TÉCNICA REQUERIDA:
+        - Título directo (¿Buscás el repuesto exacto para tu equipo?).
+        - Especificaciones técnicas clave y compatibilidad.
+        - Beneficio real de elegir este componente original/testeado.
+        - Bloque de Acción (Precio y Contacto).
+        
+        CONTACTO BIT:
+        📍 {location} | 📱 WhatsApp: {phone} | 🌐 {web}
+        
+        Hashtags: Generá 6-8 hashtags específicos de hardware y la marca (ej: #RepuestosPC #{category_clean} #BitComunicaciones #HardwareSantaFe).
+        
+        Output: SOLO el texto del caption.
+        """)
+
+COMMUNITY_PROMPT = ChatPromptTemplate.from_template("""
+        Actuá como el experto técnico de '{store_name}' en {location}. 
+        Hoy el objetivo es aportar conocimiento técnico de alto nivel para nuestra comunidad de reparadores y fanáticos del hardware.
+        
+        {theme_inst}
+        {critique_inst}
+        
+        📅 TEMA TÉCNICO DEL DÍA ({day_name}):
+        **{daily_theme}**.
+        
+        COMPONENTE DE REFERENCIA: {product_name}
+        DATOS TÉCNICOS: {research}
+        
+        ESTILO EXIGIDO:
+        - Profesional, preciso y con autoridad técnica.
+        - Usá voseo argentino (Tú no existe en BIT).
+        - Nada de lenguaje infantilizado o genérico. Explicá cómo funciona el componente o cómo se diagnostica una falla.
+        
+        ESTRUCTURA:
+        - Dato técnico preciso o diagnóstico de falla.
+        - Explicación de ingeniería o funcionamiento del componente.
+        - Tip profesional para técnicos (ej: cuidado con la estática, limpieza de contactos).
+        - Bloque de contacto:
+        📍 {location} | 📱 WhatsApp: {phone} | 🌐 {web}
+        
+        Hashtags: Generá 5-6 hashtags técnicos y de comunidad.
+        
+        Output: SOLO el texto del caption.
+        """)
+
+def _prepare_draft(state):
+    """Elige el prompt y arma sus variables. Returns (prompt, inputs, ctx) para llm_cache.stream/astream."""
     product = state.get("selected_product")
     research = state.get("research_summary")
     retry_count = state.get("retry_count", 0)
@@ -14,16 +80,18 @@ def draft_content(state):
     model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
     print(f"--- [Node] Copywriter ({model_name}) ---")
     
-    llm = ChatOpenAI(model=model_name, temperature=0.7)
-    
-    # Logic for Scheduling:
+    # Logic for Scheduling (batch_generation ya trae el horario asignado):
     now = datetime.now()
-    if now.hour < 12:
+    preset_time = state.get("target_publish_time_iso")
+    if preset_time:
+        target_date = datetime.fromisoformat(preset_time)
+        publish_time = preset_time
+    elif now.hour < 12:
         target_date = now
-        publish_time = now.replace(hour=18, minute=0, second=0).isoformat()
+        publish_time = now.replace(hour=18, minute=0, second=0, microsecond=0).isoformat()
     else:
         target_date = now + timedelta(days=1)
-        publish_time = (target_date).replace(hour=10, minute=0, second=0).isoformat()
+        publish_time = (target_date).replace(hour=10, minute=0, second=0, microsecond=0).isoformat()
 
     # --- SETTINGS & THEME ---
     settings_path = os.path.join("brain", "settings.json")
@@ -92,78 +160,17 @@ def draft_content(state):
     if weekly_theme:
         theme_inst = f"IMPORTANTE: Estamos en la semana de '{weekly_theme}'. Intentá vincular el post con este tema si tiene sentido, o usalo como contexto."
 
-    if post_type == "sales":
-        prompt_text = """
-        Actuá como el experto técnico principal de '{store_name}', una tienda líder en hardware y repuestos en {location} (Argentina).
-        Tus seguidores son técnicos, entusiastas del hardware y clientes que buscan SOLUCIONES REALES, no solo marketing.
-        
-        {theme_inst}
-        
-        📅 FOCO ESTRATÉGICO ({day_name}):
-        **{daily_theme}**.
-        
-        DATOS PRECISOS DEL PRODUCTO:
-        - Nombre: {product_name}
-        - Precio: ${price}
-        - Información Técnica: {research}
-        
-        REGLAS DE RIGOR TÉCNICO Y ESTILO BIT:
-        1. **Voseo Argentino Natural**: Usá "tenés", "querés", "necesitás", "vení". Nada de "puedes" ni "tienes".
-        2. **Experto, no Vendedor**: Evitá frases genéricas como "puente mágico" o "maravilla". Sé específico. Si es un receptor WiFi, hablá de su chipset, frecuencia, compatibilidad exacta y estabilidad de señal.
-        3. **Rigor Técnico**: Explicá por qué este repuesto es la elección correcta. Mencioná compatibilidades de modelos, voltajes o especificaciones que un técnico valoraría.
-        4. **Identidad BIT**: Mantené los datos de contacto claros. Somos serios, probamos todo lo que vendemos y damos garantía.
-        
-        ESTRUCTURA TÉCNICA REQUERIDA:
-        - Título directo (¿Buscás el repuesto exacto para tu equipo?).
-        - Especificaciones técnicas clave y compatibilidad.
-        - Beneficio real de elegir este componente original/testeado.
-        - Bloque de Acción (Precio y Contacto).
-        
-        CONTACTO BIT:
-        📍 {location} | 📱 WhatsApp: {phone} | 🌐 {web}
-        
-        Hashtags: Generá 6-8 hashtags específicos de hardware y la marca (ej: #RepuestosPC #{category_clean} #BitComunicaciones #HardwareSantaFe).
-        
-        Output: SOLO el texto del caption.
-        """
-    else:
-        prompt_text = """
-        Actuá como el experto técnico de '{store_name}' en {location}. 
-        Hoy el objetivo es aportar conocimiento técnico de alto nivel para nuestra comunidad de reparadores y fanáticos del hardware.
-        
-        {theme_inst}
-        
-        📅 TEMA TÉCNICO DEL DÍA ({day_name}):
-        **{daily_theme}**.
-        
-        COMPONENTE DE REFERENCIA: {product_name}
-        DATOS TÉCNICOS: {research}
-        
-        ESTILO EXIGIDO:
-        - Profesional, preciso y con autoridad técnica.
-        - Usá voseo argentino (Tú no existe en BIT).
-        - Nada de lenguaje infantilizado o genérico. Explicá cómo funciona el componente o cómo se diagnostica una falla.
-        
-        ESTRUCTURA:
-        - Dato técnico preciso o diagnóstico de falla.
-        - Explicación de ingeniería o funcionamiento del componente.
-        - Tip profesional para técnicos (ej: cuidado con la estática, limpieza de contactos).
-        - Bloque de contacto:
-        📍 {location} | 📱 WhatsApp: {phone} | 🌐 {web}
-        
-        Hashtags: Generá 5-6 hashtags técnicos y de comunidad.
-        
-        Output: SOLO el texto del caption.
-        """
+    # Re-draft después del critic: el prompt dice qué se rechazó para no repetir la misma falla
+    critique_inst = ""
+    if critique and critique != "APPROVED" and retry_count > 0:
+        critique_inst = f"CORRECCIONES DEL REVISOR (el borrador anterior fue rechazado, corregí esto): {critique}"
 
-    prompt = ChatPromptTemplate.from_template(prompt_text)
-    chain = prompt | llm
+    prompt = SALES_PROMPT if post_type == "sales" else COMMUNITY_PROMPT
     
     # Clean category for hashtag
     category_clean = product_categories.replace(" ", "").replace(",", "") if product_categories else "Repuestos"
     
-    print(f"Generating balanced caption for: {product_name}...")
-    response = chain.invoke({
+    inputs = {
         "store_name": store_name,
         "location": store_location,
         "phone": store_phone,
@@ -175,10 +182,17 @@ def draft_content(state):
         "research": research,
         "day_name": day_name,
         "daily_theme": daily_theme,
-        "theme_inst": theme_inst
-    })
-    
-    caption = response.content.strip()
+        "theme_inst": theme_inst,
+        "critique_inst": critique_inst
+    }
+    ctx = {"product_name": product_name, "publish_time": publish_time, "retry_count": retry_count,
+           "model": model_name}
+    return prompt, inputs, ctx
+
+
+def _finish_draft(text, ctx):
+    product_name = ctx["product_name"]
+    caption = text.strip()
     print(f"Caption generated ({len(caption)} chars)")
     
     # Generate Image Prompt for BIT aesthetic (NOT cyberpunk)
@@ -197,7 +211,28 @@ def draft_content(state):
     return {
         "draft_caption": caption,
         "image_prompt": image_prompt_text,
-        "publish_time_iso": publish_time,
-        "retry_count": retry_count + 1,
+        "publish_time_iso": ctx["publish_time"],
+        "retry_count": ctx["retry_count"] + 1,
         "status": "critique"
     }
+
+
+def draft_content(state):
+    print("--- [Node] Copywriter (GPT-4o-mini) ---")
+    prompt, inputs, ctx = _prepare_draft(state)
+    print(f"Generating balanced caption for: {ctx['product_name']}...")
+    # Streaming: con app.stream(stream_mode="messages") los tokens llegan al dashboard mientras se escribe.
+    # En los reintentos del critic se pide otra muestra: el caption cacheado es el que se rechazó
+    text = "".join(llm_cache.stream("copywriter", prompt, inputs, model=ctx["model"], temperature=0.7,
+                                    use_cache=ctx["retry_count"] == 0))
+    return _finish_draft(text, ctx)
+
+
+async def draft_content_async(state):
+    """Variante async (app.ainvoke): la llamada al LLM usa el cliente async de OpenAI."""
+    print("--- [Node] Copywriter (GPT-4o-mini) ---")
+    prompt, inputs, ctx = _prepare_draft(state)
+    print(f"Generating balanced caption for: {ctx['product_name']}...")
+    chunks = [chunk async for chunk in llm_cache.astream("copywriter", prompt, inputs, model=ctx["model"],
+                                                         temperature=0.7, use_cache=ctx["retry_count"] == 0)]
+    return _finish_draft("".join(chunks), ctx)
@@ -1,22 +1,78 @@
-import chromadb
-from chromadb.utils import embedding_functions
-
-import os
-
-# Initialize ChromaDB (Local) with OpenAI Embeddings
-collection = None
-
-try:
-    embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
-    openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        model_name=embedding_model
-    )
-    chroma_client = chromadb.PersistentClient(path="./brain/memory_openai")
-    collection = chroma_client.get_or_create_collection(name="post_history", embedding_function=openai_ef)
-except Exception as e:
-    print(f"⚠️ Critic Memory Disabled: {e}")
-    collection = None
+import re
+import time
+import asyncio
+
+from caption_index import caption_index, SIMILARITY_THRESHOLD
+from security import MAX_CAPTION_LENGTH
+
+MANDATORY_HASHTAG = "#BITComunicaciones"
+BANNED_WORDS = ["cyberpunk", "2099", "neon", "futuristic", "hologram"]
+
+# Códigos de critique_issues. Los mecánicos los arregla repair_node sin LLM;
+# banned_words_context (término en la línea de precio, o numérico) va a la edición con LLM.
+MECHANICAL_ISSUES = {"missing_hashtag", "too_long", "banned_words"}
+
+# Raíces para la coincidencia por prefijo, así también caen las formas en castellano
+# (neones, futurista, futurístico, hologramas). Las vocales aceptan tilde (neón).
+_TERM_STEMS = {"futuristic": "futurist"}
+_ACCENTED = {"a": "[aá]", "e": "[eé]", "i": "[ií]", "o": "[oó]", "u": "[uúü]"}
+
+
+def _stem_pattern(word):
+    return "".join(_ACCENTED.get(ch, re.escape(ch)) for ch in _TERM_STEMS.get(word, word))
+
+
+# Términos alfabéticos como prefijo de palabra o dentro de un hashtag (#CyberpunkVibes).
+# Los tokens (entre espacios) con números no se tocan: precios, modelos, SKUs (120990, dw2099la, NEON-2099X1).
+_ALPHA_TERMS = "|".join(_stem_pattern(w) for w in BANNED_WORDS if w.isalpha())
+BANNED_TERM_RE = re.compile(rf"#\w*(?:{_ALPHA_TERMS})\w*|\b(?:{_ALPHA_TERMS})\w*", re.IGNORECASE)
+# Numéricos ("2099") solo como número suelto; nunca se borran, los reescribe el LLM
+NUMERIC_TERM_RE = re.compile(r"\b(?:" + "|".join(re.escape(w) for w in BANNED_WORDS if not w.isalpha()) + r")\b")
+_PRICE_LINE_RE = re.compile(r"^.*(?:\$|precio).*$", re.IGNORECASE | re.MULTILINE)
+_TOKEN_PUNCT = ".,;:!?¡¿()\"'"
+
+
+def _token_at(caption, m):
+    """Token completo (entre espacios) que contiene el match."""
+    before = re.search(r"\S*$", caption[:m.start()]).group(0)
+    after = re.match(r"\S*", caption[m.end():]).group(0)
+    return before + m.group(0) + after
+
+
+def _overlaps(m, spans):
+    return any(start < m.end() and m.start() < end for start, end in spans)
+
+
+def _name_spans(caption, product):
+    """Rangos de las menciones del nombre completo del producto."""
+    name = ((product or {}).get("name") or "").strip()
+    if not name:
+        return []
+    return [m.span() for m in re.finditer(re.escape(name), caption, re.IGNORECASE)]
+
+
+def banned_term_hits(caption, product=None):
+    """
+    Returns (matches que se pueden borrar sin tocar nada más, matches que necesitan una edición con LLM).
+    Los términos que son parte del nombre del producto (p. ej. "Neon Flex") no se reportan: el nombre
+    no se cambia. Los de la línea de precio y los numéricos van al LLM.
+    """
+    name_spans = _name_spans(caption, product)
+    price_spans = [m.span() for m in _PRICE_LINE_RE.finditer(caption)]
+    # También en menciones parciales del nombre ("Tu Neon Flex"): la misma palabra que figura en el nombre
+    name_terms = {m.group(0).lower() for m in BANNED_TERM_RE.finditer((product or {}).get("name") or "")}
+    strippable, contextual = [], []
+    for m in BANNED_TERM_RE.finditer(caption):
+        if any(ch.isdigit() for ch in _token_at(caption, m)) or m.group(0).lower() in name_terms:
+            continue
+        if _overlaps(m, name_spans):
+            continue
+        (contextual if _overlaps(m, price_spans) else strippable).append(m)
+    # "2099" suelto (o con puntuación); "$2099" o "XPS-2099" son precio / modelo
+    contextual += [m for m in NUMERIC_TERM_RE.finditer(caption)
+                   if _token_at(caption, m).strip(_TOKEN_PUNCT) == m.group(0) and not _overlaps(m, name_spans)]
+    return strippable, contextual
+
 
 def quality_control(state):
     print("--- [Node] Critic (Quality Control) ---")
@@ -25,57 +81,61 @@ def quality_control(state):
     
     # 1. Check for Similarity (Duplication Check)
     print("🧠 Memory: Checking for duplicates...")
-    # if collection:
-    #     try:
-    #         results = collection.query(
-    #             query_texts=[draft],
-    #             n_results=1
-    #         )
-    #         if results['documents'] and results['documents'][0]:
-    #             # If distance is very low, it means it's too similar (optional logic)
-    #             pass
-    #     except Exception as e:
-    #         print(f"⚠️ Similarity check failed: {e}")
-    # else:
-    print("ℹ️ Skipping similarity check (Memory disabled temporarily)")
+    feedback = []
+    issues = []
+    try:
+        started = time.perf_counter()
+        match = caption_index.nearest(draft)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if match:
+            score, caption_id, _ = match
+            print(f"   Closest published caption: {caption_id} (similarity {score:.2f}, {elapsed_ms:.0f} ms)")
+            if score >= SIMILARITY_THRESHOLD:
+                feedback.append(f"Caption is too similar to an already published post (similarity {score:.2f}). "
+                                "Write it from a different angle with a different hook.")
+                issues.append("duplicate")
+        else:
+            print("   No published captions indexed yet.")
+    except Exception as e:
+        print(f"⚠️ Similarity check failed: {e}")
 
     # 2. Heuristic Checks for BIT branding
-    feedback = []
-    if "#BITComunicaciones" not in draft and "#bitcomunicaciones" not in draft.lower():
-        feedback.append("Missing mandatory hashtag #BITComunicaciones.")
-    if len(draft) > 2200:
+    if MANDATORY_HASHTAG.lower() not in draft.lower():
+        feedback.append(f"Missing mandatory hashtag {MANDATORY_HASHTAG}.")
+        issues.append("missing_hashtag")
+    if len(draft) > MAX_CAPTION_LENGTH:
         feedback.append("Caption is too long for Instagram.")
+        issues.append("too_long")
     
     # Check for inappropriate futuristic/cyberpunk language
-    cyberpunk_keywords = ["cyberpunk", "2099", "neon", "futuristic", "hologram"]
-    if any(keyword in draft.lower() for keyword in cyberpunk_keywords):
+    strippable, contextual = banned_term_hits(draft, product)
+    if strippable or contextual:
         feedback.append("Tone is too futuristic/cyberpunk. Use educational and approachable tone instead.")
+    if strippable:
+        issues.append("banned_words")
+    if contextual:
+        terms = ", ".join(sorted({m.group(0) for m in contextual}))
+        feedback.append(f"Rephrase the futuristic terms ({terms}) without changing the product name, model numbers or price.")
+        issues.append("banned_words_context")
     
     # Decision
     if feedback:
         return {
             "critique_feedback": " ".join(feedback),
+            "critique_issues": issues,
             "flow_status": "revision_needed"
         }
         
-    # If approved, save to memory with product metadata
-    # if collection and product:
-    #     try:
-    #         collection.add(
-    #             documents=[draft],
-    #             ids=[str(hash(draft))],
-    #             metadatas=[{
-    #                 "product_id": product.get("id"),
-    #                 "product_name": product.get("name"),
-    #                 "timestamp": str(hash(draft))  # Simple timestamp placeholder
-    #             }]
-    #         )
-    #         print("✅ Caption saved to memory")
-    #     except Exception as e:
-    #         print(f"⚠️ Memory save failed: {e}")
-    
+    # Los captions aprobados se indexan al publicarse (scheduler_service), no acá:
+    # un draft que el humano rechaza no tiene que bloquear a los siguientes.
     print("✅ Critic Approved. Moving to Manual Approval...")
     return {
         "critique_feedback": "APPROVED",
+        "critique_issues": [],
         "flow_status": "approved"
     }
+
+
+async def quality_control_async(state):
+    """Variante async (app.ainvoke): el chequeo de duplicados (MiniLM + índice) corre en un thread."""
+    return await asyncio.to_thread(quality_control, state)
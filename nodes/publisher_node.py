@@ -1,9 +1,9 @@
 import requests
 import os
+import asyncio
 from datetime import datetime
-from instagram_client import publish_instagram_post
-from generate_image import generate_branded_product_image
-from image_composer import create_social_post
+# image_composer, generate_image e instagram_client se importan al usarse: así importar
+# graph (que registra este nodo) no carga PIL, el SDK de OpenAI ni instagrapi.
 
 def publish_to_instagram(state):
     """
@@ -33,6 +33,7 @@ def publish_to_instagram(state):
             temp_image_path = os.path.abspath(f"temp_force_{datetime.now().strftime('%H%M%S')}.png")
             
             # Apply branding (Background removal, logo, template)
+            from image_composer import create_social_post
             image_url = create_social_post(
                 product=product,
                 output_path=temp_image_path,
@@ -48,6 +49,7 @@ def publish_to_instagram(state):
         print("[INFO] No hay imagen del producto, generando con DALL-E 3...")
         
         try:
+            from generate_image import generate_branded_product_image
             image_url = generate_branded_product_image(
                 product=product,
                 custom_prompt=prompt,
@@ -83,6 +85,7 @@ def publish_to_instagram(state):
             print(f"⚠️ Error procesando fecha: {e}")
             scheduled_dt = None
 
+    from instagram_client import publish_instagram_post
     result = publish_instagram_post(image_url, caption, schedule_time=scheduled_dt)
     
     # 3. Cleanup local temp image if created
@@ -106,3 +109,11 @@ def publish_to_instagram(state):
             "status": "failed",
             "image_url": image_url
         }
+
+
+async def publish_to_instagram_async(state):
+    """
+    Variante async (app.ainvoke): la composición (PIL/numpy), DALL-E e instagrapi son
+    bloqueantes, así que el nodo entero corre en el thread pool del loop.
+    """
+    return await asyncio.to_thread(publish_to_instagram, state)
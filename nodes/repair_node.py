@@ -0,0 +1,128 @@
+import re
+
+from llm_cache import llm_cache, prompt_template
+from security import MAX_CAPTION_LENGTH
+from nodes.critic_node import MANDATORY_HASHTAG, MECHANICAL_ISSUES, banned_term_hits
+
+_HASHTAG_LINE_RE = re.compile(r"^\s*(#\w+\s*)+$")
+
+# Edición puntual para lo que no se arregla con reglas (caption repetido, términos en la línea de precio).
+# Se compila recién en la primera edición con LLM (prompt_template lo memoiza)
+REPAIR_PROMPT = """
+        Sos el editor de BIT Comunicaciones. El revisor rechazó este caption de Instagram por lo siguiente:
+        {feedback}
+
+        CAPTION:
+        {caption}
+
+        Corregí SOLO lo señalado. Si es un caption repetido, reescribí el gancho inicial y el ángulo para que
+        no se parezca a lo ya publicado; si son términos futuristas, reformulá esas frases.
+        Mantené intactos el nombre del producto, los modelos, los datos técnicos, el precio, el bloque de contacto y los hashtags.
+        Voseo argentino, tono técnico y cercano. Máximo {max_length} caracteres.
+
+        Output: SOLO el texto del caption.
+        """
+
+
+def _split_hashtags(caption):
+    """(cuerpo, bloque final de líneas de hashtags)."""
+    lines = caption.rstrip().split("\n")
+    cut = len(lines)
+    while cut > 0 and (_HASHTAG_LINE_RE.match(lines[cut - 1]) or not lines[cut - 1].strip()):
+        cut -= 1
+    return "\n".join(lines[:cut]).rstrip(), "\n".join(l.strip() for l in lines[cut:] if l.strip())
+
+
+def strip_banned_words(caption, product=None):
+    """Borra solo los términos prohibidos seguros (palabras completas fuera del nombre y del precio)."""
+    strippable, _ = banned_term_hits(caption, product)
+    cleaned = caption
+    for m in reversed(strippable):
+        cleaned = cleaned[:m.start()] + cleaned[m.end():]
+    cleaned = re.sub(r"[ \t]{2,}", " ", cleaned)
+    return re.sub(r" +([,.;:!?])", r"\1", cleaned)
+
+
+def ensure_hashtag(caption):
+    if MANDATORY_HASHTAG.lower() in caption.lower():
+        return caption
+    body, tags = _split_hashtags(caption)
+    tags = f"{tags} {MANDATORY_HASHTAG}" if tags else MANDATORY_HASHTAG
+    return f"{body}\n\n{tags}"
+
+
+def truncate_caption(caption, max_length=MAX_CAPTION_LENGTH):
+    """Recorta el cuerpo (en un fin de párrafo u oración) conservando los hashtags del final."""
+    if len(caption) <= max_length:
+        return caption
+    body, tags = _split_hashtags(caption)
+    tail = f"\n\n{tags}" if tags and len(tags) < max_length // 2 else ""
+    room = max_length - len(tail)
+    cut = body[:room]
+    for sep in ("\n\n", "\n", ". ", "! ", "? "):
+        pos = cut.rfind(sep)
+        if pos > room // 2:
+            cut = cut[:pos + (1 if sep.strip() else 0)]
+            break
+    return cut.rstrip() + tail
+
+
+def apply_mechanical_fixes(caption, product=None):
+    """Arreglos deterministas, en orden: términos prohibidos, hashtag obligatorio, largo."""
+    return truncate_caption(ensure_hashtag(strip_banned_words(caption, product)))
+
+
+def _prepare_repair(state):
+    print("--- [Node] Repair ---")
+    issues = state.get("critique_issues") or []
+    caption = state.get("draft_caption", "")
+    semantic = [i for i in issues if i not in MECHANICAL_ISSUES]
+    print(f"Issues: {', '.join(issues) or '-'} (LLM: {'sí' if semantic else 'no'})")
+    return caption, semantic
+
+
+def _finish_repair(state, caption):
+    if not caption or caption == state.get("draft_caption"):
+        # Nada que arreglar con reglas ni con una edición puntual: re-draft completo
+        print("Repair could not fix the draft. Sending back to copywriter...")
+        return {"status": "redraft"}
+    print(f"Caption repaired ({len(caption)} chars)")
+    return {
+        "draft_caption": caption,
+        "retry_count": state.get("retry_count", 0) + 1,
+        "status": "critique"
+    }
+
+
+def _repair_inputs(state, caption):
+    return {"feedback": state.get("critique_feedback", ""), "caption": caption, "max_length": MAX_CAPTION_LENGTH}
+
+
+def repair_draft(state):
+    caption, semantic = _prepare_repair(state)
+    try:
+        if semantic:
+            caption = "".join(llm_cache.stream("repair", prompt_template(REPAIR_PROMPT), _repair_inputs(state, caption))).strip()
+        caption = apply_mechanical_fixes(caption, state.get("selected_product"))
+    except Exception as e:
+        print(f"⚠️ Repair failed: {e}")
+        caption = None
+    return _finish_repair(state, caption)
+
+
+async def repair_draft_async(state):
+    """Variante async (app.ainvoke): solo la edición con LLM es I/O."""
+    caption, semantic = _prepare_repair(state)
+    try:
+        if semantic:
+            chunks = [chunk async for chunk in llm_cache.astream("repair", prompt_template(REPAIR_PROMPT), _repair_inputs(state, caption))]
+            caption = "".join(chunks).strip()
+        caption = apply_mechanical_fixes(caption, state.get("selected_product"))
+    except Exception as e:
+        print(f"⚠️ Repair failed: {e}")
+        caption = None
+    return _finish_repair(state, caption)
+
+
+def check_repair(state):
+    return "copywriter" if state.get("status") == "redraft" else "critic"
@@ -1,18 +1,19 @@
-from duckduckgo_search import DDGS
-# RAG temporarily disabled due to embedding issues
-# from rag_system import query_rag, get_rag_context
+import os
+import time
+import asyncio
 
-def research_product(state):
-    """
-    Research tech topics related to the product.
-    Uses web search (DuckDuckGo) for product information.
-    """
-    print("--- [Node] Product/Tech Researcher ---")
-    
-    product = state.get("selected_product")
-    if not product:
-        return {"research_summary": "No product information available."}
-    
+from research_cache import search_web
+from rag_system import query_rag, pack_context  # chromadb se importa recién en la primera consulta
+
+RAG_ENABLED = os.getenv("RAG_ENABLED", "true").lower() not in ("0", "false", "no")
+RAG_K = 4  # Candidatos; pack_context se queda con los que entran en RAG_RESEARCH_TOKENS
+RAG_RESEARCH_TOKENS = int(os.getenv("RAG_RESEARCH_TOKENS", "300"))
+# Chroma (espacio "l2") devuelve la L2 al cuadrado; con vectores normalizados d = 2 - 2·coseno,
+# así que 1.0 deja pasar los chunks con similitud coseno >= 0.5
+RAG_MAX_DISTANCE = float(os.getenv("RAG_MAX_DISTANCE", "1.0"))
+
+def _build_queries(product):
+    """Arma las búsquedas web según el tipo de componente. Returns (queries, component_type)."""
     product_name = product.get("name", "")
     categories = product.get("categories", [])
     
@@ -47,39 +48,92 @@ def research_product(state):
         search_queries.append(f"{product_name} review")
         search_queries.append(f"{product_name} características español")
     
-    print(f"🌍 Searching web for: {search_queries}")
-    
-    research_data = []
+    return search_queries[:2], component_type
+
+
+def _search(query):
+    """Una búsqueda en DuckDuckGo (vía research_cache). Returns las líneas de resumen (vacío si falla)."""
+    lines = []
     try:
-        from duckduckgo_search import DDGS
-        ddgs = DDGS()
-        
-        for query in search_queries[:2]:
-            try:
-                # Use updated syntax for DuckDuckGo search (max_results instead of max_results param which changed)
-                results = list(ddgs.text(query, max_results=2))
-                if results:
-                    for r in results:
-                        research_data.append(f"- {r['title']}: {r['body'][:200]}")
-                        print(f"   found: {r['title'][:50]}...")
-                else:
-                    print(f"   no results for: {query}")
-            except Exception as e:
-                print(f"⚠️ Search error for '{query}': {e}")
-                
+        results = search_web(query, max_results=2, namespace="researcher")
+        if results:
+            for r in results:
+                lines.append(f"- {r['title']}: {r['body'][:200]}")
+                print(f"   found: {r['title'][:50]}...")
+        else:
+            print(f"   no results for: {query}")
     except Exception as e:
-        print(f"❌ General search error: {e} - Try 'pip install -U duckduckgo_search'")
-    
-    # Compile research summary (Web only)
-    if research_data:
-        research_summary = "\n".join(research_data[:4])  # Limit to 4 results
+        print(f"⚠️ Search error for '{query}': {e}")
+    return lines
+
+
+def _kb_query(product, component_type):
+    return f"{component_type or ''} {product.get('name', '')}".strip()
+
+
+def _search_kb(query):
+    """Consulta la base de conocimientos local (RAG). Returns las líneas de resumen (vacío si falla)."""
+    if not RAG_ENABLED:
+        return []
+    started = time.perf_counter()
+    results = query_rag(query, k=RAG_K)
+    relevant = [r for r in results if r["distance"] is None or r["distance"] <= RAG_MAX_DISTANCE]
+    lines = [f"- {' '.join(block.split())}" for block in pack_context(relevant, RAG_RESEARCH_TOKENS)]
+    print(f"📚 Knowledge base: {len(lines)} blocks from {len(relevant)}/{len(results)} results in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return lines
+
+
+def _summarize(product_name, component_type, research_data, kb_data=()):
+    if research_data or kb_data:
+        # Primero la base de conocimientos (verificada), después la web
+        research_summary = "\n".join(list(kb_data) + research_data[:4])  # Limit to 4 web results
     else:
         research_summary = f"Información general sobre {component_type or 'repuestos de notebook'}. Importante verificar compatibilidad con tu modelo específico."
     
     print(f"✅ Research completed for: {product_name}")
-    print(f"   Web results: {len(research_data)}")
+    print(f"   Web results: {len(research_data)} | KB results: {len(kb_data)}")
     
     return {
         "research_summary": research_summary,
         "status": "drafting"
     }
+
+
+def research_product(state):
+    """
+    Research tech topics related to the product.
+    Uses web search (DuckDuckGo) for product information.
+    """
+    print("--- [Node] Product/Tech Researcher ---")
+    
+    product = state.get("selected_product")
+    if not product:
+        return {"research_summary": "No product information available."}
+    
+    search_queries, component_type = _build_queries(product)
+    print(f"🌍 Searching web for: {search_queries}")
+    
+    research_data = []
+    for query in search_queries:
+        research_data.extend(_search(query))
+    kb_data = _search_kb(_kb_query(product, component_type))
+    
+    return _summarize(product.get("name", ""), component_type, research_data, kb_data)
+
+
+async def research_product_async(state):
+    """Variante async (app.ainvoke): las búsquedas corren en paralelo en threads."""
+    print("--- [Node] Product/Tech Researcher ---")
+    
+    product = state.get("selected_product")
+    if not product:
+        return {"research_summary": "No product information available."}
+    
+    search_queries, component_type = _build_queries(product)
+    print(f"🌍 Searching web for: {search_queries}")
+    
+    kb_task = asyncio.to_thread(_search_kb, _kb_query(product, component_type))
+    *results, kb_data = await asyncio.gather(*(asyncio.to_thread(_search, q) for q in search_queries), kb_task)
+    research_data = [line for lines in results for line in lines]
+    
+    return _summarize(product.get("name", ""), component_type, research_data, kb_data)
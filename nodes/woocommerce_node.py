@@ -1,9 +1,194 @@
-from woocommerce_client import get_recent_products, search_products, get_categories, get_products_by_category
+# Local catalog mirror (same interface as woocommerce_client, no REST round-trips per post)
+from product_catalog import get_recent_products, search_products, get_categories, get_products_by_category
+from product_catalog import product_catalog
+from product_search import rank_theme
+from draft_store import draft_store
 import random
+import asyncio
 import json
 import os
 from datetime import datetime, timedelta
 
+# Strategy Map
+# Sales Days: Tuesday (1), Friday (4), Wednesday (2 - Upgrade/Product)
+# Content Days: Monday (0), Thursday (3), Saturday (5), Sunday (6)
+SALES_DAYS = [1, 2, 4]
+CONTENT_DAYS = [0, 3, 5, 6]
+
+# Overrides for specific themes
+# 3 = Jueves (Humor) -> content
+# 0 = Lunes (Edu) -> content
+
+def target_date_for(now):
+    """Posts generados a la mañana salen hoy a las 18:00; los de la tarde, mañana a las 10:00."""
+    if now.hour < 12:
+        return now
+    return now + timedelta(days=1)
+
+def post_type_for(weekday):
+    return "sales" if weekday in SALES_DAYS else "content"
+
+def load_weekly_theme():
+    settings_path = os.path.join("brain", "settings.json")
+    weekly_theme = ""
+    if os.path.exists(settings_path):
+        try:
+            with open(settings_path, "r") as f:
+                settings = json.load(f)
+                weekly_theme = settings.get("weekly_theme", "").lower().strip()
+        except:
+            pass
+    return weekly_theme
+
+def find_theme_products(weekly_theme):
+    """PROMPT-DRIVEN PRODUCT SELECTION: productos en stock que matchean la temática semanal."""
+    available_products = []
+    
+    if weekly_theme and product_catalog.ensure_ready():
+        # BM25 + stemming + fuzzy sobre todo el catálogo local (product_search), mismo corte del 80%
+        available_products = rank_theme(weekly_theme)
+        if available_products:
+            print(f"Sniper found {len(available_products)} precise matches for '{weekly_theme}'.")
+        else:
+            print(f"No precise matches found for theme '{weekly_theme}'.")
+    elif weekly_theme:
+        # Sin espejo local: búsqueda remota (categorías + search) con el score por substrings
+        # V39.2 SNIPER SEARCH (Handle plurals & marketing fluff)
+        STOP_WORDS = ["semana", "de", "especial", "promo", "ofertas", "del", "dia", "mes", "gran", "super"]
+        theme_parts = [w.strip() for w in weekly_theme.lower().split() if w.strip() and w.strip() not in STOP_WORDS]
+        
+        # Normalization (Plurals)
+        search_variations = []
+        if theme_parts:
+            search_variations.append(" ".join(theme_parts)) # Original clean
+            # Try simple singularization (remove 's' at end)
+            singular_parts = [w[:-1] if w.endswith('s') and len(w) > 3 else w for w in theme_parts]
+            if singular_parts != theme_parts:
+                search_variations.append(" ".join(singular_parts))
+        
+        all_searched = []
+        
+        # --- CATEGORY SEARCH ---
+        print(f"Checking for category matching: '{weekly_theme}'")
+        categories = get_categories()
+        matched_category_ids = []
+        if categories:
+            for cat in categories:
+                cat_name_lower = cat.get('name', '').lower()
+                for query in search_variations:
+                    # Match if the query is in the category name, or category name is in query
+                    if query and len(query) > 3 and (query in cat_name_lower or cat_name_lower in query):
+                        matched_category_ids.append(cat['id'])
+                        print(f"Matched category: {cat.get('name')}")
+                        break
+                        
+        for cat_id in matched_category_ids:
+            print(f"Fetching products for matched category ID: {cat_id}")
+            cat_products = get_products_by_category(cat_id, limit=30)
+            if cat_products: 
+                all_searched.extend(cat_products)
+
+        # --- PRODUCT NAME SEARCH ---
+        for query in search_variations:
+            print(f"Sniper Attempt: '{query}'")
+            res = search_products(query, limit=30)
+            if res: all_searched.extend(res)
+        
+        # Remove duplicates by ID
+        seen_ids = set()
+        searched_products = []
+        for p in all_searched:
+            if p['id'] not in seen_ids:
+                searched_products.append(p)
+                seen_ids.add(p['id'])
+
+        # V39 Safety Filter
+        searched_products = [p for p in searched_products if p.get("stock_status") == "instock"]
+        
+        def get_match_score(product_name, product_cats, theme_parts):
+            text = (product_name + " " + " ".join(product_cats)).lower()
+            score = 0
+            matches_found = 0
+            for k in theme_parts:
+                k_singular = k[:-1] if k.endswith('s') and len(k) > 3 else k
+                # High weight for technical/short terms
+                if k in text or k_singular in text:
+                    matches_found += 1
+                    weight = 3.0 if len(k) <= 3 else 1.5
+                    if f" {k} " in f" {text} " or f" {k_singular} " in f" {text} ":
+                        weight *= 2.0
+                    score += weight
+            
+            # V39.2 STRICTURE: For multi-word themes, must match at least 50% of the words
+            if len(theme_parts) >= 2 and matches_found < (len(theme_parts) / 2):
+                return 0
+            return score
+
+        scored_products = []
+        for p in searched_products:
+            score = get_match_score(p.get("name", ""), p.get("categories", []), theme_parts)
+            if score > 0:
+                scored_products.append((score, p))
+        
+        scored_products.sort(key=lambda x: x[0], reverse=True)
+        
+        if scored_products:
+            max_score = scored_products[0][0]
+            # High cutoff to ensure NO fallback to rubbish
+            available_products = [p for s, p in scored_products if s >= (max_score * 0.8)]
+            print(f"Sniper found {len(available_products)} precise matches for '{weekly_theme}'.")
+        else:
+            print(f"No precise matches found for theme '{weekly_theme}'.")
+
+    return available_products
+
+def fetch_product_pool(weekly_theme=""):
+    """
+    Pool de productos candidatos: los de la temática semanal o, si no hay, los recientes en stock.
+    La usan el nodo (un post) y batch_generation (un pool para N posts).
+    """
+    # 2. PROMPT-DRIVEN PRODUCT SELECTION
+    available_products = find_theme_products(weekly_theme)
+
+    # 3. FALLBACK TO RECENT PRODUCTS (if no theme or no themed results)
+    if not available_products:
+        print("📦 Fetching recent products for pool...")
+        available_products = get_recent_products(days=180, limit=50)
+        available_products = [p for p in available_products if p.get("stock_status") == "instock"]
+        
+    if not available_products:
+        print("⚠️ Still no products. Trying year-long timeframe...")
+        available_products = get_recent_products(days=365, limit=50)
+        available_products = [p for p in available_products if p.get("stock_status") == "instock"]
+    return available_products
+
+def unpublished_products(available_products):
+    """Saca los productos ya publicados (archive) o en cola (drafts)."""
+    # Archive (published) + drafts (queued), from the draft index instead of parsing every JSON
+    published_ids = draft_store.published_product_ids()
+
+    final_pool = [p for p in available_products if str(p['id']) not in published_ids]
+    
+    if not final_pool:
+        print("⚠️ All available products already published. Resetting filter.")
+        final_pool = available_products
+    return final_pool
+
+def pick_products(n):
+    """
+    n productos distintos del pool para generaciones en paralelo (run_generations), igual que
+    batch_generation.assign_products: sin coordinar, cada corrida haría su random.choice y
+    podían salir repetidos. Si el pool es más chico que n, se repiten.
+    """
+    available_products = fetch_product_pool(load_weekly_theme())
+    if not available_products:
+        return []
+    final_pool = unpublished_products(available_products)
+    chosen = random.sample(final_pool, min(len(final_pool), n))
+    while len(chosen) < n:
+        chosen.extend(random.sample(final_pool, min(len(final_pool), n - len(chosen))))
+    return chosen
+
 def woocommerce_intake(state):
     """
     Fetch products and determine POST STRATEGY based on day of week.
@@ -11,177 +196,27 @@ def woocommerce_intake(state):
     print("--- [Node] WooCommerce / Content Strategy Strategy ---")
     try:
         # 1. Determine Date & Strategy
-        now = datetime.now()
-        if now.hour < 12:
-            target_date = now
-        else:
-            target_date = now + timedelta(days=1)
-            
+        target_date = target_date_for(datetime.now())
         weekday = target_date.weekday() # 0=Mon, 6=Sun
-        
-        # Strategy Map
-        # Sales Days: Tuesday (1), Friday (4), Wednesday (2 - Upgrade/Product)
-        # Content Days: Monday (0), Thursday (3), Saturday (5), Sunday (6)
-        
-        SALES_DAYS = [1, 2, 4] 
-        CONTENT_DAYS = [0, 3, 5, 6]
-        
-        if weekday in SALES_DAYS:
-            post_type = "sales"
-        else:
-            post_type = "content"
-            
-        # Overrides for specific themes
-        # 3 = Jueves (Humor) -> content
-        # 0 = Lunes (Edu) -> content
+        post_type = post_type_for(weekday)
         
         print(f"Target Date: {target_date.strftime('%A')} | Type: {post_type}")
 
+        # Producto ya reservado por run_generations (varias generaciones a la vez)
+        preset = state.get("selected_product")
+        if preset:
+            selected_product = dict(preset, post_type=post_type, target_weekday=weekday)
+            print(f"Preassigned product: {selected_product['name']} (Type: {post_type})")
+            return {"selected_product": selected_product, "status": "researching"}
+
         # --- THEME LOADING ---
-        settings_path = os.path.join("brain", "settings.json")
-        weekly_theme = ""
-        if os.path.exists(settings_path):
-            try:
-                with open(settings_path, "r") as f:
-                    settings = json.load(f)
-                    weekly_theme = settings.get("weekly_theme", "").lower().strip()
-            except:
-                pass
-
-        # 2. PROMPT-DRIVEN PRODUCT SELECTION
-        available_products = []
-        
-        if weekly_theme:
-            # V39.2 SNIPER SEARCH (Handle plurals & marketing fluff)
-            STOP_WORDS = ["semana", "de", "especial", "promo", "ofertas", "del", "dia", "mes", "gran", "super"]
-            theme_parts = [w.strip() for w in weekly_theme.lower().split() if w.strip() and w.strip() not in STOP_WORDS]
-            
-            # Normalization (Plurals)
-            search_variations = []
-            if theme_parts:
-                search_variations.append(" ".join(theme_parts)) # Original clean
-                # Try simple singularization (remove 's' at end)
-                singular_parts = [w[:-1] if w.endswith('s') and len(w) > 3 else w for w in theme_parts]
-                if singular_parts != theme_parts:
-                    search_variations.append(" ".join(singular_parts))
-            
-            all_searched = []
-            
-            # --- CATEGORY SEARCH ---
-            print(f"Checking for category matching: '{weekly_theme}'")
-            categories = get_categories()
-            matched_category_ids = []
-            if categories:
-                for cat in categories:
-                    cat_name_lower = cat.get('name', '').lower()
-                    for query in search_variations:
-                        # Match if the query is in the category name, or category name is in query
-                        if query and len(query) > 3 and (query in cat_name_lower or cat_name_lower in query):
-                            matched_category_ids.append(cat['id'])
-                            print(f"Matched category: {cat.get('name')}")
-                            break
-                            
-            for cat_id in matched_category_ids:
-                print(f"Fetching products for matched category ID: {cat_id}")
-                cat_products = get_products_by_category(cat_id, limit=30)
-                if cat_products: 
-                    all_searched.extend(cat_products)
-
-            # --- PRODUCT NAME SEARCH ---
-            for query in search_variations:
-                print(f"Sniper Attempt: '{query}'")
-                res = search_products(query, limit=30)
-                if res: all_searched.extend(res)
-            
-            # Remove duplicates by ID
-            seen_ids = set()
-            searched_products = []
-            for p in all_searched:
-                if p['id'] not in seen_ids:
-                    searched_products.append(p)
-                    seen_ids.add(p['id'])
-
-            # V39 Safety Filter
-            searched_products = [p for p in searched_products if p.get("stock_status") == "instock"]
-            
-            def get_match_score(product_name, product_cats, theme_parts):
-                text = (product_name + " " + " ".join(product_cats)).lower()
-                score = 0
-                matches_found = 0
-                for k in theme_parts:
-                    k_singular = k[:-1] if k.endswith('s') and len(k) > 3 else k
-                    # High weight for technical/short terms
-                    if k in text or k_singular in text:
-                        matches_found += 1
-                        weight = 3.0 if len(k) <= 3 else 1.5
-                        if f" {k} " in f" {text} " or f" {k_singular} " in f" {text} ":
-                            weight *= 2.0
-                        score += weight
-                
-                # V39.2 STRICTURE: For multi-word themes, must match at least 50% of the words
-                if len(theme_parts) >= 2 and matches_found < (len(theme_parts) / 2):
-                    return 0
-                return score
-
-            scored_products = []
-            for p in searched_products:
-                score = get_match_score(p.get("name", ""), p.get("categories", []), theme_parts)
-                if score > 0:
-                    scored_products.append((score, p))
-            
-            scored_products.sort(key=lambda x: x[0], reverse=True)
-            
-            if scored_products:
-                max_score = scored_products[0][0]
-                # High cutoff to ensure NO fallback to rubbish
-                available_products = [p for s, p in scored_products if s >= (max_score * 0.8)]
-                print(f"Sniper found {len(available_products)} precise matches for '{weekly_theme}'.")
-            else:
-                print(f"No precise matches found for theme '{weekly_theme}'.")
-
-        # 3. FALLBACK TO RECENT PRODUCTS (if no theme or no themed results)
-        if not available_products:
-            print("📦 Fetching recent products for pool...")
-            available_products = get_recent_products(days=180, limit=50)
-            available_products = [p for p in available_products if p.get("stock_status") == "instock"]
-            
-        if not available_products:
-            print("⚠️ Still no products. Trying year-long timeframe...")
-            available_products = get_recent_products(days=365, limit=50)
-            available_products = [p for p in available_products if p.get("stock_status") == "instock"]
+        available_products = fetch_product_pool(load_weekly_theme())
 
         if not available_products:
             return {"status": "error", "selected_product": None}
             
         # --- FILTER PUBLISHED PRODUCTS ---
-        published_ids = set()
-        archive_dir = os.path.join("brain", "archive")
-        if os.path.exists(archive_dir):
-            import glob
-            for arch_file in glob.glob(os.path.join(archive_dir, "*.json")):
-                try:
-                    with open(arch_file, "r", encoding="utf-8") as f:
-                        arch_data = json.load(f)
-                        p_id = arch_data.get("selected_product", {}).get("id")
-                        if p_id: published_ids.add(str(p_id))
-                except: continue
-        
-        # Also check current drafts
-        draft_dir = os.path.join("brain", "drafts")
-        if os.path.exists(draft_dir):
-            for draft_file in glob.glob(os.path.join(draft_dir, "*.json")):
-                try:
-                    with open(draft_file, "r", encoding="utf-8") as f:
-                        d_data = json.load(f)
-                        p_id = d_data.get("selected_product", {}).get("id")
-                        if p_id: published_ids.add(str(p_id))
-                except: continue
-
-        final_pool = [p for p in available_products if str(p['id']) not in published_ids]
-        
-        if not final_pool:
-            print("⚠️ All available products already published. Resetting filter.")
-            final_pool = available_products
+        final_pool = unpublished_products(available_products)
 
         # 4. Final Selection
         selected_product = random.choice(final_pool)
@@ -193,7 +228,7 @@ def woocommerce_intake(state):
         print(f"Final Selected product: {selected_product['name']} (Type: {post_type})")
         
         return {
-            "recent_products": available_products,
+            "recent_products": [p["id"] for p in available_products],  # Solo IDs: el detalle está en product_catalog
             "selected_product": selected_product,
             "status": "researching"
         }
@@ -203,3 +238,8 @@ def woocommerce_intake(state):
         import traceback
         traceback.print_exc()
         return {"status": "error"}
+
+
+async def woocommerce_intake_async(state):
+    """Variante async (app.ainvoke): las llamadas HTTP a WooCommerce corren en un thread."""
+    return await asyncio.to_thread(woocommerce_intake, state)
@@ -0,0 +1,313 @@
+"""
+product_catalog.py — Espejo local (SQLite) del catálogo de WooCommerce.
+
+- sync() trae solo los productos modificados desde la última sync (modified_after, con un
+  pequeño solapamiento), recorriendo todas las páginas y todos los estados (status=any),
+  así un producto despublicado o sin stock también se actualiza. status=any no trae la papelera:
+  la incremental pide además status=trash, para no seguir ofreciendo un producto borrado.
+  Cada CATALOG_FULL_SYNC_HOURS se hace una sync completa que además borra los que ya no existen.
+- La selección de productos del nodo de WooCommerce (categorías, búsqueda, recientes)
+  corre contra la copia local: get_recent_products / search_products / get_categories /
+  get_products_by_category tienen la misma firma y la misma forma de respuesta que los
+  de woocommerce_client, y caen a la API remota si el espejo todavía no se pudo poblar.
+- Refresco en background: start_background_refresh() (servidor) cada CATALOG_REFRESH_SECONDS;
+  en otros procesos (dashboard) una consulta con el espejo viejo dispara un refresco sin bloquear.
+- WAL + una conexión por llamada, igual que draft_store.
+"""
+
+import os
+import re
+import json
+import time
+import itertools
+import sqlite3
+import logging
+import unicodedata
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import woocommerce_client
+from security import sanitize_search_query, validate_product_id
+from product_record import ProductRecord
+
+logger = logging.getLogger("product_catalog")
+
+REFRESH_SECONDS = int(os.getenv("CATALOG_REFRESH_SECONDS", "900"))
+FULL_SYNC_HOURS = float(os.getenv("CATALOG_FULL_SYNC_HOURS", "24"))
+SYNC_OVERLAP_SECONDS = 60  # modified_after es estricto y con resolución de segundos
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    price TEXT,
+    regular_price TEXT,
+    sale_price TEXT,
+    description TEXT,
+    short_description TEXT,
+    categories TEXT,
+    images TEXT,
+    permalink TEXT,
+    status TEXT,
+    stock_status TEXT,
+    date_created TEXT,
+    date_modified_gmt TEXT,
+    search_text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_visible ON products (status, stock_status, date_created);
+CREATE TABLE IF NOT EXISTS product_categories (
+    product_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    name TEXT,
+    PRIMARY KEY (product_id, category_id)
+);
+CREATE INDEX IF NOT EXISTS idx_product_categories_cat ON product_categories (category_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = ("id, name, price, regular_price, sale_price, description, short_description, "
+            "categories, images, permalink, stock_status")
+_VISIBLE = "status = 'publish' AND stock_status = 'instock'"
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas y sin tildes (la búsqueda de WooCommerce/MySQL tampoco distingue acentos)."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _search_text(product: dict) -> str:
+    text = " ".join(str(product.get(k) or "") for k in ("name", "short_description", "description"))
+    return fold_text(_TAG_RE.sub(" ", text))
+
+
+def _row_from_api(product: dict) -> tuple:
+    rec = ProductRecord.from_api(product)
+    return (
+        rec.id, rec.name, rec.price, rec.regular_price, rec.sale_price,
+        product.get("description") or "", rec.short_description,
+        json.dumps(rec.categories, ensure_ascii=False), json.dumps(rec.images, ensure_ascii=False),
+        rec.permalink, product.get("status"), rec.stock_status,
+        product.get("date_created"), product.get("date_modified_gmt"), _search_text(product),
+    )
+
+
+def _record_from_row(row) -> ProductRecord:
+    (pid, name, price, regular_price, sale_price, description, short_description,
+     categories, images, permalink, stock_status) = row
+    return ProductRecord(
+        id=pid,
+        name=name or "",
+        price=price or "",
+        regular_price=regular_price or "",
+        sale_price=sale_price or "",
+        short_description=short_description or "",
+        categories=json.loads(categories or "[]"),
+        images=json.loads(images or "[]"),
+        permalink=permalink,
+        stock_status=stock_status,
+        _description=description or "",
+    )
+
+
+def _product_from_row(row) -> dict:
+    return _record_from_row(row).to_dict()
+
+
+class ProductCatalog:
+    def __init__(self, db_path: str = os.path.join("brain", "product_catalog.db")):
+        self.db_path = db_path
+        self._sync_lock = threading.Lock()
+        self._refresh_thread = None
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._ready = True
+        return conn
+
+    def _query(self, sql: str, params=()) -> list:
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _state(self, key: str) -> Optional[str]:
+        row = self._query("SELECT value FROM sync_state WHERE key = ?", (key,))
+        return row[0][0] if row else None
+
+    # --- Sync ---
+    def sync(self, full: bool = False) -> int:
+        """
+        Pone el espejo al día. Incremental (modified_after) salvo full=True o primera vez.
+        Returns la cantidad de productos actualizados. Lanza excepción si la API falla
+        (en ese caso no se toca nada: la marca de agua no avanza).
+        """
+        with self._sync_lock:
+            watermark = self._state("last_modified_gmt")
+            full = full or watermark is None
+            modified_after = None
+            if not full:
+                since = datetime.fromisoformat(watermark) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+                modified_after = since.isoformat()
+
+            started = time.time()
+            rows, category_rows = [], []
+            products = woocommerce_client.iter_all_products(modified_after)
+            if not full:
+                # Los enviados a la papelera quedan con status='trash' (no visibles) hasta la sync completa
+                products = itertools.chain(products, woocommerce_client.iter_all_products(modified_after, status="trash"))
+            for product in products:
+                rows.append(_row_from_api(product))
+                category_rows.extend(
+                    (product.get("id"), c.get("id"), c.get("name"))
+                    for c in product.get("categories", []) if isinstance(c, dict) and c.get("id") is not None)
+            latest = max([r[13] for r in rows if r[13]] + ([watermark] if watermark else []), default=None)
+
+            conn = self._connect()
+            try:
+                with conn:
+                    if full:
+                        conn.execute("DELETE FROM products")
+                        conn.execute("DELETE FROM product_categories")
+                    conn.executemany(f"INSERT OR REPLACE INTO products VALUES ({','.join('?' * 15)})", rows)
+                    ids = [(r[0],) for r in rows]
+                    conn.executemany("DELETE FROM product_categories WHERE product_id = ?", ids)
+                    conn.executemany("INSERT OR REPLACE INTO product_categories VALUES (?, ?, ?)", category_rows)
+                    state = {"last_sync_ts": str(time.time())}
+                    if latest:
+                        state["last_modified_gmt"] = latest
+                    if full:
+                        state["last_full_sync_ts"] = state["last_sync_ts"]
+                    conn.executemany("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", state.items())
+            finally:
+                conn.close()
+
+            logger.info(f"[Catalog] Sync {'completa' if full else 'incremental'}: "
+                        f"{len(rows)} productos en {time.time() - started:.1f}s")
+            return len(rows)
+
+    def _refresh(self):
+        try:
+            last_full = float(self._state("last_full_sync_ts") or 0)
+            self.sync(full=time.time() - last_full > FULL_SYNC_HOURS * 3600)
+        except Exception as e:
+            logger.error(f"[Catalog] Falló la sync: {e}")
+
+    def is_stale(self) -> bool:
+        last = self._state("last_sync_ts")
+        return last is None or time.time() - float(last) > REFRESH_SECONDS
+
+    def refresh_in_background(self):
+        """Lanza una sync en un thread si no hay una corriendo (no bloquea al caller)."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh, name="catalog-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def start_background_refresh(self, interval: int = REFRESH_SECONDS):
+        """Sync periódica en un thread daemon (la usa main_server)."""
+        def loop():
+            while True:
+                self._refresh()
+                time.sleep(interval)
+        threading.Thread(target=loop, name="catalog-refresh-loop", daemon=True).start()
+
+    def ensure_ready(self) -> bool:
+        """
+        True si se puede consultar el espejo. La primera vez sincroniza en el momento;
+        si está viejo, dispara un refresco en background y sigue con lo que hay.
+        """
+        if self._state("last_sync_ts") is None:
+            try:
+                self.sync(full=True)
+            except Exception as e:
+                logger.warning(f"[Catalog] Espejo vacío y la sync falló ({e}); se usa la API remota.")
+                return False
+        elif self.is_stale():
+            self.refresh_in_background()
+        return True
+
+    # --- Consultas (productos publicados y en stock, como los filtros de woocommerce_client) ---
+    def recent_products(self, days: int = 7, limit: int = 10) -> list:
+        threshold = (datetime.now() - timedelta(days=days)).isoformat()
+        rows = self._query(
+            f"SELECT {_COLUMNS} FROM products WHERE {_VISIBLE} AND date_created > ? "
+            "ORDER BY date_created DESC LIMIT ?", (threshold, limit))
+        return [_product_from_row(r) for r in rows]
+
+    def search(self, query: str, limit: int = 20) -> list:
+        terms = fold_text(sanitize_search_query(query)).split()
+        if not terms:
+            return []
+        where = " AND ".join("instr(search_text, ?) > 0" for _ in terms)
+        rows = self._query(
+            f"SELECT {_COLUMNS} FROM products WHERE {_VISIBLE} AND {where} "
+            "ORDER BY instr(substr(search_text, 1, length(name)), ?) = 0, date_created DESC LIMIT ?",
+            (*terms, terms[0], min(limit, 100)))
+        return [_product_from_row(r) for r in rows]
+
+    def categories(self) -> list:
+        rows = self._query(
+            "SELECT c.category_id, c.name, COUNT(*) FROM product_categories c "
+            "JOIN products p ON p.id = c.product_id WHERE p.status = 'publish' "
+            "GROUP BY c.category_id ORDER BY c.name")
+        return [{"id": cid, "name": name or "", "slug": "", "count": n} for cid, name, n in rows]
+
+    def products_by_category(self, category_id: int, limit: int = 50) -> list:
+        rows = self._query(
+            f"SELECT {_COLUMNS} FROM products WHERE {_VISIBLE} AND id IN "
+            "(SELECT product_id FROM product_categories WHERE category_id = ?) "
+            "ORDER BY date_created DESC LIMIT ?", (category_id, limit))
+        return [_product_from_row(r) for r in rows]
+
+    def visible_products(self) -> list:
+        """Todo el catálogo publicado y en stock, como ProductRecord con descripción (para product_search)."""
+        rows = self._query(f"SELECT {_COLUMNS} FROM products WHERE {_VISIBLE} ORDER BY id")
+        return [_record_from_row(r) for r in rows]
+
+    def last_sync(self) -> Optional[str]:
+        return self._state("last_sync_ts")
+
+    def get(self, product_id) -> Optional[dict]:
+        safe_id = validate_product_id(product_id)
+        if safe_id is None:
+            return None
+        rows = self._query(f"SELECT {_COLUMNS} FROM products WHERE id = ?", (safe_id,))
+        return _record_from_row(rows[0]).to_dict(include_description=True) if rows else None
+
+
+# Espejo compartido (ruta relativa a la raíz del proyecto, como el resto de brain/)
+product_catalog = ProductCatalog()
+
+
+# --- Misma interfaz que woocommerce_client, servida desde el espejo ---
+def get_recent_products(days=7, limit=10):
+    if not product_catalog.ensure_ready():
+        return woocommerce_client.get_recent_products(days=days, limit=limit)
+    return product_catalog.recent_products(days, limit)
+
+def search_products(query, limit=20):
+    if not product_catalog.ensure_ready():
+        return woocommerce_client.search_products(query, limit=limit)
+    return product_catalog.search(query, limit)
+
+def get_categories(limit=100):
+    if not product_catalog.ensure_ready():
+        return woocommerce_client.get_categories(limit=limit)
+    return product_catalog.categories()[:limit]
+
+def get_products_by_category(category_id, limit=50):
+    if not product_catalog.ensure_ready():
+        return woocommerce_client.get_products_by_category(category_id, limit=limit)
+    return product_catalog.products_by_category(category_id, limit)
@@ -0,0 +1,89 @@
+"""
+product_record.py — Proyección compacta de un producto de WooCommerce.
+
+- ProductRecord: dataclass con __slots__ con lo que usan el copywriter, los composers y el
+  dashboard (nombre, precios, categorías, imágenes, short_description...).
+- description (el HTML completo) es lazy: se guarda si vino en la respuesta (sync del
+  catálogo) y, si no, se busca a demanda (product_catalog local, después la API). No viaja
+  en el estado del grafo ni en los drafts.
+- from_api() / from_dict() / to_dict(): to_dict() es lo que va al estado y a los JSON.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Campos que viajan en el estado del grafo y en los drafts
+STATE_FIELDS = (
+    "id", "name", "price", "regular_price", "sale_price", "short_description",
+    "categories", "images", "permalink", "stock_status",
+)
+
+
+def _load_description(product_id, remote: bool = True) -> str:
+    from product_catalog import product_catalog
+    product = product_catalog.get(product_id)
+    if product is None and remote:
+        from woocommerce_client import get_product_by_id
+        product = get_product_by_id(product_id)
+    return (product or {}).get("description") or ""
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    id: int
+    name: str = ""
+    price: str = ""
+    regular_price: str = ""
+    sale_price: str = ""
+    short_description: str = ""
+    categories: list = field(default_factory=list)
+    images: list = field(default_factory=list)
+    permalink: Optional[str] = None
+    stock_status: Optional[str] = None
+    _description: Optional[str] = field(default=None, repr=False, compare=False)
+
+    @property
+    def description(self) -> str:
+        """HTML completo; se carga la primera vez que se pide si no vino con el producto."""
+        if self._description is None:
+            self._description = _load_description(self.id) if self.id else ""
+        return self._description
+
+    def local_description(self) -> str:
+        """Como description, pero solo del espejo local (sin ir a la API): para caminos interactivos."""
+        if self._description is not None:
+            return self._description
+        return _load_description(self.id, remote=False) if self.id else ""
+
+    @classmethod
+    def from_api(cls, product: dict) -> "ProductRecord":
+        """Desde la respuesta de la API REST (categorías e imágenes como objetos)."""
+        return cls(
+            id=product.get("id"),
+            name=product.get("name") or "",
+            price=product.get("price") or "",
+            regular_price=product.get("regular_price") or "",
+            sale_price=product.get("sale_price") or "",
+            short_description=product.get("short_description") or "",
+            categories=[c["name"] for c in product.get("categories", []) if isinstance(c, dict) and "name" in c],
+            images=[img["src"] for img in product.get("images", []) if isinstance(img, dict) and img.get("src")],
+            permalink=product.get("permalink"),
+            stock_status=product.get("stock_status"),
+            # Sin la clave (listados con _fields) queda lazy; con la clave, aunque venga vacía, no
+            _description=(product.get("description") or "") if "description" in product else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductRecord":
+        """Desde un dict ya proyectado (estado, draft, catálogo local)."""
+        return cls(
+            id=data.get("id"),
+            **{k: data[k] for k in STATE_FIELDS[1:] if data.get(k) is not None},
+            _description=data.get("description"),
+        )
+
+    def to_dict(self, include_description: bool = False) -> dict:
+        data = {k: getattr(self, k) for k in STATE_FIELDS}
+        if include_description:
+            data["description"] = self.description
+        return data
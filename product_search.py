@@ -0,0 +1,166 @@
+"""
+product_search.py — Índice BM25 en memoria sobre el catálogo local para la temática semanal.
+
+- Campos con peso: nombre (x3), categorías (x2), descripciones (x1); texto sin tildes ni HTML.
+- Stemming liviano para español (plurales y género: "Baterías" / "batería" / "bateria" -> "bateri")
+  y stop words (las del idioma + el relleno de marketing que antes filtraba el nodo).
+- Fuzzy por trigramas: un término del tema que no está en el vocabulario se expande a los
+  más parecidos (typos, palabras cortadas como "Semana de Bater"), con peso = similitud.
+- Mismas reglas de corte que el "sniper" V39.2: en temas de 2+ palabras el producto tiene que
+  matchear al menos la mitad, y se quedan los que tienen >= 80% del mejor score.
+- El índice se arma una vez por sync del product_catalog (se reconstruye si cambió last_sync).
+"""
+
+import re
+import math
+import logging
+import threading
+from collections import defaultdict
+
+from product_catalog import product_catalog, fold_text
+
+logger = logging.getLogger("product_search")
+
+FIELD_WEIGHTS = {"name": 3.0, "categories": 2.0, "description": 1.0}
+K1 = 1.2
+B = 0.75
+SCORE_CUTOFF = 0.8  # Misma tolerancia que el sniper: >= 80% del mejor score
+FUZZY_MIN_SIMILARITY = 0.3
+FUZZY_MAX_EXPANSIONS = 3
+
+STOP_WORDS = {
+    # Relleno de marketing de los temas semanales (lista original del nodo)
+    "semana", "especial", "promo", "ofertas", "oferta", "dia", "mes", "gran", "super",
+    # Español
+    "de", "del", "la", "las", "el", "los", "un", "una", "unos", "unas", "y", "o", "en", "con",
+    "para", "por", "a", "al", "su", "sus", "tu", "tus", "que", "se", "es", "sin", "mas", "muy",
+    "lo", "le", "les", "como", "nuestro", "nuestra", "todo", "toda", "todos", "todas",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def stem(word: str) -> str:
+    """Stemmer liviano: quita plural y vocal de género. 'cargadores' -> 'cargador', 'baterias' -> 'bateri'."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ces") and len(word) > 4:
+        word = word[:-3] + "z"
+    elif word.endswith("es") and len(word) > 4 and word[-3] not in "aeiou":
+        word = word[:-2]
+    elif word.endswith("s") and len(word) > 4:
+        word = word[:-1]
+    if len(word) > 4 and word[-1] in "aeo":
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list:
+    return [stem(w) for w in _WORD_RE.findall(fold_text(_TAG_RE.sub(" ", text or ""))) if w not in STOP_WORDS]
+
+
+def _trigrams(term: str) -> set:
+    padded = f"#{term}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductIndex:
+    def __init__(self, products: list):
+        """`products`: ProductRecord con la descripción ya cargada (product_catalog.visible_products)."""
+        self.products = products
+        self.postings = defaultdict(list)  # término -> [(doc, tf ponderado)]
+        self.doc_len = []
+        for doc, product in enumerate(products):
+            tf = defaultdict(float)
+            fields = {
+                "name": product.name,
+                "categories": " ".join(product.categories),
+                "description": f"{product.short_description} {product.description}",
+            }
+            for field, text in fields.items():
+                for term in tokenize(text):
+                    tf[term] += FIELD_WEIGHTS[field]
+            for term, weight in tf.items():
+                self.postings[term].append((doc, weight))
+            self.doc_len.append(sum(tf.values()))
+
+        n = len(products)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+        self.trigram_index = defaultdict(set)
+        for term in self.postings:
+            if len(term) > 3:
+                for tri in _trigrams(term):
+                    self.trigram_index[tri].add(term)
+
+    def expand(self, term: str) -> list:
+        """[(término del vocabulario, peso)]: el exacto, o los más parecidos por trigramas."""
+        if term in self.postings:
+            return [(term, 1.0)]
+        if len(term) <= 3:
+            return []
+        grams = _trigrams(term)
+        candidates = set()
+        for tri in grams:
+            candidates |= self.trigram_index.get(tri, set())
+        scored = []
+        for cand in candidates:
+            other = _trigrams(cand)
+            sim = len(grams & other) / len(grams | other)
+            if sim >= FUZZY_MIN_SIMILARITY:
+                scored.append((sim, cand))
+        scored.sort(reverse=True)
+        return [(cand, sim) for sim, cand in scored[:FUZZY_MAX_EXPANSIONS]]
+
+    def search(self, text: str, limit: int = None) -> list:
+        """Productos que matchean `text` ordenados por score BM25: [(score, ProductRecord)]."""
+        query = list(dict.fromkeys(tokenize(text)))
+        if not query:
+            return []
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        for term in query:
+            best = {}  # doc -> mejor aporte de este término (exacto o fuzzy)
+            for vocab_term, weight in self.expand(term):
+                idf = self.idf[vocab_term]
+                for doc, tf in self.postings[vocab_term]:
+                    norm = K1 * (1 - B + B * self.doc_len[doc] / self.avg_len)
+                    contrib = weight * idf * tf * (K1 + 1) / (tf + norm)
+                    if contrib > best.get(doc, 0.0):
+                        best[doc] = contrib
+            for doc, contrib in best.items():
+                scores[doc] += contrib
+                matched[doc] += 1
+
+        # V39.2 STRICTURE: For multi-word themes, must match at least 50% of the words
+        min_matches = len(query) / 2 if len(query) >= 2 else 1
+        results = [(s, self.products[d]) for d, s in scores.items() if matched[d] >= min_matches]
+        results.sort(key=lambda r: r[0], reverse=True)
+        return results[:limit] if limit else results
+
+
+_index = None
+_index_stamp = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Índice del catálogo local; se reconstruye cuando el product_catalog hizo una sync nueva."""
+    global _index, _index_stamp
+    stamp = product_catalog.last_sync()
+    with _index_lock:
+        if _index is None or stamp != _index_stamp:
+            _index = ProductIndex(product_catalog.visible_products())
+            _index_stamp = stamp
+            logger.info(f"[ProductSearch] Índice armado: {len(_index.products)} productos, {len(_index.postings)} términos")
+        return _index
+
+
+def rank_theme(weekly_theme: str, cutoff: float = SCORE_CUTOFF) -> list:
+    """Productos en stock para la temática (dicts compactos): los que tienen >= cutoff del mejor score."""
+    results = get_index().search(weekly_theme)
+    if not results:
+        return []
+    max_score = results[0][0]
+    return [p.to_dict() for s, p in results if s >= max_score * cutoff]
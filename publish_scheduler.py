@@ -0,0 +1,180 @@
+"""
+publish_scheduler.py — Motor de publicación por eventos (reemplaza el polling cada minuto).
+
+- Min-heap de drafts aprobados ordenado por horario de publicación (due_ts del draft_store).
+- El hilo duerme hasta el próximo vencimiento; se despierta antes si:
+    * alguien llama a notify() / request_wakeup() en el mismo proceso, o
+    * cambia brain/.publish_wakeup (el dashboard lo toca al aprobar o reprogramar) o el
+      directorio de drafts. Es un stat() de dos rutas cada PUBLISH_WATCH_SECONDS.
+- Cada pasada publica TODOS los drafts vencidos, no uno por tick, con límite de
+  concurrencia por plataforma (PUBLISH_LIMIT_INSTAGRAM / PUBLISH_LIMIT_TIKTOK).
+- Justo antes de publicar se vuelve a leer y validar el JSON (scheduler_service.load_approved_draft).
+"""
+
+import os
+import time
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from draft_store import draft_store
+from render_cache import file_fingerprint
+
+logger = logging.getLogger("publish_scheduler")
+
+WAKEUP_FILE = os.path.join("brain", ".publish_wakeup")
+WATCH_INTERVAL = float(os.getenv("PUBLISH_WATCH_SECONDS", "5"))
+PLATFORM_LIMITS = {
+    "instagram": int(os.getenv("PUBLISH_LIMIT_INSTAGRAM", "1")),
+    "tiktok": int(os.getenv("PUBLISH_LIMIT_TIKTOK", "1")),
+}
+
+_active = None  # PublishScheduler corriendo en este proceso (si hay)
+
+
+def request_wakeup():
+    """Avisa que hay drafts aprobados o reprogramados (sirve entre procesos: dashboard -> servidor)."""
+    try:
+        os.makedirs(os.path.dirname(WAKEUP_FILE), exist_ok=True)
+        with open(WAKEUP_FILE, "a"):
+            pass
+        os.utime(WAKEUP_FILE, None)
+    except OSError as e:
+        logger.warning(f"publish_scheduler: no se pudo tocar {WAKEUP_FILE}: {e}")
+    if _active is not None:
+        _active.notify()
+
+
+def platform_for(fmt) -> str:
+    return "tiktok" if fmt == "tiktok" else "instagram"
+
+
+def _default_load(path):
+    from scheduler_service import load_approved_draft
+    return load_approved_draft(path)
+
+
+def _default_publish(path, draft):
+    from scheduler_service import publish_draft
+    return publish_draft(path, draft)
+
+
+class PublishScheduler:
+    def __init__(self, publish_fn=None, load_fn=None, store=draft_store, limits=None, watch_interval=WATCH_INTERVAL):
+        self.publish_fn = publish_fn or _default_publish
+        self.load_fn = load_fn or _default_load
+        self.store = store
+        self.watch_interval = watch_interval
+        self._executors = {
+            platform: ThreadPoolExecutor(max_workers=max(1, n), thread_name_prefix=f"publish-{platform}")
+            for platform, n in (limits or PLATFORM_LIMITS).items()
+        }
+        self._heap = []  # (due_ts, sort_ts, path, format)
+        self._cond = threading.Condition()
+        self._dirty = True
+        self._stopped = False
+        self._inflight = set()
+        self._skipped = {}  # path -> huella del archivo cuando se descartó (no reintentar hasta que cambie)
+        self._watch_stamp = None
+        self._thread = None
+
+    # --- Señales ---
+    def notify(self):
+        with self._cond:
+            self._dirty = True
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for ex in self._executors.values():
+            ex.shutdown(wait=False)
+
+    def _watch_changed(self) -> bool:
+        stamp = (file_fingerprint(WAKEUP_FILE), file_fingerprint(self.store.folder_path("drafts")))
+        changed = stamp != self._watch_stamp
+        self._watch_stamp = stamp
+        return changed
+
+    # --- Cola ---
+    def _reload(self):
+        rows = self.store.approved_queue()
+        with self._cond:
+            heap = []
+            for due_ts, sort_ts, path, fmt in rows:
+                if path in self._inflight:
+                    continue
+                if path in self._skipped:
+                    if self._skipped[path] == file_fingerprint(path):
+                        continue
+                    del self._skipped[path]
+                heap.append((due_ts, sort_ts, path, fmt))
+            heapq.heapify(heap)
+            self._heap = heap
+
+    def _drain(self):
+        now = time.time()
+        with self._cond:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+            due.sort(key=lambda item: item[1])
+            for _, _, path, _ in due:
+                self._inflight.add(path)
+        if due:
+            logger.info(f"[Publisher] {len(due)} post(s) vencido(s): {', '.join(os.path.basename(d[2]) for d in due)}")
+        for _, _, path, fmt in due:
+            executor = self._executors.get(platform_for(fmt)) or self._executors["instagram"]
+            future = executor.submit(self._publish_one, path)
+            future.add_done_callback(lambda f, p=path: self._done(p))
+
+    def _publish_one(self, path):
+        draft = self.load_fn(path)
+        if draft is None:
+            return False
+        return self.publish_fn(path, draft)
+
+    def _done(self, path):
+        with self._cond:
+            self._inflight.discard(path)
+            # Si el draft sigue ahí (inválido, cancelado por la verificación de horario, ...) no se
+            # reintenta en loop: se espera a que el archivo cambie.
+            stamp = file_fingerprint(path)
+            if stamp is not None:
+                self._skipped[path] = stamp
+            self._dirty = True
+            self._cond.notify_all()
+
+    # --- Loop ---
+    def run_forever(self):
+        logger.info("[Publisher] Motor de publicación por eventos iniciado")
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+            try:
+                if self._watch_changed():
+                    self._dirty = True
+                if self._dirty:
+                    self._dirty = False
+                    self._reload()
+                self._drain()
+            except Exception as e:
+                logger.error(f"[Publisher] Error en el loop: {e}")
+
+            with self._cond:
+                if self._stopped or self._dirty:
+                    continue
+                timeout = self.watch_interval
+                if self._heap:
+                    timeout = min(timeout, max(0.0, self._heap[0][0] - time.time()))
+                self._cond.wait(timeout)
+
+    def start(self):
+        global _active
+        _active = self
+        self._thread = threading.Thread(target=self.run_forever, name="publish-scheduler", daemon=True)
+        self._thread.start()
+        return self
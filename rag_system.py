@@ -1,11 +1,55 @@
 import os
-import chromadb
-from chromadb.utils import embedding_functions
+import re
+import time
+import hashlib
+import threading
 from dotenv import load_dotenv
 import glob
 
+from embedding_service import embedding_service
+
 load_dotenv()
 
+RAG_PATH = "./brain/rag_knowledge"
+COLLECTION_NAME = "technical_knowledge"
+INGEST_BATCH_SIZE = int(os.getenv("RAG_INGEST_BATCH_SIZE", "256"))
+# Ventanas por debajo del max_seq_length de MiniLM (256): lo que pasa de ahí no se embebe
+CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "40"))
+CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "600"))
+
+_SUBSECTION_RE = re.compile(r"^###\s+(.+)$", re.M)
+
+# Cliente y colección compartidos por el proceso (antes se creaban en cada query_rag)
+_collection = None
+_collection_lock = threading.Lock()
+
+
+def get_collection():
+    """Colección de conocimiento técnico (abierta una vez). None si todavía no se corrió init_rag.py."""
+    global _collection
+    if _collection is not None:
+        return _collection
+    with _collection_lock:
+        if _collection is None:
+            try:
+                import chromadb
+                chroma_client = chromadb.PersistentClient(path=RAG_PATH)
+                # Sin embedding_function: los vectores los calcula siempre embedding_service
+                # (query_embeddings / embeddings=), así Chroma no instancia otro modelo
+                _collection = chroma_client.get_collection(name=COLLECTION_NAME)
+            except Exception as e:
+                print(f"⚠️ RAG collection not available: {e}")
+                return None
+    return _collection
+
+
+def warm_up():
+    """Carga el modelo de embeddings y abre la colección en background (lo llama main_server)."""
+    embedding_service.warm_up()
+    threading.Thread(target=get_collection, name="rag-warmup", daemon=True).start()
+
+
 # Initialize ChromaDB with embeddings (local by default)
 def initialize_rag_system():
     """
@@ -13,20 +57,17 @@ def initialize_rag_system():
     Uses local sentence-transformers embeddings (free, no API needed).
     """
     try:
-        # Use local embeddings (free, no API needed)
+        # Use local embeddings (free, no API needed): modelo compartido de embedding_service
         try:
-            from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
-            local_ef = SentenceTransformerEmbeddingFunction(
-                model_name="all-MiniLM-L6-v2"  # Small, fast, multilingual model
-            )
+            import sentence_transformers  # noqa: F401
         except ImportError:
             print("⚠️ sentence-transformers not installed. RAG initialization disabled.")
             return None
         
-        chroma_client = chromadb.PersistentClient(path="./brain/rag_knowledge")
+        import chromadb
+        chroma_client = chromadb.PersistentClient(path=RAG_PATH)
         collection = chroma_client.get_or_create_collection(
-            name="technical_knowledge",
-            embedding_function=local_ef,
+            name=COLLECTION_NAME,
             metadata={"description": "Technical knowledge about notebook parts and repairs"}
         )
         
@@ -37,9 +78,164 @@ def initialize_rag_system():
         print(f"❌ Error initializing RAG system: {e}")
         return None
 
+def split_sections(content):
+    """Parte un archivo de conocimiento por secciones (##). Returns [(título, texto)]."""
+    chunks = []
+    for i, section in enumerate(content.split('\n## ')):
+        if section.strip():
+            # Add back the ## if it's not the first section
+            if i > 0:
+                section = '## ' + section
+            # Extract section title (first line)
+            title = section.split('\n', 1)[0].replace('#', '').strip()
+            chunks.append((title, section))
+    return chunks
+
+
+def _content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def token_windows(text, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """
+    Ventanas de hasta `max_tokens` tokens del modelo que se solapan `overlap` tokens.
+    Si hay un salto de línea en el último tercio de la ventana, corta ahí (no a mitad de un ítem).
+    Returns [(inicio, fin)] en caracteres de `text`.
+    """
+    spans = embedding_service.token_spans(text)
+    if not spans:
+        return []
+    if len(spans) <= max_tokens:
+        return [(0, len(text))]
+    
+    windows = []
+    first = 0
+    while True:
+        last = min(first + max_tokens, len(spans))  # Exclusivo
+        if last < len(spans):
+            for j in range(last, first + max_tokens * 2 // 3, -1):
+                if "\n" in text[spans[j - 1][1]:spans[j][0]]:
+                    last = j
+                    break
+        start = spans[first][0] if first else 0
+        end = spans[last - 1][1] if last < len(spans) else len(text)
+        windows.append((start, end))
+        if last >= len(spans):
+            return windows
+        first = max(last - overlap, first + 1)
+
+
+def _subsection_at(text, start, end):
+    """Título ### vigente al inicio de la ventana (o el primero que aparece dentro)."""
+    title = ""
+    for m in _SUBSECTION_RE.finditer(text):
+        if m.start() <= start:
+            title = m.group(1).strip()
+        elif not title and m.start() < end:
+            return m.group(1).strip()
+        else:
+            break
+    return title
+
+
+def chunk_file(file_path, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """
+    Chunks de un archivo: cada sección (##) en ventanas por tokens con solapamiento,
+    con id direccionado por contenido: "<archivo>#<hash>".
+    Returns {id: (documento, metadata)}; un chunk que no cambió conserva su id.
+    """
+    filename = os.path.basename(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    chunks = {}
+    for i, (title, text) in enumerate(split_sections(content)):
+        for w, (start, end) in enumerate(token_windows(text, max_tokens, overlap)):
+            document = text[start:end]
+            if all(not line.strip() or line.lstrip().startswith("#") for line in document.splitlines()):
+                continue  # Solo títulos (p. ej. el "# ..." del encabezado del archivo)
+            digest = _content_hash(f"{title}\x00{document}")
+            chunk_id = f"{filename}#{digest[:16]}"
+            if chunk_id in chunks:
+                continue  # Texto repetido dentro del mismo archivo
+            chunks[chunk_id] = (document, {
+                "source": filename,
+                "section": title,
+                "subsection": _subsection_at(text, start, end),
+                "chunk_index": i,
+                "window": w,
+                "start": start,
+                "end": end,
+                "content_hash": digest,
+            })
+    return chunks
+
+
+def _embedding_text(document, metadata):
+    """Las ventanas que no arrancan en el título lo llevan adelante al embeberse (contexto)."""
+    if document.lstrip().startswith("#"):
+        return document
+    heading = " / ".join(t for t in (metadata["section"], metadata.get("subsection")) if t)
+    return f"{heading}\n{document}"
+
+
+_POSITION_KEYS = ("chunk_index", "window", "start", "end", "subsection")
+
+
+def sync_knowledge_base(collection, knowledge_dir="./brain/knowledge_base",
+                        max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP):
+    """
+    Ingesta incremental e idempotente de `knowledge_dir` en la colección.
+    
+    - Solo se embeben los chunks nuevos o modificados (por content_hash), en lotes de INGEST_BATCH_SIZE.
+    - Un chunk que solo cambió de posición actualiza su metadata sin re-embeber.
+    - Se borran los chunks que ya no existen, incluidos los de archivos eliminados
+      (y los ids del formato viejo "<archivo>_<i>").
+    
+    Returns dict con added / moved / deleted / unchanged / files.
+    """
+    txt_files = sorted(glob.glob(os.path.join(knowledge_dir, "*.txt")))
+    wanted = {}
+    for file_path in txt_files:
+        wanted.update(chunk_file(file_path, max_tokens, overlap))
+    
+    existing = collection.get(include=["metadatas"])
+    current = dict(zip(existing["ids"], existing["metadatas"] or [{}] * len(existing["ids"])))
+    
+    to_add = [cid for cid in wanted if cid not in current]
+    to_delete = [cid for cid in current if cid not in wanted]
+    moved = [cid for cid in wanted if cid in current
+             and any((current[cid] or {}).get(key) != wanted[cid][1][key] for key in _POSITION_KEYS)]
+    
+    if to_delete:
+        for i in range(0, len(to_delete), INGEST_BATCH_SIZE):
+            collection.delete(ids=to_delete[i:i + INGEST_BATCH_SIZE])
+    
+    for i in range(0, len(to_add), INGEST_BATCH_SIZE):
+        batch = to_add[i:i + INGEST_BATCH_SIZE]
+        collection.upsert(
+            ids=batch,
+            documents=[wanted[cid][0] for cid in batch],
+            metadatas=[wanted[cid][1] for cid in batch],
+            embeddings=embedding_service.encode([_embedding_text(*wanted[cid]) for cid in batch])
+        )
+    
+    if moved:
+        collection.update(ids=moved, metadatas=[wanted[cid][1] for cid in moved])
+    
+    return {
+        "files": len(txt_files),
+        "added": len(to_add),
+        "moved": len(moved),
+        "deleted": len(to_delete),
+        "unchanged": len(wanted) - len(to_add) - len(moved),
+    }
+
+
 def load_knowledge_base(collection, knowledge_dir="./brain/knowledge_base"):
     """
     Load all text files from knowledge_base directory into ChromaDB.
+    Se puede correr de nuevo cuantas veces se quiera: solo procesa lo que cambió.
     
     Args:
         collection: ChromaDB collection
@@ -50,57 +246,16 @@ def load_knowledge_base(collection, knowledge_dir="./brain/knowledge_base"):
         return False
     
     try:
-        # Find all .txt files in knowledge_base directory
-        txt_files = glob.glob(os.path.join(knowledge_dir, "*.txt"))
-        
-        if not txt_files:
+        # Sin archivos igual se sincroniza: borra los chunks de los que se eliminaron
+        if not glob.glob(os.path.join(knowledge_dir, "*.txt")):
             print(f"⚠️ No .txt files found in {knowledge_dir}")
-            return False
-        
-        print(f"\n📚 Loading {len(txt_files)} knowledge files...")
         
-        for file_path in txt_files:
-            filename = os.path.basename(file_path)
-            print(f"  Loading: {filename}...")
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Split content into chunks (by sections marked with ##)
-            sections = content.split('\n## ')
-            
-            documents = []
-            metadatas = []
-            ids = []
-            
-            for i, section in enumerate(sections):
-                if section.strip():
-                    # Add back the ## if it's not the first section
-                    if i > 0:
-                        section = '## ' + section
-                    
-                    # Extract section title (first line)
-                    lines = section.split('\n', 1)
-                    title = lines[0].replace('#', '').strip()
-                    
-                    documents.append(section)
-                    metadatas.append({
-                        "source": filename,
-                        "section": title,
-                        "chunk_index": i
-                    })
-                    ids.append(f"{filename}_{i}")
-            
-            # Add to collection
-            if documents:
-                collection.add(
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                print(f"    ✅ Added {len(documents)} sections from {filename}")
+        started = time.time()
+        result = sync_knowledge_base(collection, knowledge_dir)
         
-        print(f"\n✅ Knowledge base loaded successfully!")
+        print(f"\n✅ Knowledge base synced in {time.time() - started:.1f}s: {result['files']} files, "
+              f"{result['added']} chunks embedded, {result['moved']} moved, "
+              f"{result['deleted']} deleted, {result['unchanged']} unchanged")
         print(f"   Total documents in collection: {collection.count()}")
         return True
         
@@ -125,21 +280,13 @@ def query_rag(query, k=3, collection=None):
     """
     try:
         if collection is None:
-            # Initialize with local embeddings
-            try:
-                from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
-                local_ef = SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-                chroma_client = chromadb.PersistentClient(path="./brain/rag_knowledge")
-                collection = chroma_client.get_collection(
-                    name="technical_knowledge",
-                    embedding_function=local_ef
-                )
-            except ImportError:
-                print("⚠️ sentence-transformers not installed. Cannot query RAG.")
+            collection = get_collection()
+            if collection is None:
                 return []
         
+        # El embedding se calcula en embedding_service (micro-batch con las consultas concurrentes)
         results = collection.query(
-            query_texts=[query],
+            query_embeddings=embedding_service.encode([query]),
             n_results=k
         )
         
@@ -149,11 +296,15 @@ def query_rag(query, k=3, collection=None):
         # Format results
         formatted_results = []
         for i, doc in enumerate(results['documents'][0]):
-            metadata = results['metadatas'][0][i] if results['metadatas'] else {}
+            metadata = (results['metadatas'][0][i] if results['metadatas'] else None) or {}
             formatted_results.append({
                 "content": doc,
                 "source": metadata.get("source", "unknown"),
                 "section": metadata.get("section", "unknown"),
+                "subsection": metadata.get("subsection", ""),
+                "chunk_index": metadata.get("chunk_index"),
+                "start": metadata.get("start"),
+                "end": metadata.get("end"),
                 "distance": results['distances'][0][i] if results.get('distances') else None
             })
         
@@ -163,13 +314,72 @@ def query_rag(query, k=3, collection=None):
         print(f"⚠️ RAG query failed: {e}")
         return []
 
-def get_rag_context(query, k=3):
+def _uncovered(intervals, start, end):
+    """Partes de [start, end) que no cubre ninguno de `intervals`."""
+    pieces = [(start, end)]
+    for s0, e0 in intervals:
+        pieces = [p for a, b in pieces for p in ((a, min(b, s0)), (max(a, e0), b)) if p[0] < p[1]]
+    return pieces
+
+
+def pack_context(results, token_budget=CONTEXT_TOKENS):
+    """
+    Empaqueta los chunks de `results` (en orden de relevancia) en `token_budget` tokens.
+    
+    - Un chunk entero o nada: si no entra, se prueba con el siguiente (más chico).
+    - Ventanas de la misma sección se unen en un solo bloque sin repetir el solapamiento,
+      que tampoco se cuenta dos veces en el presupuesto.
+    
+    Returns lista de bloques "[Fuente: archivo - sección]\ntexto" en orden de relevancia.
+    """
+    groups = {}  # (source, chunk_index) -> {"header", "windows": [(start, end, texto)]}
+    used = 0
+    for n, r in enumerate(results):
+        start, end = r.get("start"), r.get("end")
+        key = (r["source"], r["chunk_index"]) if start is not None else (r["source"], f"#{n}")
+        group = groups.get(key)
+        if group is None:
+            header = f"[Fuente: {r['source']} - {r['section']}]"
+            cost = embedding_service.count_tokens(header)
+            new_text = r["content"]
+        else:
+            header = None
+            cost = 0
+            pieces = _uncovered([(s0, e0) for s0, e0, _ in group["windows"]], start, end)
+            new_text = " ".join(r["content"][a - start:b - start] for a, b in pieces)
+        if not new_text.strip():
+            continue  # Ya está cubierto por otra ventana
+        cost += embedding_service.count_tokens(new_text)
+        if used + cost > token_budget:
+            continue
+        used += cost
+        if group is None:
+            group = groups[key] = {"header": header, "windows": []}
+        group["windows"].append((start or 0, end or len(r["content"]), r["content"]))
+    
+    blocks = []
+    for group in groups.values():
+        text, pos = "", None
+        for start, end, content in sorted(group["windows"], key=lambda w: w[0]):
+            if pos is None:
+                text = content
+            elif start > pos:
+                text += "\n[...]\n" + content
+            elif end > pos:
+                text += content[pos - start:]
+            pos = end if pos is None else max(pos, end)
+        blocks.append(f"{group['header']}\n{text.strip()}")
+    return blocks
+
+
+def get_rag_context(query, k=6, token_budget=CONTEXT_TOKENS):
     """
     Get RAG context as a formatted string for use in prompts.
     
     Args:
         query: Search query
-        k: Number of results to return
+        k: Number of candidate chunks to retrieve
+        token_budget: Tokens (del tokenizer del modelo de embeddings) para todo el contexto
     
     Returns:
         Formatted string with relevant knowledge
@@ -179,13 +389,7 @@ def get_rag_context(query, k=3):
     if not results:
         return "No relevant technical information found in knowledge base."
     
-    context_parts = []
-    for i, result in enumerate(results, 1):
-        context_parts.append(
-            f"[Fuente: {result['source']} - {result['section']}]\n{result['content'][:500]}..."
-        )
-    
-    return "\n\n".join(context_parts)
+    return "\n\n".join(pack_context(results, token_budget))
 
 if __name__ == "__main__":
     print("=" * 80)
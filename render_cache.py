@@ -0,0 +1,140 @@
+"""
+render_cache.py — Caché en disco, direccionado por contenido, para imágenes compuestas.
+
+- La clave es un hash SHA-256 de todo lo que define el resultado (ver make_key).
+- Un hit devuelve directamente la ruta del archivo cacheado.
+- Política LRU: cada hit actualiza el mtime; al superar `max_bytes` se borran
+  primero las entradas usadas hace más tiempo.
+- Escrituras atómicas (archivo temporal + os.replace), seguro entre el scheduler
+  y el proceso de Streamlit.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger("render_cache")
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_key(*parts) -> str:
+    """Hash estable de las partes (dicts se serializan con claves ordenadas)."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            h.update(part)
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def file_fingerprint(path: Optional[str]):
+    """Identidad barata de un archivo local: (mtime_ns, tamaño) o None si no existe."""
+    try:
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+    except (OSError, TypeError):
+        return None
+
+
+def file_digest(path: str) -> Optional[str]:
+    """SHA-256 del contenido de un archivo (para imágenes subidas por el usuario)."""
+    try:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+    except OSError:
+        return None
+
+
+class RenderCache:
+    def __init__(self, cache_dir: str, max_bytes: int, ext: str = ".png"):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ext = ext
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.ext)
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            os.utime(path, None)  # LRU: marcar como usado recientemente
+        except OSError:
+            return None
+        return path
+
+    def put(self, key: str, src_path: str) -> Optional[str]:
+        """Copia `src_path` dentro del caché bajo `key` y aplica la evicción por tamaño."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            dst = self._path(key)
+            tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(src_path, tmp)
+            os.replace(tmp, dst)
+        except Exception as e:
+            logger.warning(f"render_cache: no se pudo guardar '{key}': {e}")
+            return None
+        self.evict()
+        return dst
+
+    def put_bytes(self, key: str, data: bytes) -> Optional[str]:
+        """Igual que put() pero desde memoria."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            dst = self._path(key)
+            tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, dst)
+        except Exception as e:
+            logger.warning(f"render_cache: no se pudo guardar '{key}': {e}")
+            return None
+        self.evict()
+        return dst
+
+    def evict(self):
+        """Borra las entradas menos usadas hasta quedar por debajo de `max_bytes`."""
+        with self._lock:
+            try:
+                entries = []
+                total = 0
+                with os.scandir(self.cache_dir) as it:
+                    for entry in it:
+                        if not entry.name.endswith(self.ext) or not entry.is_file():
+                            continue
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                        total += st.st_size
+                if total <= self.max_bytes:
+                    return
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except OSError:
+                        pass
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+# Caché de posts compuestos por image_composer.create_social_post
+POST_CACHE_DIR = os.path.join(_BASE_DIR, "brain", "cache", "posts")
+post_cache = RenderCache(POST_CACHE_DIR, max_bytes=int(os.getenv("POST_CACHE_MAX_MB", "200")) * 1024 * 1024)
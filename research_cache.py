@@ -0,0 +1,207 @@
+"""
+research_cache.py — Caché persistente (SQLite) de búsquedas web para el investigador.
+
+- La clave es (namespace, consulta normalizada): minúsculas, sin tildes y con los espacios
+  colapsados, así "Batería  Notebook" y "bateria notebook" comparten entrada.
+- TTL configurable (RESEARCH_CACHE_TTL_HOURS, o `ttl` por llamada). Vencida la entrada, durante
+  RESEARCH_CACHE_STALE_HOURS se sigue devolviendo el valor viejo y se revalida en un thread
+  (stale-while-revalidate): el grafo no espera a DuckDuckGo por algo que ya tiene.
+- Caché negativo: un resultado vacío se guarda con un TTL corto (RESEARCH_CACHE_NEGATIVE_TTL_MINUTES)
+  para no repetir búsquedas que no traen nada. Los errores (excepción del fetch) no se guardan.
+- Contadores de hits / stale / negativos / misses / errores por namespace: stats().
+- Lo comparten nodes/researcher_node._search, spotify_client.get_top_5_from_web y
+  agent_logic.research_artist (vía search_web).
+- WAL + una conexión por llamada, igual que draft_store.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import unicodedata
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger("research_cache")
+
+TTL_SECONDS = float(os.getenv("RESEARCH_CACHE_TTL_HOURS", "72")) * 3600
+STALE_SECONDS = float(os.getenv("RESEARCH_CACHE_STALE_HOURS", "168")) * 3600
+NEGATIVE_TTL_SECONDS = float(os.getenv("RESEARCH_CACHE_NEGATIVE_TTL_MINUTES", "60")) * 60
+ENABLED = os.getenv("RESEARCH_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS research_cache (
+    namespace TEXT NOT NULL,
+    query TEXT NOT NULL,
+    value TEXT NOT NULL,
+    empty INTEGER NOT NULL,
+    fetched_ts REAL NOT NULL,
+    expires_ts REAL NOT NULL,
+    PRIMARY KEY (namespace, query)
+);
+CREATE INDEX IF NOT EXISTS idx_research_cache_expires ON research_cache (expires_ts);
+"""
+
+_COUNTERS = ("hits", "stale_hits", "negative_hits", "misses", "errors", "revalidations")
+
+
+def normalize_query(query: str) -> str:
+    """Minúsculas, sin tildes y espacios colapsados."""
+    text = unicodedata.normalize("NFKD", (query or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.split())
+
+
+class ResearchCache:
+    def __init__(self, db_path: str = os.path.join("brain", "research_cache.db"),
+                 ttl: float = TTL_SECONDS, stale: float = STALE_SECONDS,
+                 negative_ttl: float = NEGATIVE_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.stale = stale
+        self.negative_ttl = negative_ttl
+        self._ready = False
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._stats = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Limpieza al abrir: lo que ya no sirve ni como stale
+            with conn:
+                conn.execute("DELETE FROM research_cache WHERE expires_ts < ?", (time.time() - self.stale,))
+            self._ready = True
+        return conn
+
+    def _count(self, namespace: str, counter: str):
+        with self._lock:
+            st = self._stats.setdefault(namespace, dict.fromkeys(_COUNTERS, 0))
+            st[counter] += 1
+
+    def stats(self) -> dict:
+        """Contadores por namespace desde que arrancó el proceso, con hit_rate."""
+        with self._lock:
+            out = {}
+            for namespace, st in self._stats.items():
+                served = st["hits"] + st["stale_hits"] + st["negative_hits"]
+                total = served + st["misses"]
+                out[namespace] = dict(st, hit_rate=served / total if total else 0.0)
+            return out
+
+    # --- Lectura / escritura ---
+    def get(self, namespace: str, query: str):
+        """Entrada cruda: (value, empty, expires_ts) o None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value, empty, expires_ts FROM research_cache WHERE namespace = ? AND query = ?",
+                (namespace, normalize_query(query))).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return json.loads(row[0]), bool(row[1]), row[2]
+
+    def put(self, namespace: str, query: str, value, ttl: Optional[float] = None):
+        """Guarda `value` (JSON-serializable). Vacío -> TTL negativo."""
+        empty = not value
+        now = time.time()
+        expires = now + (self.negative_ttl if empty else (self.ttl if ttl is None else ttl))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO research_cache VALUES (?, ?, ?, ?, ?, ?)",
+                             (namespace, normalize_query(query), json.dumps(value, ensure_ascii=False),
+                              int(empty), now, expires))
+        except sqlite3.Error as e:
+            logger.warning(f"[ResearchCache] No se pudo guardar '{query}': {e}")
+        finally:
+            conn.close()
+
+    def invalidate(self, namespace: Optional[str] = None):
+        conn = self._connect()
+        try:
+            with conn:
+                if namespace is None:
+                    conn.execute("DELETE FROM research_cache")
+                else:
+                    conn.execute("DELETE FROM research_cache WHERE namespace = ?", (namespace,))
+        finally:
+            conn.close()
+
+    # --- API principal ---
+    def _revalidate(self, namespace: str, query: str, fetch: Callable, ttl: Optional[float]):
+        key = (namespace, normalize_query(query))
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self.put(namespace, query, fetch(), ttl)
+                self._count(namespace, "revalidations")
+            except Exception as e:
+                # Se sigue sirviendo el valor viejo hasta que termine la ventana stale
+                self._count(namespace, "errors")
+                logger.warning(f"[ResearchCache] Falló la revalidación de '{query}': {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, name="research-revalidate", daemon=True).start()
+
+    def get_or_fetch(self, namespace: str, query: str, fetch: Callable, ttl: Optional[float] = None):
+        """
+        Devuelve el valor cacheado de `query` o llama a `fetch()` (sin argumentos) y lo guarda.
+        Si `fetch` lanza excepción no se guarda nada y la excepción se propaga.
+        """
+        if not ENABLED:
+            return fetch()
+        entry = self.get(namespace, query)
+        now = time.time()
+        if entry is not None:
+            value, empty, expires = entry
+            if now < expires:
+                self._count(namespace, "negative_hits" if empty else "hits")
+                return value
+            if not empty and now < expires + self.stale:
+                self._count(namespace, "stale_hits")
+                self._revalidate(namespace, query, fetch, ttl)
+                return value
+
+        self._count(namespace, "misses")
+        try:
+            value = fetch()
+        except Exception:
+            self._count(namespace, "errors")
+            raise
+        self.put(namespace, query, value, ttl)
+        return value
+
+
+research_cache = ResearchCache()
+
+
+def search_web(query: str, max_results: int = 3, namespace: str = "web", ttl: Optional[float] = None) -> list:
+    """
+    DuckDuckGo text search cacheado. Returns [{"title", "body", "href"}].
+    Lanza excepción si la búsqueda falla y no hay nada en caché.
+    """
+    def fetch():
+        from duckduckgo_search import DDGS
+        with DDGS() as ddgs:
+            results = list(ddgs.text(query, max_results=max_results))
+        return [{"title": r.get("title", ""), "body": r.get("body", ""), "href": r.get("href", "")}
+                for r in results]
+
+    return research_cache.get_or_fetch(namespace, f"{max_results}|{query}", fetch, ttl)
+
+
+def get_stats() -> dict:
+    return research_cache.stats()
@@ -2,7 +2,6 @@ import schedule
 import time
 import os
 import json
-import glob
 import sys
 import logging
 import pytz
@@ -18,10 +17,10 @@ from security import (
     ALLOWED_DIRS,
 )
 
-# Import publisher logic
-from instagram_client import publish_instagram_post, publish_instagram_reel, get_instagram_client
-from instagram_browser_publisher import publish_instagram_post_browser
-from tiktok_client import publish_tiktok_video
+from draft_store import draft_store, parse_publish_time
+
+# Los publishers (instagrapi, Playwright, TikTok) se importan recién al publicar:
+# el scheduler arranca sin cargarlos.
 
 load_dotenv()
 
@@ -42,6 +41,37 @@ ERROR_DIR = "./brain/errors"
 os.makedirs(ARCHIVE_DIR, exist_ok=True)
 os.makedirs(ERROR_DIR, exist_ok=True)
 
+def load_approved_draft(f):
+    """Lee y valida un draft. Returns el dict si es seguro, válido y sigue aprobado; si no, None."""
+    # ── SEGURIDAD: Verificar que el archivo esté dentro del directorio de drafts ──
+    if not is_safe_path(DRAFT_DIR, f):
+        logger.error(f"[SECURITY ALERT] Path traversal bloqueado en draft: '{f}'")
+        return None
+
+    try:
+        with open(f, "r", encoding="utf-8") as json_file:
+            data = json.load(json_file)
+
+        # ── SEGURIDAD: Validar schema y rutas del draft ──
+        is_valid, validation_errors = validate_draft_json(data, f)
+        if not is_valid:
+            logger.warning(
+                f"[Scheduler] Draft inválido, se omite: {os.path.basename(f)} — Errores: {validation_errors}"
+            )
+            return None
+
+        if data.get("approval_status") == "approved":
+            publish_time_iso = data.get("publish_time_iso")
+            if publish_time_iso and parse_publish_time(publish_time_iso) is None:
+                logger.warning(f"[Scheduler]   publish_time_iso inválido en '{f}': {publish_time_iso}")
+            return data
+            
+    except json.JSONDecodeError as je:
+        logger.error(f"[Scheduler]   JSON malformado en '{f}': {je}")
+    except Exception as e:
+        logger.error(f"[Scheduler]   Error leyendo '{f}': {e}")
+    return None
+
 def job_publish_pending():
     now_ar = get_now_ar()
     print(f"\n[Scheduler] Checking for approved posts at {now_ar.strftime('%Y-%m-%d %H:%M:%S')} (AR)...")
@@ -51,66 +81,18 @@ def job_publish_pending():
         print(f"[Scheduler] Draft directory {DRAFT_DIR} not found.")
         return
 
-    files = glob.glob(os.path.join(DRAFT_DIR, "*.json"))
+    # Approved drafts whose time has come, sorted by scheduled time (ASAP drafts by mtime)
     approved_files = []
-    
-    # Iterar archivos aprobados y verificar tiempo
-    for f in files:
-        # ── SEGURIDAD: Verificar que el archivo esté dentro del directorio de drafts ──
-        if not is_safe_path(DRAFT_DIR, f):
-            logger.error(f"[SECURITY ALERT] Path traversal bloqueado en draft: '{f}'")
-            continue
-
-        try:
-            with open(f, "r", encoding="utf-8") as json_file:
-                data = json.load(json_file)
-
-            # ── SEGURIDAD: Validar schema y rutas del draft ──
-            is_valid, validation_errors = validate_draft_json(data, f)
-            if not is_valid:
-                logger.warning(
-                    f"[Scheduler] Draft inválido, se omite: {os.path.basename(f)} — Errores: {validation_errors}"
-                )
-                continue
-
-            if data.get("approval_status") == "approved":
-                # Verificar si es un post futuro
-                publish_time_iso = data.get("publish_time_iso")
-                if publish_time_iso:
-                    try:
-                        scheduled_dt = datetime.fromisoformat(publish_time_iso)
-                        if scheduled_dt.tzinfo is None:
-                            scheduled_dt = AR_TZ.localize(scheduled_dt)
-                        
-                        if now_ar < scheduled_dt:
-                            # SKIP posts futuros
-                            logger.info(f"[Scheduler]   WAIT: {os.path.basename(f)} para {scheduled_dt.strftime('%H:%M')} (Faltan: {scheduled_dt - now_ar})")
-                            continue
-                    except ValueError as ve:
-                        logger.warning(f"[Scheduler]   publish_time_iso inválido en '{f}': {ve}")
-                        
-                approved_files.append((f, data))
-                
-        except json.JSONDecodeError as je:
-            logger.error(f"[Scheduler]   JSON malformado en '{f}': {je}")
-        except Exception as e:
-            logger.error(f"[Scheduler]   Error leyendo '{f}': {e}")
-            
-    # Sort candidates: prioritize those with a publish_time_iso (scheduled) 
-    # and then by the scheduled time itself.
-    def get_sort_key(item):
-        path, data = item
-        p_time = data.get("publish_time_iso")
-        if p_time:
-            try:
-                return datetime.fromisoformat(p_time).timestamp()
-            except ValueError:
-                return 9999999999  # Fallback para fechas inválidas
-        return os.path.getmtime(path)  # Fallback al mtime del archivo
-
-    approved_files.sort(key=get_sort_key)
+    for f, _ in draft_store.due_approved_drafts(now_ar.timestamp()):
+        data = load_approved_draft(f)
+        if data is not None:
+            approved_files.append((f, data))
     
     if not approved_files:
+        next_ts = draft_store.next_approved_due_ts(now_ar.timestamp())
+        if next_ts:
+            next_dt = datetime.fromtimestamp(next_ts, AR_TZ)
+            logger.info(f"[Scheduler]   WAIT: próximo post aprobado para {next_dt.strftime('%d/%m %H:%M')} (Faltan: {next_dt - now_ar})")
         return
 
     # Pick the first one (most urgent/oldest scheduled)
@@ -119,6 +101,14 @@ def job_publish_pending():
     print(f"[Scheduler]   Scheduled: {draft.get('publish_time_iso', 'ASAP')}")
     print(f"[Scheduler]   Current AR: {now_ar.strftime('%Y-%m-%d %H:%M:%S')}")
     
+    publish_draft(file_path, draft)
+
+def publish_draft(file_path, draft):
+    """
+    Compone, publica y archiva (o manda a errors/) un draft ya validado.
+    Returns True si se publicó. Lo usan job_publish_pending y publish_scheduler.
+    """
+    now_ar = get_now_ar()
     try:
         # 1. Generate Image (Use Image Composer now)
         product = draft.get("selected_product", {})
@@ -127,7 +117,7 @@ def job_publish_pending():
         did = draft.get("id", "unknown")
         
         print("   Composing branded image...")
-        image_path = f"temp_publish_{now_ar.strftime('%H%M%S')}.png"
+        image_path = f"temp_publish_{now_ar.strftime('%H%M%S')}_{did}.png"
         
         try:
             from image_composer import create_social_post
@@ -161,25 +151,29 @@ def job_publish_pending():
                 if s_dt.tzinfo is None: s_dt = AR_TZ.localize(s_dt)
                 if now_ar < s_dt:
                     logger.info(f"   [Safety] Publicación futura: {s_dt}. Cancelando.")
-                    return
+                    return False
             except ValueError as ve:
                 logger.warning(f"   [Safety] publish_time_iso inválido: {ve}")
 
         res = None
         if pref_fmt == "tiktok" and reel_path and os.path.exists(reel_path):
             print("   Uploading to TIKTOK as requested...")
+            from tiktok_client import publish_tiktok_video
             res = publish_tiktok_video(video_path=reel_path, caption=caption)
         elif pref_fmt == "video" and reel_path and os.path.exists(reel_path):
             print("   Uploading to INSTAGRAM REEL as requested...")
+            from instagram_client import publish_instagram_reel
             res = publish_instagram_reel(video_path=reel_path, caption=caption)
         else:
             print("   Uploading to INSTAGRAM PHOTO (Browser)...")
+            from instagram_browser_publisher import publish_instagram_post_browser
             res = publish_instagram_post_browser(
                 image_path=final_image_path if final_image_path else "placeholder.jpg",
                 caption=caption
             )
             if not res:
                 print("   WARNING: Browser publishing failed. Trying API Fallback (Instagrapi)...")
+                from instagram_client import publish_instagram_post
                 res = publish_instagram_post(
                     image_url=final_image_path if final_image_path else "placeholder.jpg",
                     caption=caption
@@ -198,6 +192,13 @@ def job_publish_pending():
             os.rename(file_path, os.path.join(ARCHIVE_DIR, unique_filename))
             print(f"   Draft archived as {unique_filename}.")
 
+            # Memoria del critic: este caption ya no se puede repetir
+            try:
+                from caption_index import caption_index
+                caption_index.add(unique_filename, caption, (product or {}).get("id"))
+            except Exception as index_err:
+                logger.warning(f"   No se pudo indexar el caption publicado: {index_err}")
+
             # 4. Cleanup Temp Image
             try:
                 if final_image_path and "temp_publish" in final_image_path and os.path.exists(final_image_path):
@@ -207,6 +208,7 @@ def job_publish_pending():
                         logger.info("   Temp image limpiada.")
             except Exception as cleanup_err:
                 logger.warning(f"   No se pudo limpiar temp image: {cleanup_err}")
+            return True
         else:
             print("   ERROR: Publishing failed. Moving to errors folder.")
             filename = os.path.basename(file_path)
@@ -229,28 +231,28 @@ def job_publish_pending():
                 print(f"   Failsafe: Deleted problematic draft {file_path}")
             except:
                 pass
+    return False
 
 if __name__ == "__main__":
     print("[BIT Scheduler Service Started]")
     print("   Watching 'brain/drafts' for approved posts...")
-    print("   Schedule: 10:00 and 18:00 daily + Check every minute")
+    print("   Publishing each approved post at its scheduled time (event-driven)")
     
     # Limpieza inicial de archivos tempáneos huérfanos (>2 horas)
     cleanup_orphaned_temp_files()
     
-    # Verificar posts pendientes cada minuto
-    schedule.every(1).minutes.do(job_publish_pending)
-    
     # Limpieza periódica de temp files cada 2 horas
     schedule.every(2).hours.do(cleanup_orphaned_temp_files)
     
-    # Verificación inicial
-    job_publish_pending()
-    
     # Loop de scheduler
     if os.getenv("RUN_ONCE") == "true":
+        # Verificación única
+        job_publish_pending()
         print("\n[Scheduler] RUN_ONCE detectado. Saliendo.")
     else:
+        from publish_scheduler import PublishScheduler
+        PublishScheduler().start()
         while True:
             schedule.run_pending()
-            time.sleep(60)
+            idle = schedule.idle_seconds()
+            time.sleep(max(idle if idle is not None else 60, 1))
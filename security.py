@@ -129,7 +129,7 @@ DRAFT_ALLOWED_FIELDS = {
     "preferred_format", "reel_path", "selected_product", "design_settings",
     "created_at", "updated_at", "platform", "post_type",
     "image_prompt", "retry_count", "recent_products", "research_summary",
-    "critique_feedback", "status",
+    "critique_feedback", "critique_issues", "status", "target_publish_time_iso",
 }
 
 # Valores permitidos para campos de tipo enum
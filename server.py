@@ -1,10 +1,13 @@
 from fastapi import FastAPI, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional
 import uvicorn
 import os
-from graph import app as agent_app
+from graph import run_generations, MAX_GENERATIONS
+import research_cache
+import llm_cache
 
 app = FastAPI()
 
@@ -21,8 +24,9 @@ current_status = {"status": "idle", "logs": [], "result": None}
 
 class AgentRequest(BaseModel):
     mode: str = "manual"
+    count: int = Field(1, ge=1, le=MAX_GENERATIONS)  # Generaciones en paralelo (mismo event loop)
 
-def run_agent_task():
+async def run_agent_task(count: int = 1):
     global current_status
     current_status["status"] = "running"
     current_status["logs"] = ["🚀 Agent Initialized..."]
@@ -31,12 +35,20 @@ def run_agent_task():
     try:
         current_status["logs"].append("🎵 Fetching Top 5 from Spotify/Web...")
         
-        # Invoke Agent
+        # Invoke Agent (async: no bloquea el loop de uvicorn mientras corre)
         inputs = {"retry_count": 0}
-        result = agent_app.invoke(inputs)
+        results = await run_generations(count, inputs)
         
+        errors = [r for r in results if isinstance(r, Exception)]
+        done = [r for r in results if not isinstance(r, Exception)]
+        for e in errors:
+            current_status["logs"].append(f"❌ Error: {str(e)}")
+        if not done:
+            raise errors[0]
+        
+        result = done[0]
         current_status["status"] = "completed"
-        current_status["logs"].append("✅ Workflow Finished Successfully.")
+        current_status["logs"].append(f"✅ Workflow Finished Successfully ({len(done)}/{count}).")
         current_status["result"] = {
             "image": result.get("image_url", ""),
             "caption": result.get("draft_caption", ""),
@@ -51,12 +63,23 @@ def run_agent_task():
 async def get_status():
     return current_status
 
+@app.get("/api/cache-stats")
+async def get_cache_stats():
+    """Hits / misses del caché de búsquedas web por namespace."""
+    return research_cache.get_stats()
+
+@app.get("/api/llm-stats")
+async def get_llm_stats():
+    """Llamadas, hits del caché, latencia, tokens y costo estimado del LLM por nodo."""
+    return llm_cache.get_stats()
+
 @app.post("/api/run")
-async def run_agent(background_tasks: BackgroundTasks):
+async def run_agent(background_tasks: BackgroundTasks, request: Optional[AgentRequest] = None):
     if current_status["status"] == "running":
         return {"message": "Agent is already running."}
     
-    background_tasks.add_task(run_agent_task)
+    count = request.count if request else 1
+    background_tasks.add_task(run_agent_task, count)
     return {"message": "Agent started."}
 
 # Serve Static Files (Frontend)
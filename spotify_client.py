@@ -3,11 +3,13 @@ import json
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from dotenv import load_dotenv
-from duckduckgo_search import DDGS
+from research_cache import search_web
 from openai import OpenAI
 
 load_dotenv()
 
+CHARTS_CACHE_TTL = float(os.getenv("CHARTS_CACHE_TTL_HOURS", "12")) * 3600
+
 def get_top_5_from_web():
     """
     Fallback function to get Top 5 songs by searching the web and parsing with LLM.
@@ -21,9 +23,9 @@ def get_top_5_from_web():
     
     search_text = ""
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=5))
-            search_text = "\n".join([f"{r['title']}: {r['body']}" for r in results])
+        # Los charts cambian semanalmente: TTL corto
+        results = search_web(query, max_results=5, namespace="charts", ttl=CHARTS_CACHE_TTL)
+        search_text = "\n".join([f"{r['title']}: {r['body']}" for r in results])
     except Exception as e:
         print(f"Web search failed: {e}")
         return []
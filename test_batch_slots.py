@@ -0,0 +1,33 @@
+"""
+Prueba de los horarios libres de batch_generation contra el índice de drafts (draft_store):
+un draft con microsegundos en publish_time_iso (como los que escribía el copywriter) igual
+ocupa su horario. Usa una carpeta brain temporal; no necesita red ni OpenAI.
+
+    python test_batch_slots.py
+"""
+import os
+import sys
+import json
+import tempfile
+from datetime import datetime
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+from draft_store import DraftStore
+from batch_generation import publish_slots
+
+
+if __name__ == "__main__":
+    brain = tempfile.mkdtemp()
+    os.makedirs(os.path.join(brain, "drafts"))
+    with open(os.path.join(brain, "drafts", "draft_1.json"), "w", encoding="utf-8") as f:
+        json.dump({"approval_status": "pending", "publish_time_iso": "2026-10-20T10:00:00.482913"}, f)
+    store = DraftStore(brain)
+
+    taken = store.scheduled_slots()
+    slots = publish_slots(3, now=datetime(2026, 10, 20, 8, 0), taken=taken)
+    print(slots)
+    assert slots == [datetime(2026, 10, 20, 18, 0), datetime(2026, 10, 21, 10, 0), datetime(2026, 10, 21, 18, 0)]
+
+    print("[OK] batch slots")
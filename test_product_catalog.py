@@ -0,0 +1,69 @@
+"""
+Prueba del espejo local del catálogo contra el WooCommerce falso (tools/fake_woocommerce.py).
+No necesita credenciales ni red: levanta el servidor en un thread y usa una base temporal.
+
+    python test_product_catalog.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"))
+from fake_woocommerce import FakeStore, start_server
+
+store = FakeStore(n_products=350)
+server, url = start_server(store)
+os.environ["WOOCOMMERCE_URL"] = url
+os.environ.setdefault("WOOCOMMERCE_CONSUMER_KEY", "ck_test")
+os.environ.setdefault("WOOCOMMERCE_CONSUMER_SECRET", "cs_test")
+
+from product_catalog import ProductCatalog  # noqa: E402  (después de apuntar a la tienda falsa)
+
+
+def count_product_requests():
+    return sum(1 for path, _ in store.requests if path == "products")
+
+
+if __name__ == "__main__":
+    catalog = ProductCatalog(os.path.join(tempfile.mkdtemp(), "catalog.db"))
+
+    print("--- Sync completa ---")
+    n = catalog.sync()
+    print(f"{n} productos, {count_product_requests()} páginas pedidas")
+    assert n == 350 and count_product_requests() == 4  # 100 por página
+
+    visible = [p for p in store.products.values() if p["stock_status"] == "instock"]
+    bateria = catalog.search("bateria lenovo", limit=100)
+    expected = [p for p in visible
+                if p["name"].lower().replace("í", "i").startswith("bateria") and "lenovo" in p["name"].lower()]
+    print(f"search('bateria lenovo'): {len(bateria)} (esperado {len(expected)})")
+    assert {p["id"] for p in bateria} == {p["id"] for p in expected}
+
+    cats = catalog.categories()
+    print(f"categorías: {[c['name'] for c in cats]}")
+    wifi = next(c for c in cats if c["name"] == "Placas WiFi")
+    in_cat = catalog.products_by_category(wifi["id"], limit=100)
+    assert all("Placas WiFi" in p["categories"] and p["stock_status"] == "instock" for p in in_cat)
+
+    print("--- Sync incremental ---")
+    before = count_product_requests()
+    store.touch(5, stock_status="outofstock")
+    store.touch(6, name="Batería Lenovo Edición Especial", stock_status="instock")
+    store.touch(9999, name="Producto Nuevo Cargador Dell")
+    store.delete(7)
+    store.touch(8, status="trash", stock_status="instock")
+    n = catalog.sync()
+    print(f"{n} productos actualizados en {count_product_requests() - before} página(s)")
+    assert 4 <= n <= 6  # + el/los que caen en la ventana de solapamiento (SYNC_OVERLAP_SECONDS)
+    assert catalog.get(5)["stock_status"] == "outofstock"
+    assert catalog.get(6)["name"] == "Batería Lenovo Edición Especial"
+    assert catalog.get(9999) is not None
+    assert catalog.get(7) is not None  # los borrados solo se ven en la sync completa
+    assert 8 not in {p.id for p in catalog.visible_products()}  # la papelera sí: deja de ser elegible enseguida
+
+    print("--- Sync completa (limpia borrados) ---")
+    catalog.sync(full=True)
+    assert catalog.get(7) is None
+
+    server.shutdown()
+    print("[OK] product_catalog")
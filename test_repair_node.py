@@ -0,0 +1,72 @@
+"""
+Prueba de los arreglos deterministas del repair (nodes/repair_node.py) y de la detección de
+términos prohibidos del critic: precios, modelos y SKUs con dígitos nunca se tocan, los términos
+del nombre del producto no se reportan; los de la línea de precio y los numéricos van a la edición con LLM.
+No necesita red ni OpenAI (el LLM es un modelo falso de LangChain).
+
+    python test_repair_node.py
+"""
+import os
+import sys
+
+os.environ["LLM_CACHE_ENABLED"] = "false"  # no escribir brain/llm_cache.db
+
+if hasattr(sys.stdout, 'reconfigure'):
+    sys.stdout.reconfigure(encoding='utf-8')
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import llm_cache
+from nodes.critic_node import banned_term_hits
+from nodes.repair_node import strip_banned_words, apply_mechanical_fixes, repair_draft, check_repair
+
+
+def issues_for(caption, product=None):
+    strippable, contextual = banned_term_hits(caption, product)
+    return [m.group(0) for m in strippable], [m.group(0) for m in contextual]
+
+
+if __name__ == "__main__":
+    print("--- Precios y modelos ---")
+    assert issues_for("Precio $120990 - modelo dw2099la, SKU NEON-2099X1") == ([], [])
+    assert strip_banned_words("Batería dw2099la a $120990 #BITComunicaciones") == "Batería dw2099la a $120990 #BITComunicaciones"
+    # "neon" suelto en la línea del precio: no se borra, va al LLM
+    assert issues_for("Precio $120990 con luz neon.") == ([], ["neon"])
+    assert strip_banned_words("Precio $120990 con luz neon.") == "Precio $120990 con luz neon."
+    # "2099" suelto: siempre al LLM, nunca se borra
+    assert issues_for("Tecnología del año 2099") == ([], ["2099"])
+    assert issues_for("Dell XPS-2099 a $2099") == ([], [])
+
+    print("--- Palabras y hashtags ---")
+    assert strip_banned_words("Un look neon y futuristic, ideal.") == "Un look y, ideal."
+    assert strip_banned_words("#Repuestos #CyberpunkVibes #Neon2099 #HardwareSantaFe") == "#Repuestos #Neon2099 #HardwareSantaFe"
+    assert issues_for("#neon_2099 y neones") == (["neones"], [])
+    assert issues_for("Look futurista, futurístico, con hologramas y luz neón") == (
+        ["futurista", "futurístico", "hologramas", "neón"], [])
+
+    print("--- Nombre del producto ---")
+    product = {"name": "Tira LED Neon Flex 5m", "price": "15000"}
+    assert issues_for("La Tira LED Neon Flex 5m ilumina todo. Tu Neon Flex dura años.", product) == ([], [])
+    fixed = apply_mechanical_fixes("Tu Neon Flex con estilo cyberpunk.\n\n#Iluminacion", product)
+    assert fixed == "Tu Neon Flex con estilo.\n\n#Iluminacion #BITComunicaciones", fixed
+
+    print("--- Repair: reglas y LLM ---")
+    state = {"draft_caption": "Batería 11.1V cyberpunk.\nPrecio: $120990\n\n#Baterias",
+             "critique_issues": ["missing_hashtag", "banned_words"], "retry_count": 1,
+             "selected_product": {"name": "Batería dw2099la", "price": "120990"}}
+    result = repair_draft(state)
+    print(repr(result["draft_caption"]))
+    assert result["draft_caption"] == "Batería 11.1V.\nPrecio: $120990\n\n#Baterias #BITComunicaciones"
+    assert check_repair(result) == "critic"
+
+    llm_cache.get_chat_model = lambda model, temperature: FakeListChatModel(
+        responses=["Batería pensada para durar.\nPrecio: $120990\n\n#Baterias #BITComunicaciones"])
+    state = {"draft_caption": "Batería del 2099.\nPrecio: $120990\n\n#Baterias #BITComunicaciones",
+             "critique_issues": ["banned_words_context"], "retry_count": 1,
+             "critique_feedback": "Rephrase the futuristic terms (2099) without changing the product name, model numbers or price.",
+             "selected_product": {"name": "Batería dw2099la", "price": "120990"}}
+    result = repair_draft(state)
+    assert "$120990" in result["draft_caption"] and "2099." not in result["draft_caption"]
+    assert check_repair(result) == "critic"
+
+    print("[OK] repair_node")
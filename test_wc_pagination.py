@@ -0,0 +1,59 @@
+"""
+Prueba de la capa de cliente de WooCommerce (paginación concurrente, reintentos, _fields)
+contra el WooCommerce falso (tools/fake_woocommerce.py). Sin credenciales ni red.
+
+    python test_wc_pagination.py
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"))
+from fake_woocommerce import FakeStore, start_server
+
+store = FakeStore(n_products=1000)
+server, url = start_server(store)
+os.environ["WOOCOMMERCE_URL"] = url
+os.environ.setdefault("WOOCOMMERCE_CONSUMER_KEY", "ck_test")
+os.environ.setdefault("WOOCOMMERCE_CONSUMER_SECRET", "cs_test")
+
+import woocommerce_client  # noqa: E402  (después de apuntar a la tienda falsa)
+
+woocommerce_client.BACKOFF_BASE = 0.05  # reintentos rápidos para la prueba
+
+
+if __name__ == "__main__":
+    store.latency = 0.1
+
+    print("--- Todas las páginas (10 x 100) ---")
+    t = time.time()
+    products = list(woocommerce_client.iter_all_products())
+    elapsed = time.time() - t
+    print(f"{len(products)} productos en {elapsed:.2f}s")
+    assert [p["id"] for p in products] == sorted(store.products)
+    assert elapsed < 10 * store.latency * 0.6, "las páginas 2..N deberían pedirse en paralelo"
+    assert set(products[0]) == set(woocommerce_client.PRODUCT_FIELDS.split(","))
+
+    print("--- limit > 100 usa varias páginas; limit chico, una sola ---")
+    store.requests.clear()
+    recent = woocommerce_client.get_recent_products(days=3650, limit=250)
+    assert len(recent) == 250 and len(store.requests) == 3
+    store.requests.clear()
+    assert len(woocommerce_client.get_recent_products(days=3650, limit=5)) == 5 and len(store.requests) == 1
+
+    print("--- 429 / 503 se reintentan ---")
+    store.fail_next(429, 503)
+    cats = woocommerce_client.get_categories()
+    print(f"{len(cats)} categorías después de 2 errores")
+    assert len(cats) == 8
+
+    print("--- Se agotan los reintentos: lista vacía, sin excepción ---")
+    store.fail_next(*[500] * (woocommerce_client.MAX_RETRIES + 1))
+    assert woocommerce_client.get_products_by_category(11) == []
+
+    for endpoint, st in woocommerce_client.get_call_stats().items():
+        print(f"{endpoint:22} calls={st['calls']} retries={st['retries']} errors={st['errors']} "
+              f"avg={st['avg_ms']:.0f}ms max={st['max_ms']:.0f}ms")
+
+    server.shutdown()
+    print("[OK] woocommerce_client")
@@ -0,0 +1,69 @@
+"""
+Benchmark de la búsqueda de duplicados de caption_index (fuerza bruta NumPy sobre float16 en
+disco / float32 en memoria) con vectores sintéticos del tamaño de MiniLM (384 dims).
+
+Uso:
+    python tools/bench_caption_index.py [--posts 10000] [--queries 500]
+
+Mide: tamaño del índice en disco, tiempo de carga, latencia de search_vector (p50 / p95 / máx.)
+y que un caption casi idéntico (vector + ruido) se encuentre con similitud > umbral.
+No carga el modelo de embeddings: la consulta ya viene embebida.
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from caption_index import CaptionIndex, SIMILARITY_THRESHOLD
+
+DIMS = 384
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((args.posts, DIMS)).astype(np.float32)
+    path = os.path.join(tempfile.mkdtemp(), "caption_index.npz")
+
+    index = CaptionIndex(path=path, archive_dir=os.path.dirname(path))
+    started = time.time()
+    index.add_vectors([f"draft_{i}.json" for i in range(args.posts)], vectors, list(range(args.posts)))
+    print(f"{args.posts} posts indexados en {time.time() - started:.2f}s; "
+          f"{os.path.getsize(path) / 1024 / 1024:.1f} MB en disco (float16)")
+
+    fresh = CaptionIndex(path=path, archive_dir=os.path.dirname(path))
+    started = time.time()
+    assert len(fresh) == args.posts
+    print(f"Carga desde disco: {(time.time() - started) * 1000:.0f} ms")
+
+    targets = rng.integers(0, args.posts, args.queries)
+    latencies, found = [], 0
+    for t in targets:
+        query = vectors[t] + rng.standard_normal(DIMS).astype(np.float32) * 0.15  # "casi igual"
+        started = time.perf_counter()
+        score, caption_id, _ = fresh.search_vector(query)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += caption_id == f"draft_{t}.json" and score >= SIMILARITY_THRESHOLD
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(f"search_vector: p50={p(0.5):.2f}ms p95={p(0.95):.2f}ms max={latencies[-1]:.2f}ms")
+    print(f"Casi-duplicados detectados (>= {SIMILARITY_THRESHOLD}): {found}/{args.queries}")
+    assert p(0.95) < 10, "la consulta tiene que quedar por debajo de 10 ms"
+
+
+if __name__ == "__main__":
+    main()
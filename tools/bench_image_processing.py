@@ -0,0 +1,106 @@
+"""
+Benchmark del pre-procesado de producto: funciones originales (Image.point + lambda,
+ImageChops/getbbox) vs image_processing (NumPy + reducción previa del original).
+
+Uso:
+    python tools/bench_image_processing.py [--size 3000] [--runs 5]
+
+Mide el pipeline de post (image_composer) y de reel (video_composer) hasta el resize
+final, y verifica que sin reducción (max_side=0) el resultado sea idéntico al original.
+"""
+import sys
+import os
+import time
+import argparse
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageChops
+import image_processing
+
+
+# --- Copias de las funciones originales ---
+def legacy_remove_white_background(img, threshold=240):
+    img = img.convert("RGBA")
+    grayscale = img.convert("L")
+    mask = grayscale.point(lambda x: 0 if x > threshold else 255)
+    img.putalpha(mask)
+    return img
+
+def legacy_trim_corner(img):
+    bg = Image.new(img.mode, img.size, img.getpixel((0,0)))
+    diff = ImageChops.difference(img, bg)
+    diff = ImageChops.add(diff, diff, 2.0, -100)
+    bbox = diff.getbbox()
+    return img.crop(bbox) if bbox else img
+
+def legacy_trim_alpha(img):
+    bbox = img.getbbox()
+    return img.crop(bbox) if bbox else img
+
+def legacy_logo_mask(img):
+    p_draw = ImageDraw.Draw(img)
+    pw, ph = img.size
+    mw, mh = int(pw * 0.28), int(ph * 0.22)
+    p_draw.rectangle([(0, ph-mh), (mw, ph)], fill=(0,0,0,0))
+    return img
+
+
+def legacy_pipeline(src, trim):
+    img = legacy_logo_mask(legacy_remove_white_background(src))
+    return legacy_trim_corner(img) if trim == "corner" else legacy_trim_alpha(img)
+
+def new_pipeline(src, trim, max_side=image_processing.PRODUCT_MAX_SIDE):
+    return image_processing.prepare_product(src, remove_bg=True, hide_logo=True, trim=trim, max_side=max_side)
+
+def fit(img, max_w=980, max_h=650):
+    ratio = min(max_w / img.width, max_h / img.height)
+    return img.resize((int(img.width * ratio), int(img.height * ratio)), Image.Resampling.LANCZOS)
+
+
+def make_product(size):
+    """Foto sintética estilo WooCommerce: producto sobre blanco + logo en la esquina."""
+    img = Image.new("RGB", (size, size), (255, 255, 255))
+    d = ImageDraw.Draw(img)
+    d.rounded_rectangle([(size * 0.15, size * 0.3), (size * 0.85, size * 0.7)], radius=40, fill=(30, 30, 30))
+    d.ellipse([(size * 0.4, size * 0.4), (size * 0.6, size * 0.6)], fill=(0, 160, 0))
+    d.rectangle([(size * 0.03, size * 0.85), (size * 0.2, size * 0.97)], fill=(20, 40, 200))
+    return img.convert("RGBA")
+
+
+def timeit(fn, runs):
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=3000, help="Lado del original de prueba (px)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    src = make_product(args.size)
+
+    print("=" * 60)
+    print(f"PRODUCT PRE-PROCESSING BENCHMARK ({args.size}x{args.size}, best of {args.runs})")
+    print("=" * 60)
+
+    for label, trim in (("post", "corner"), ("reel", "alpha")):
+        a, b = legacy_pipeline(src, trim), new_pipeline(src, trim, max_side=0)
+        same = a.size == b.size and a.tobytes() == b.tobytes()
+        t_legacy = timeit(lambda: legacy_pipeline(src, trim), args.runs)
+        t_new = timeit(lambda: new_pipeline(src, trim), args.runs)
+        t_legacy_fit = timeit(lambda: fit(legacy_pipeline(src, trim)), args.runs)
+        t_new_fit = timeit(lambda: fit(new_pipeline(src, trim)), args.runs)
+        print(f"[{label}] prep: legacy {t_legacy * 1000:6.1f} ms | nuevo {t_new * 1000:6.1f} ms ({t_legacy / t_new:.2f}x)"
+              f"   + resize final: {t_legacy_fit * 1000:6.1f} -> {t_new_fit * 1000:6.1f} ms ({t_legacy_fit / t_new_fit:.2f}x)"
+              f"   idéntico sin reducción: {'sí' if same else 'NO'}")
@@ -0,0 +1,121 @@
+"""
+Benchmark de calidad y latencia del RAG sobre brain/knowledge_base: chunking por sección (##,
+el formato anterior) vs ventanas por tokens con solapamiento, y contexto truncado a 500
+caracteres (get_rag_context anterior) vs pack_context con presupuesto de tokens.
+
+Uso:
+    python tools/bench_rag_retrieval.py [--windows 200:40,128:32] [--budget 600] [--runs 5]
+
+Cada consulta tiene un dato concreto que tiene que aparecer en lo recuperado:
+    hit@1 / hit@3 / MRR@5   el dato está en el chunk 1 / en los 3 primeros / rango recíproco
+    ctx                     el dato llega al texto que ve el LLM (contexto armado)
+Además: chunks, tokens por chunk (máx. y cuántos pasan el max_seq_length del modelo, que se
+truncan al embeber), tiempo de ingesta y latencia de query_rag (p50 / p95).
+Usa colecciones de Chroma en memoria: no toca brain/rag_knowledge.
+"""
+import sys
+import os
+import time
+import argparse
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+import rag_system
+from embedding_service import embedding_service
+
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "brain", "knowledge_base")
+
+# (consulta, dato que responde la consulta)
+QUERIES = [
+    ("voltajes de baterías Lenovo ThinkPad", "7.4V, 10.8V, 11.1V, 15.2V"),
+    ("cuántos ciclos de carga dura una batería de ion de litio", "300-500 ciclos"),
+    ("marcas de baterías genéricas compatibles", "Green Cell"),
+    ("la batería se hincha o deforma", "Se hincha o deforma"),
+    ("garantía de baterías compatibles", "Baterías compatibles**: 3 meses"),
+    ("cuánto tiempo cargar la batería nueva antes del primer uso", "4-6 horas"),
+    ("velocidad de un SSD NVMe PCIe Gen 4", "PCIe Gen 4: Hasta 7000 MB/s"),
+    ("qué key tiene el conector M.2 NVMe", "M Key: NVMe"),
+    ("grosor del disco SATA 2.5 de notebook", "7mm (estándar) o 9.5mm"),
+    ("qué disco lleva una Dell XPS", "XPS: M.2 NVMe Gen 3/4 exclusivamente"),
+    ("voltaje de memoria DDR3L low voltage", "1.35V (DDR3L"),
+    ("cuántos pines tiene un SO-DIMM DDR4", "260 pines: DDR4"),
+    ("cuánto rendimiento gana dual channel", "10-30% más rendimiento"),
+    ("mezclar RAM de distintas velocidades", "velocidad del módulo más lento"),
+    ("cómo activar XMP en la BIOS", "Buscar \"XMP\" (Intel)"),
+    ("garantía de memoria RAM usada", "RAM usada**: 3 meses"),
+]
+
+
+def legacy_context(results, k=3):
+    """get_rag_context anterior: top-k cortados a 500 caracteres."""
+    return "\n\n".join(f"[Fuente: {r['source']} - {r['section']}]\n{r['content'][:500]}..." for r in results[:k])
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def bench_config(client, name, max_tokens, overlap, budget, runs):
+    collection = client.create_collection(name=f"bench_{len(client.list_collections())}")
+    started = time.time()
+    rag_system.sync_knowledge_base(collection, KNOWLEDGE_DIR, max_tokens, overlap)
+    ingest_s = time.time() - started
+
+    docs = collection.get()["documents"]
+    tokens = [embedding_service.count_tokens(d) for d in docs]
+    max_seq = embedding_service.max_seq_length
+
+    hit1 = hit3 = ctx_legacy = ctx_packed = 0
+    rr = 0.0
+    latencies, ctx_tokens = [], []
+    for query, fact in QUERIES:
+        for _ in range(runs):
+            t = time.perf_counter()
+            results = rag_system.query_rag(query, k=5, collection=collection)
+            latencies.append((time.perf_counter() - t) * 1000)
+        ranks = [i for i, r in enumerate(results) if fact in r["content"]]
+        if ranks:
+            hit1 += ranks[0] == 0
+            hit3 += ranks[0] < 3
+            rr += 1 / (ranks[0] + 1)
+        ctx_legacy += fact in legacy_context(results)
+        packed = "\n\n".join(rag_system.pack_context(results, budget))
+        ctx_packed += fact in packed
+        ctx_tokens.append(embedding_service.count_tokens(packed))
+
+    n = len(QUERIES)
+    print(f"{name:18} chunks={len(docs):3}  tok max={max(tokens):4} >{max_seq}={sum(t > max_seq for t in tokens):2}  "
+          f"hit@1={hit1 / n:.2f} hit@3={hit3 / n:.2f} MRR={rr / n:.2f}  "
+          f"ctx500={ctx_legacy / n:.2f} packed={ctx_packed / n:.2f} ({sum(ctx_tokens) / n:.0f} tok)  "
+          f"ingesta={ingest_s:.2f}s  query p50={percentile(latencies, 50):.1f}ms p95={percentile(latencies, 95):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--windows", default=f"{rag_system.CHUNK_TOKENS}:{rag_system.CHUNK_OVERLAP},128:32",
+                        help="Configuraciones tokens:solapamiento separadas por coma")
+    parser.add_argument("--budget", type=int, default=rag_system.CONTEXT_TOKENS, help="Presupuesto de pack_context")
+    parser.add_argument("--runs", type=int, default=5, help="Repeticiones de cada consulta para la latencia")
+    args = parser.parse_args()
+
+    started = time.time()
+    embedding_service.encode(["warm up"])
+    print(f"Modelo {embedding_service.model_name} listo en {time.time() - started:.1f}s "
+          f"(max_seq_length={embedding_service.max_seq_length}), {len(QUERIES)} consultas, presupuesto {args.budget} tokens\n")
+
+    client = chromadb.EphemeralClient()
+    bench_config(client, "secciones (##)", 10 ** 9, 0, args.budget, args.runs)
+    for spec in args.windows.split(","):
+        max_tokens, overlap = (int(x) for x in spec.split(":"))
+        bench_config(client, f"ventanas {max_tokens}/{overlap}", max_tokens, overlap, args.budget, args.runs)
+
+
+if __name__ == "__main__":
+    main()
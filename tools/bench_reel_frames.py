@@ -0,0 +1,112 @@
+"""
+Benchmark de frames/segundo: loop original de create_reel_video vs ReelFrameEngine.
+
+Uso:
+    python tools/bench_reel_frames.py [--size 3000] [--frames 150]
+
+Solo mide el render de frames (sin ffmpeg), con un producto sintético de --size px.
+También compara cada frame del engine con el del loop original (diferencia máxima y media por píxel).
+"""
+import sys
+import os
+import math
+import time
+import argparse
+import textwrap
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+import video_composer as vc
+
+
+def legacy_frame(i, bg_full, p_img, name, price_txt, title_font, price_font, design_settings):
+    """Copia del cuerpo del loop original (resize LANCZOS + texto redibujado por frame)."""
+    progress = i / vc.TOTAL_FRAMES
+    frame = bg_full.copy()
+    draw = ImageDraw.Draw(frame)
+    zoom = 1.0 + (0.12 * progress)
+    lev = int(22 * math.sin(progress * 3 * math.pi))
+    target_w = int(920 * zoom * design_settings.get("product_scale", 1.0))
+    ratio = target_w / p_img.width
+    p_res = p_img.resize((target_w, int(p_img.height * ratio)), Image.Resampling.LANCZOS)
+    cw, ch = p_res.size
+    pos_y = 580 + ((750 - ch) // 2) + lev
+    frame.paste(p_res, ((1080-cw)//2, pos_y), p_res)
+    if progress > 0.1:
+        lines = textwrap.wrap(name, width=int(22 / design_settings.get("title_scale", 1.0)))
+        y_t = 150
+        for line in lines[:3]:
+            bbox = draw.textbbox((0,0), line, font=title_font)
+            draw.text(((1080-(bbox[2]-bbox[0]))//2, y_t), line, font=title_font, fill=vc.BLUE_DARK)
+            y_t += 55
+    if progress > 0.4:
+        bbox = draw.textbbox((0,0), price_txt, font=price_font)
+        pw = bbox[2]-bbox[0]
+        draw.rounded_rectangle([(540-pw//2-30, 1420), (540+pw//2+30, 1550)], radius=65, fill=vc.GREEN_BIT)
+        draw.text((540-pw//2, 1455), price_txt, font=price_font, fill=vc.WHITE)
+    return frame
+
+
+def make_product(size):
+    img = Image.new("RGB", (size, size), (255, 255, 255))
+    d = ImageDraw.Draw(img)
+    d.rounded_rectangle([(size * 0.15, size * 0.3), (size * 0.85, size * 0.7)], radius=40, fill=(30, 30, 30))
+    d.ellipse([(size * 0.4, size * 0.4), (size * 0.6, size * 0.6)], fill=(0, 160, 0))
+    return vc.trim_whitespace(vc.remove_white_background_v37(img))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=3000, help="Lado del producto de prueba (px)")
+    parser.add_argument("--frames", type=int, default=vc.TOTAL_FRAMES)
+    args = parser.parse_args()
+
+    p_img = make_product(args.size)
+    name = "BATERÍA ORIGINAL HP PAVILION 15 SERIE DV4 6 CELDAS"
+    price_txt = "$25000"
+    title_font = vc.get_font_master(vc.FONT_BOLD_PATH, vc.ARIAL_BOLD_PATH, 50)
+    price_font = vc.get_font_master(vc.FONT_BOLD_PATH, vc.ARIAL_BOLD_PATH, 45)
+    bg = vc.get_base_bg()
+    design = {}
+
+    print("=" * 60)
+    print(f"REEL FRAMES BENCHMARK ({args.frames} frames, producto {p_img.size[0]}x{p_img.size[1]})")
+    print("=" * 60)
+
+    t0 = time.perf_counter()
+    for i in range(args.frames):
+        legacy_frame(i, bg, p_img, name, price_txt, title_font, price_font, design)
+    t_legacy = time.perf_counter() - t0
+    print(f"[legacy] {args.frames / t_legacy:7.1f} fps ({t_legacy:.2f} s)")
+
+    t0 = time.perf_counter()
+    engine = vc.ReelFrameEngine(bg, p_img, name, price_txt, title_font, price_font, design)
+    t_setup = time.perf_counter() - t0
+    for i in range(args.frames):
+        engine.render_frame(i)
+    t_engine = time.perf_counter() - t0
+    print(f"[engine] {args.frames / t_engine:7.1f} fps ({t_engine:.2f} s, setup {t_setup * 1000:.0f} ms, {len(engine._sprites)} sprites)")
+
+    print(f"\nSpeedup: {t_legacy / t_engine:.2f}x")
+
+    # Mismo resultado que el loop original (fuera del cronómetro, un frame a la vez)
+    different = []
+    for i in range(args.frames):
+        old = legacy_frame(i, bg, p_img, name, price_txt, title_font, price_font, design)
+        diff = ImageChops.difference(old.convert("RGB"), engine.render_frame(i).convert("RGB"))
+        if diff.getbbox():
+            max_diff = max(high for _, high in diff.getextrema())
+            mean_diff = sum(ImageStat.Stat(diff).mean) / 3
+            different.append((i, max_diff, mean_diff))
+    if different:
+        for i, max_diff, mean_diff in different[:10]:
+            print(f"[diff] frame {i}: max {max_diff}, media {mean_diff:.3f}")
+        print(f"❌ {len(different)}/{args.frames} frames distintos al loop original")
+        sys.exit(1)
+    print(f"✅ {args.frames} frames idénticos al loop original")
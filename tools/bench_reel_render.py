@@ -0,0 +1,92 @@
+"""
+Benchmark de render de Reels: modo "pipe" (rawvideo por stdin) vs modo "jpeg" (frames en disco),
+y "pipe" serial vs paralelo (ProcessPoolExecutor).
+
+Uso:
+    python tools/bench_reel_render.py [--runs 2] [--workers 4]
+
+Mide tiempo total y bytes escritos a disco por el proceso (Linux: /proc/self/io).
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+import video_composer
+
+
+def make_test_product_image(path, size=1500):
+    """Producto sintético sobre fondo blanco (similar a una foto de WooCommerce)."""
+    img = Image.new("RGB", (size, size), (255, 255, 255))
+    d = ImageDraw.Draw(img)
+    d.rounded_rectangle([(size * 0.15, size * 0.3), (size * 0.85, size * 0.7)], radius=40, fill=(30, 30, 30))
+    d.ellipse([(size * 0.4, size * 0.4), (size * 0.6, size * 0.6)], fill=(0, 160, 0))
+    img.save(path)
+    return path
+
+
+def read_write_bytes():
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except Exception:
+        pass
+    return None
+
+
+def bench(mode, product, img_path, runs, workers=1):
+    label = mode if workers <= 1 else f"{mode} x{workers}"
+    times = []
+    written = []
+    for r in range(runs):
+        out = os.path.join(tempfile.gettempdir(), f"bench_reel_{mode}_{r}.mp4")
+        w0 = read_write_bytes()
+        t0 = time.perf_counter()
+        res = video_composer.create_reel_video(product, out, override_image_path=img_path, render_mode=mode, workers=workers)
+        times.append(time.perf_counter() - t0)
+        w1 = read_write_bytes()
+        if w0 is not None and w1 is not None:
+            written.append(w1 - w0)
+        if not res:
+            print(f"   [{label}] run {r}: FALLÓ (¿ffmpeg instalado?)")
+        elif os.path.exists(out):
+            os.remove(out)
+    avg = sum(times) / len(times)
+    avg_w = (sum(written) / len(written) / 1e6) if written else float("nan")
+    print(f"[{label:>8}] {avg:6.2f} s/reel | {video_composer.TOTAL_FRAMES / avg:6.1f} fps | disco (proceso): {avg_w:7.1f} MB")
+    return avg
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para el modo paralelo (default: REEL_WORKERS / núcleos)")
+    args = parser.parse_args()
+
+    img_path = make_test_product_image(os.path.join(tempfile.gettempdir(), "bench_reel_product.png"))
+    product = {"name": "Batería Original HP Pavilion 15 Serie DV4", "price": "25000", "images": []}
+
+    print("=" * 60)
+    print(f"REEL RENDER BENCHMARK ({video_composer.TOTAL_FRAMES} frames, {args.runs} runs)")
+    print("=" * 60)
+    t_jpeg = bench("jpeg", product, img_path, args.runs)
+    t_pipe = bench("pipe", product, img_path, args.runs, workers=1)
+    print(f"\nSpeedup pipe vs jpeg: {t_jpeg / t_pipe:.2f}x")
+
+    workers = video_composer.get_reel_workers(args.workers)
+    if workers > 1:
+        t_par = bench("pipe", product, img_path, args.runs, workers=workers)
+        print(f"Speedup pipe x{workers} vs pipe serial: {t_pipe / t_par:.2f}x")
+    else:
+        print("Host de un solo núcleo: el modo paralelo cae a serial, se omite.")
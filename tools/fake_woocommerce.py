@@ -0,0 +1,206 @@
+"""
+Servidor WooCommerce falso (REST wc/v3, solo lectura) para probar product_catalog y
+woocommerce_client sin tocar la tienda real.
+
+Uso:
+    python tools/fake_woocommerce.py [--port 8765] [--products 500] [--latency 0.2]
+
+    WOOCOMMERCE_URL=http://127.0.0.1:8765 python test_product_catalog.py
+
+Implementa:
+    GET /wp-json/wc/v3/products             per_page, page, status, stock_status, search,
+                                            category, after, modified_after, orderby, order
+    GET /wp-json/wc/v3/products/<id>
+    GET /wp-json/wc/v3/products/categories  per_page, page, hide_empty
+con los headers X-WP-Total / X-WP-TotalPages y _fields. Los cambios se simulan desde Python
+con FakeStore.touch() / FakeStore.delete() (ver test_product_catalog.py), la latencia con
+FakeStore.latency y los errores (429/5xx) con FakeStore.fail_next() (ver test_wc_pagination.py).
+"""
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+API_PREFIX = "/wp-json/wc/v3/"
+
+CATEGORIES = [
+    (11, "Baterías"), (12, "Pantallas"), (13, "Teclados"), (14, "Cargadores"),
+    (15, "Memorias RAM"), (16, "Discos SSD"), (17, "Placas WiFi"), (18, "Repuestos TV"),
+]
+KINDS = {
+    11: ["Batería", "Bateria Original"], 12: ["Pantalla", "Display LED"], 13: ["Teclado"],
+    14: ["Cargador", "Fuente"], 15: ["Memoria RAM DDR4", "Memoria DDR3"], 16: ["Disco SSD"],
+    17: ["Placa WiFi", "Receptor WiFi"], 18: ["Modulo WiFi TV", "Placa Main TV"],
+}
+BRANDS = ["Lenovo", "HP", "Dell", "Asus", "Acer", "Samsung", "Toshiba", "Kingston"]
+
+
+class FakeStore:
+    def __init__(self, n_products=500, seed=7):
+        rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.products = {}
+        base = datetime(2025, 1, 1)
+        for pid in range(1, n_products + 1):
+            cat_id, cat_name = rnd.choice(CATEGORIES)
+            created = base + timedelta(days=rnd.randint(0, 600), minutes=rnd.randint(0, 1440))
+            name = f"{rnd.choice(KINDS[cat_id])} {rnd.choice(BRANDS)} {rnd.randint(100, 999)}"
+            price = str(rnd.randint(5, 300) * 1000)
+            self.products[pid] = {
+                "id": pid,
+                "name": name,
+                "status": "publish",
+                "price": price,
+                "regular_price": price,
+                "sale_price": "",
+                "description": f"<p>{name}. Repuesto testeado con garantía.</p>",
+                "short_description": f"<p>{name} compatible.</p>",
+                "categories": [{"id": cat_id, "name": cat_name, "slug": cat_name.lower()}],
+                "images": [{"src": f"https://example.invalid/img/{pid}.jpg"}],
+                "permalink": f"https://example.invalid/producto/{pid}",
+                "stock_status": "instock" if rnd.random() < 0.8 else "outofstock",
+                "date_created": created.isoformat(timespec="seconds"),
+                "date_modified_gmt": created.isoformat(timespec="seconds"),
+            }
+        self.requests = []  # (path, params) de cada request, para contar round-trips
+        self.latency = 0.0  # segundos por request
+        self.failures = []  # status a devolver en los próximos requests (429, 503, ...)
+
+    def fail_next(self, *statuses):
+        with self.lock:
+            self.failures.extend(statuses)
+
+    def _pop_failure(self):
+        with self.lock:
+            return self.failures.pop(0) if self.failures else None
+
+    def touch(self, pid, **changes):
+        """Modifica un producto (o lo crea) y actualiza su date_modified_gmt."""
+        with self.lock:
+            product = self.products.setdefault(pid, dict(self.products[1], id=pid))
+            product.update(changes)
+            product["date_modified_gmt"] = datetime.utcnow().isoformat(timespec="seconds")
+
+    def delete(self, pid):
+        with self.lock:
+            self.products.pop(pid, None)
+
+    # --- Consultas ---
+    def list_products(self, q):
+        with self.lock:
+            items = list(self.products.values())
+        status = q.get("status", "publish")
+        if status == "any":  # Como WooCommerce: "any" no incluye la papelera
+            items = [p for p in items if p["status"] != "trash"]
+        else:
+            items = [p for p in items if p["status"] == status]
+        if q.get("stock_status"):
+            items = [p for p in items if p["stock_status"] == q["stock_status"]]
+        if q.get("category"):
+            cid = int(q["category"])
+            items = [p for p in items if any(c["id"] == cid for c in p["categories"])]
+        if q.get("search"):
+            terms = q["search"].lower().split()
+            items = [p for p in items
+                     if all(t in (p["name"] + p["description"] + p["short_description"]).lower() for t in terms)]
+        if q.get("after"):
+            items = [p for p in items if p["date_created"] > q["after"][:19]]
+        if q.get("modified_after"):
+            items = [p for p in items if p["date_modified_gmt"] > q["modified_after"][:19]]
+        key = {"id": "id", "modified": "date_modified_gmt", "title": "name"}.get(q.get("orderby", "date"), "date_created")
+        items.sort(key=lambda p: p[key], reverse=q.get("order", "desc") == "desc")
+        return items
+
+    def list_categories(self, q):
+        with self.lock:
+            counts = {}
+            for p in self.products.values():
+                if p["status"] == "publish":
+                    for c in p["categories"]:
+                        counts[c["id"]] = counts.get(c["id"], 0) + 1
+        cats = [{"id": cid, "name": name, "slug": name.lower(), "count": counts.get(cid, 0)}
+                for cid, name in CATEGORIES]
+        if q.get("hide_empty") in ("true", "1", "True"):
+            cats = [c for c in cats if c["count"]]
+        return cats
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, total=None, per_page=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if total is not None:
+                self.send_header("X-WP-Total", str(total))
+                self.send_header("X-WP-TotalPages", str(max(1, -(-total // per_page))))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else None
+            store.requests.append((path, q))
+            if store.latency:
+                time.sleep(store.latency)
+            failure = store._pop_failure()
+            if failure:
+                return self._send(failure, {"code": "fake_failure"})
+            if path is None:
+                return self._send(404, {"code": "rest_no_route"})
+
+            if path in ("products", "products/categories"):
+                items = store.list_products(q) if path == "products" else store.list_categories(q)
+                per_page = min(int(q.get("per_page", 10)), 100)
+                page = int(q.get("page", 1))
+                chunk = items[(page - 1) * per_page: page * per_page]
+                if q.get("_fields"):
+                    fields = q["_fields"].split(",")
+                    chunk = [{k: p[k] for k in fields if k in p} for p in chunk]
+                return self._send(200, chunk, total=len(items), per_page=per_page)
+
+            if path.startswith("products/") and path.split("/")[1].isdigit():
+                product = store.products.get(int(path.split("/")[1]))
+                if product is None:
+                    return self._send(404, {"code": "woocommerce_rest_product_invalid_id"})
+                return self._send(200, product)
+
+            return self._send(404, {"code": "rest_no_route"})
+
+    return Handler
+
+
+def start_server(store, port=0):
+    """Levanta el servidor en un thread daemon. Returns (server, url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    store = FakeStore(args.products)
+    store.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(store))
+    print(f"Fake WooCommerce en http://127.0.0.1:{args.port} ({args.products} productos)")
+    server.serve_forever()
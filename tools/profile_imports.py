@@ -0,0 +1,101 @@
+"""
+Perfil de tiempo de import de los entry points (python -X importtime) y chequeo de regresión:
+ningún entry point puede volver a cargar en el arranque las dependencias pesadas que solo
+se usan más tarde (instagrapi, langchain_openai, chromadb, sentence_transformers, ...).
+
+Uso:
+    python tools/profile_imports.py                    # todos los entry points
+    python tools/profile_imports.py graph --top 15     # uno solo, con los 15 módulos más caros
+    python tools/profile_imports.py --runs 3           # mínimo de 3 corridas (menos ruido)
+
+Sale con código 1 si algún entry point importa un módulo prohibido o no se puede importar.
+Cada corrida es un proceso nuevo con el cwd en la raíz del repo (como en Railway).
+"""
+import sys
+import os
+import re
+import ast
+import argparse
+import subprocess
+
+# Fix Windows console encoding
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pesados y que solo hacen falta al generar / publicar / consultar
+HEAVY = ["instagrapi", "langchain_openai", "openai", "chromadb", "sentence_transformers", "torch",
+         "duckduckgo_search", "playwright", "PIL", "moviepy", "spotipy"]
+
+
+def _top_level_imports(path):
+    """Solo los imports de nivel módulo de un script (el dashboard no se puede importar entero)."""
+    with open(os.path.join(ROOT, path), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+# entry point -> (código a importar, módulos que no puede cargar)
+ENTRY_POINTS = {
+    "scheduler_service": ("import scheduler_service", HEAVY),
+    "main_server": ("import main_server, publish_scheduler, product_catalog, rag_system", HEAVY),
+    "graph": ("import graph", HEAVY),
+    "dashboard": (lambda: _top_level_imports("dashboard.py"), HEAVY),
+}
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(code):
+    """Returns (módulos {nombre: (self_us, cumulative_us, nivel)}, total_us, error)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            level = (len(m.group(3)) - 1) // 2
+            modules[m.group(4)] = (int(m.group(1)), int(m.group(2)), level)
+    total = sum(cum for _, cum, level in modules.values() if level == 0)
+    error = None
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["?"])[-1]
+    return modules, total, error
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("entry_points", nargs="*", default=list(ENTRY_POINTS))
+    parser.add_argument("--runs", type=int, default=1, help="Corridas por entry point (se toma la más rápida)")
+    parser.add_argument("--top", type=int, default=8, help="Módulos más caros a listar (tiempo acumulado)")
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.entry_points:
+        code, forbidden = ENTRY_POINTS[name]
+        code = code() if callable(code) else code
+        best = None
+        for _ in range(args.runs):
+            result = profile(code)
+            if best is None or result[1] < best[1]:
+                best = result
+        modules, total, error = best
+
+        loaded = sorted({m.split(".")[0] for m in modules} & set(forbidden))
+        status = "ERROR" if error else ("FAIL" if loaded else "OK")
+        failed |= bool(error or loaded)
+        print(f"\n=== {name}: {total / 1000:.0f} ms, {len(modules)} módulos [{status}]")
+        if error:
+            print(f"   import falló: {error}")
+        if loaded:
+            print(f"   carga en el arranque: {', '.join(loaded)}")
+        top = sorted(((cum, mod) for mod, (_, cum, level) in modules.items() if level <= 1), reverse=True)
+        for cum, mod in top[:args.top]:
+            print(f"   {cum / 1000:8.1f} ms  {mod}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
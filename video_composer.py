@@ -4,14 +4,23 @@ import json
 import textwrap
 import math
 import random
-import requests
-import io
-from PIL import Image, ImageDraw, ImageFont, ImageChops, ImageFilter
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
 from dotenv import load_dotenv
+from http_fetch import fetch_image
+from asset_cache import assets
+import image_processing
 
 load_dotenv()
 
 REEL_SIZE = (1080, 1920)
+REEL_FPS = 30
+TOTAL_FRAMES = 150
+REEL_CHUNK_FRAMES = 2 # Frames per parallel task
 BLUE_DARK = (20, 40, 80)
 GREEN_BIT = (0, 160, 0)
 WHITE = (255, 255, 255)
@@ -20,15 +29,12 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ASSETS_DIR = os.path.join(BASE_DIR, "brand_assets")
 FONT_BOLD_PATH = os.path.join(BASE_DIR, "Montserrat-Bold.ttf")
 ARIAL_BOLD_PATH = os.path.join(BASE_DIR, "arialbd.ttf")
+TEMPLATE_PATH = os.path.join(ASSETS_DIR, "template.png")
 
 def download_image(url):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=15)
-        return Image.open(io.BytesIO(response.content)).convert("RGBA")
-    except: return None
+    return fetch_image(url, timeout=15)
 
-def get_font_master(path_primary, path_fallback, size):
+def _load_font_master(path_primary, path_fallback, size):
     try:
         if os.path.exists(path_primary) and os.path.getsize(path_primary) > 10000: # Check it's a real font
             return ImageFont.truetype(path_primary, size)
@@ -38,22 +44,23 @@ def get_font_master(path_primary, path_fallback, size):
     except: pass
     return ImageFont.load_default()
 
+def get_font_master(path_primary, path_fallback, size):
+    return assets.font(_load_font_master, path_primary, path_fallback, size)
+
 def trim_whitespace(img):
     try:
-        bbox = img.getbbox()
-        if bbox: return img.crop(bbox)
+        return image_processing.prepare_product(img, remove_bg=False, trim="alpha", max_side=0)
     except: pass
     return img
 
 def remove_white_background_v37(img, threshold=240):
-    img = img.convert("RGBA")
-    gray = img.convert("L")
-    mask = gray.point(lambda p: 0 if p > threshold else 255)
-    img.putalpha(mask)
-    return img
+    return image_processing.remove_white_background(img, threshold)
 
 def get_base_bg():
-    TEMPLATE_PATH = os.path.join(ASSETS_DIR, "template.png")
+    """Reel background (template pasted at the bottom). Cached until template.png changes."""
+    return assets.image((TEMPLATE_PATH, REEL_SIZE, "reel_bg"), TEMPLATE_PATH, _load_base_bg)
+
+def _load_base_bg():
     bg = Image.new("RGB", REEL_SIZE, WHITE)
     if os.path.exists(TEMPLATE_PATH):
         try:
@@ -66,10 +73,246 @@ def get_base_bg():
         except: pass
     return bg
 
-def create_reel_video(product, output_path, override_image_path=None, design_settings={}):
-    """Elite Pro V37: Final Sincronized Stability."""
-    temp_dir = os.path.join("brain", "temp_frames")
-    os.makedirs(temp_dir, exist_ok=True)
+def _ffmpeg_encode_args(output_path):
+    return ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '18', output_path]
+
+def _encode_frames_pipe(frames, output_path):
+    """Streams raw RGB frames to ffmpeg's stdin (no temp files on disk)."""
+    cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{REEL_SIZE[0]}x{REEL_SIZE[1]}', '-r', str(REEL_FPS),
+           '-i', '-'] + _ffmpeg_encode_args(output_path)
+    proc = None
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        for frame in frames:
+            # Parallel mode yields raw memoryviews straight from shared memory
+            proc.stdin.write(frame if isinstance(frame, memoryview) else frame.tobytes())
+        proc.stdin.close()
+        if proc.wait() != 0: return None
+        return output_path
+    except Exception as e:
+        # Includes a missing ffmpeg (OSError from Popen): same None contract as the JPEG mode
+        print(f"[Reel] ffmpeg pipe failed: {e}")
+        if proc is not None:
+            proc.kill()
+            proc.wait()
+        return None
+    finally:
+        # Releases the parallel renderer (pool + shared memory) even on early exit
+        if hasattr(frames, "close"): frames.close()
+
+def _encode_frames_jpeg(frames, output_path):
+    """Legacy mode: JPEG frames in a private temp dir (safe with concurrent reels)."""
+    os.makedirs(os.path.join("brain", "temp_frames"), exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix="reel_", dir=os.path.join("brain", "temp_frames"))
+    try:
+        for i, frame in enumerate(frames):
+            frame.save(os.path.join(temp_dir, f"frame_{i:04d}.jpg"), "JPEG")
+        subprocess.run(['ffmpeg', '-y', '-framerate', str(REEL_FPS), '-i', os.path.join(temp_dir, 'frame_%04d.jpg')] + _ffmpeg_encode_args(output_path), check=True)
+        return output_path
+    except: return None
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+class ReelFrameEngine:
+    """Frame-layer engine: static layers are rendered once, each frame is just compositing.
+
+    - Background, title block and price pill are cached (the texts as cropped RGBA layers).
+    - The product is shrunk ONCE to the largest size the zoom needs, and the per-frame
+      sprites are memoized by their exact target width (frames that share a width reuse
+      it) instead of LANCZOS-resizing the full-resolution original 150 times.
+    """
+
+    def __init__(self, bg_full, p_img, name, price_txt, title_font, price_font, design_settings={}):
+        self.bg = bg_full.convert("RGB")
+        self.product_scale = design_settings.get("product_scale", 1.0)
+
+        max_w = self._target_width(1.0)
+        if p_img.width > max_w:
+            p_img = p_img.resize((max_w, max(1, int(p_img.height * max_w / p_img.width))), Image.Resampling.LANCZOS)
+        self.sprite_src = p_img
+        self._sprites = {}
+
+        title_scale = design_settings.get("title_scale", 1.0)
+        self.title_layer = self._render_title_layer(name, title_font, title_scale)
+        self.price_layer = self._render_price_layer(price_txt, price_font)
+
+    @classmethod
+    def from_layers(cls, bg, sprite_src, title_layer, price_layer, product_scale=1.0):
+        """Rebuilds an engine from already-rendered layers (used by the parallel workers)."""
+        engine = cls.__new__(cls)
+        engine.bg = bg
+        engine.product_scale = product_scale
+        engine.sprite_src = sprite_src
+        engine._sprites = {}
+        engine.title_layer = title_layer
+        engine.price_layer = price_layer
+        return engine
+
+    def _target_width(self, progress):
+        zoom = 1.0 + (0.12 * progress)
+        return max(1, int(920 * zoom * self.product_scale))
+
+    @staticmethod
+    def _crop_layer(layer):
+        bbox = layer.getbbox()
+        if not bbox: return None
+        return layer.crop(bbox), (bbox[0], bbox[1])
+
+    def _render_title_layer(self, name, title_font, title_scale):
+        layer = Image.new("RGBA", REEL_SIZE, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        # Wrap for perfect scale look
+        lines = textwrap.wrap(name, width=int(22 / title_scale))
+        y_t = 150 # Balanced top margin
+        for line in lines[:3]:
+            bbox = draw.textbbox((0,0), line, font=title_font)
+            draw.text(((1080-(bbox[2]-bbox[0]))//2, y_t), line, font=title_font, fill=BLUE_DARK)
+            y_t += 55 # Tight proportional line spacing
+        return self._crop_layer(layer)
+
+    def _render_price_layer(self, price_txt, price_font):
+        layer = Image.new("RGBA", REEL_SIZE, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        bbox = draw.textbbox((0,0), price_txt, font=price_font)
+        pw = bbox[2]-bbox[0]
+        # V40.6: Centered for smaller text
+        draw.rounded_rectangle([(540-pw//2-30, 1420), (540+pw//2+30, 1550)], radius=65, fill=GREEN_BIT)
+        draw.text((540-pw//2, 1455), price_txt, font=price_font, fill=WHITE)
+        return self._crop_layer(layer)
+
+    def sprite_for(self, progress):
+        target_w = self._target_width(progress)
+        sprite = self._sprites.get(target_w)
+        if sprite is None:
+            ratio = target_w / self.sprite_src.width
+            sprite = self.sprite_src.resize((target_w, max(1, int(self.sprite_src.height * ratio))), Image.Resampling.LANCZOS)
+            self._sprites[target_w] = sprite
+        return sprite
+
+    def render_frame(self, i):
+        progress = i / TOTAL_FRAMES
+        frame = self.bg.copy()
+        lev = int(22 * math.sin(progress * 3 * math.pi))
+
+        p_res = self.sprite_for(progress)
+        cw, ch = p_res.size
+        pos_y = 580 + ((750 - ch) // 2) + lev
+        frame.paste(p_res, ((1080-cw)//2, pos_y), p_res)
+
+        # Texts go on top of the product (same stacking as the original loop)
+        if progress > 0.1 and self.title_layer:
+            layer, pos = self.title_layer
+            frame.paste(layer, pos, layer)
+        if progress > 0.4 and self.price_layer:
+            layer, pos = self.price_layer
+            frame.paste(layer, pos, layer)
+        return frame
+
+# --- PARALLEL RENDER (ProcessPoolExecutor + shared memory) ---
+# Workers attach to the decoded background and product sprite through shared memory
+# and write finished frames into a ring of output slots; the parent streams the slots
+# to ffmpeg strictly in frame order.
+_worker_state = {}
+
+def get_reel_workers(workers=None):
+    """Configured worker count (arg > REEL_WORKERS env > available cores, max 4)."""
+    try: cores = len(os.sched_getaffinity(0))
+    except AttributeError: cores = os.cpu_count() or 1
+    if workers is None:
+        env_workers = os.getenv("REEL_WORKERS", "").strip()
+        workers = int(env_workers) if env_workers.isdigit() else min(4, cores)
+    if cores <= 1: return 1
+    return max(1, int(workers))
+
+def _image_to_shm(img):
+    data = img.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    shm.buf[:len(data)] = data
+    return shm, (shm.name, img.mode, img.size)
+
+def _attach_shm(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        # Spawned workers share the parent's resource tracker, which unlinks the block
+        return shared_memory.SharedMemory(name=name)
+
+def _init_reel_worker(bg_spec, sprite_spec, title_layer, price_layer, product_scale, out_name):
+    images = []
+    for name, mode, size in (bg_spec, sprite_spec):
+        shm = _attach_shm(name)
+        _worker_state.setdefault("shms", []).append(shm)
+        images.append(Image.frombuffer(mode, size, shm.buf, "raw", mode, 0, 1))
+    _worker_state["engine"] = ReelFrameEngine.from_layers(images[0], images[1], title_layer, price_layer, product_scale)
+    out = _attach_shm(out_name)
+    _worker_state["shms"].append(out)
+    _worker_state["out"] = out
+
+def _render_chunk_to_slot(start, end, offset):
+    engine = _worker_state["engine"]
+    buf = _worker_state["out"].buf
+    for i in range(start, end):
+        data = engine.render_frame(i).tobytes()
+        buf[offset:offset + len(data)] = data
+        offset += len(data)
+    return end - start
+
+def _render_frames_parallel(engine, workers):
+    """Yields frames (as memoryviews) in order while `workers` processes render ahead."""
+    frame_bytes = REEL_SIZE[0] * REEL_SIZE[1] * 3
+    chunks = [(s, min(s + REEL_CHUNK_FRAMES, TOTAL_FRAMES)) for s in range(0, TOTAL_FRAMES, REEL_CHUNK_FRAMES)]
+    n_slots = min(len(chunks), workers * 2)
+    slot_bytes = REEL_CHUNK_FRAMES * frame_bytes
+
+    shms = []
+    executor = None
+    try:
+        shm_bg, bg_spec = _image_to_shm(engine.bg)
+        shms.append(shm_bg)
+        shm_sprite, sprite_spec = _image_to_shm(engine.sprite_src)
+        shms.append(shm_sprite)
+        shm_out = shared_memory.SharedMemory(create=True, size=n_slots * slot_bytes)
+        shms.append(shm_out)
+
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"), # fork is unsafe next to the scheduler/Streamlit threads
+            initializer=_init_reel_worker,
+            initargs=(bg_spec, sprite_spec, engine.title_layer, engine.price_layer, engine.product_scale, shm_out.name),
+        )
+        pending = {}
+        for k in range(n_slots):
+            pending[k] = executor.submit(_render_chunk_to_slot, chunks[k][0], chunks[k][1], k * slot_bytes)
+
+        for k, (start, end) in enumerate(chunks):
+            pending.pop(k).result()
+            base = (k % n_slots) * slot_bytes
+            for j in range(end - start):
+                view = shm_out.buf[base + j * frame_bytes: base + (j + 1) * frame_bytes]
+                try: yield view
+                finally: view.release()
+            # Slot is free again: hand it to the next chunk
+            nxt = k + n_slots
+            if nxt < len(chunks):
+                pending[nxt] = executor.submit(_render_chunk_to_slot, chunks[nxt][0], chunks[nxt][1], (nxt % n_slots) * slot_bytes)
+    finally:
+        if executor: executor.shutdown(wait=True, cancel_futures=True)
+        for shm in shms:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception: pass
+
+def create_reel_video(product, output_path, override_image_path=None, design_settings={}, render_mode=None, workers=None):
+    """Elite Pro V37: Final Sincronized Stability.
+
+    render_mode: "pipe" (default) streams raw frames to ffmpeg's stdin;
+    "jpeg" keeps the old frames-on-disk path. REEL_RENDER_MODE overrides the default.
+    workers: processes rendering frames in "pipe" mode (REEL_WORKERS env, 1 = serial).
+    Single-core hosts always render serially.
+    """
+    render_mode = render_mode or os.getenv("REEL_RENDER_MODE", "pipe")
     
     p_img = None
     if override_image_path and os.path.exists(override_image_path):
@@ -81,18 +324,11 @@ def create_reel_video(product, output_path, override_image_path=None, design_set
 
     if not p_img: return None
 
-    # Pipeline V37 Sync
-    if design_settings.get("remove_bg", True):
-        p_img = remove_white_background_v37(p_img, threshold=240)
-    
-    if not design_settings.get("show_logo", True):
-        p_draw = ImageDraw.Draw(p_img)
-        pw, ph = p_img.size
-        # Corner mask (Bottom-Left)
-        mw, mh = int(pw * 0.28), int(ph * 0.22)
-        p_draw.rectangle([(0, ph-mh), (mw, ph)], fill=(0,0,0,0))
-    
-    p_img = trim_whitespace(p_img)
+    # Pipeline V37 Sync (remove bg -> corner logo mask -> trim -> downscale)
+    p_img = image_processing.prepare_product(
+        p_img, remove_bg=design_settings.get("remove_bg", True),
+        hide_logo=not design_settings.get("show_logo", True), trim="alpha",
+        threshold=240, softness=design_settings.get("bg_softness", 0))
     
     name = (design_settings.get("title_override") or product.get("name", "Producto")).upper()
     price_txt = f"${product.get('price', '0')}"
@@ -100,46 +336,13 @@ def create_reel_video(product, output_path, override_image_path=None, design_set
     title_font = get_font_master(FONT_BOLD_PATH, ARIAL_BOLD_PATH, 50) 
     price_font = get_font_master(FONT_BOLD_PATH, ARIAL_BOLD_PATH, 45)
     
-    total_frames = 150
-    bg_full = get_base_bg()
-    
-    for i in range(total_frames):
-        progress = i / total_frames
-        frame = bg_full.copy()
-        draw = ImageDraw.Draw(frame)
-        
-        zoom = 1.0 + (0.12 * progress)
-        lev = int(22 * math.sin(progress * 3 * math.pi))
-        
-        target_w = int(920 * zoom * design_settings.get("product_scale", 1.0))
-        ratio = target_w / p_img.width
-        p_res = p_img.resize((target_w, int(p_img.height * ratio)), Image.Resampling.LANCZOS)
-        
-        cw, ch = p_res.size
-        pos_y = 580 + ((750 - ch) // 2) + lev
-        frame.paste(p_res, ((1080-cw)//2, pos_y), p_res)
-        
-        if progress > 0.1:
-            # Wrap for perfect scale look
-            lines = textwrap.wrap(name, width=int(22 / design_settings.get("title_scale", 1.0)))
-            y_t = 150 # Balanced top margin
-            for line in lines[:3]:
-                bbox = draw.textbbox((0,0), line, font=title_font)
-                draw.text(((1080-(bbox[2]-bbox[0]))//2, y_t), line, font=title_font, fill=BLUE_DARK)
-                y_t += 55 # Tight proportional line spacing
-        
-        if progress > 0.4:
-            bbox = draw.textbbox((0,0), price_txt, font=price_font)
-            pw = bbox[2]-bbox[0]
-            # V40.6: Centered for smaller text
-            draw.rounded_rectangle([(540-pw//2-30, 1420), (540+pw//2+30, 1550)], radius=65, fill=GREEN_BIT)
-            draw.text((540-pw//2, 1455), price_txt, font=price_font, fill=WHITE)
-
-        frame.save(os.path.join(temp_dir, f"frame_{i:04d}.jpg"), "JPEG")
+    engine = ReelFrameEngine(get_base_bg(), p_img, name, price_txt, title_font, price_font, design_settings)
+    if render_mode == "jpeg":
+        return _encode_frames_jpeg((engine.render_frame(i) for i in range(TOTAL_FRAMES)), output_path)
 
-    try:
-        subprocess.run(['ffmpeg', '-y', '-framerate', '30', '-i', os.path.join(temp_dir, 'frame_%04d.jpg'), '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '18', output_path], check=True)
-        for f in os.listdir(temp_dir): os.remove(os.path.join(temp_dir, f))
-        os.rmdir(temp_dir)
-        return output_path
-    except: return None
+    workers = get_reel_workers(workers)
+    if workers > 1:
+        frames = _render_frames_parallel(engine, workers)
+    else:
+        frames = (engine.render_frame(i) for i in range(TOTAL_FRAMES))
+    return _encode_frames_pipe(frames, output_path)
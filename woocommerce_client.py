@@ -1,9 +1,16 @@
 from woocommerce import API
 import os
+import re
+import time
+import random
 import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from security import sanitize_search_query, validate_product_id
+from product_record import ProductRecord
 
 load_dotenv()
 
@@ -15,9 +22,137 @@ wcapi = API(
     consumer_key=os.getenv("WOOCOMMERCE_CONSUMER_KEY"),
     consumer_secret=os.getenv("WOOCOMMERCE_CONSUMER_SECRET"),
     version="wc/v3",
-    timeout=30
+    timeout=int(os.getenv("WOOCOMMERCE_TIMEOUT", "30"))
 )
 
+# --- Client layer: retries, pagination, field selection, timings ---
+MAX_RETRIES = int(os.getenv("WOOCOMMERCE_MAX_RETRIES", "4"))
+PAGE_CONCURRENCY = int(os.getenv("WOOCOMMERCE_PAGE_CONCURRENCY", "4"))
+RETRY_STATUS = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 1.0   # segundos
+BACKOFF_MAX = 30.0
+MAX_PER_PAGE = 100   # Máximo permitido por WC
+
+# Only the fields the agent uses (smaller responses; _fields is honored by the WP REST API).
+# Listings skip the HTML description: ProductRecord loads it lazily when something needs it.
+PRODUCT_FIELDS = ",".join([
+    "id", "name", "status", "price", "regular_price", "sale_price", "description",
+    "short_description", "categories", "images", "permalink", "stock_status",
+    "date_created", "date_modified_gmt",
+])
+LIST_FIELDS = ",".join([
+    "id", "name", "price", "regular_price", "sale_price", "short_description",
+    "categories", "images", "permalink", "stock_status",
+])
+CATEGORY_FIELDS = "id,name,slug,count"
+
+_call_stats = {}  # endpoint -> {"calls", "errors", "retries", "total_ms", "max_ms"}
+_stats_lock = threading.Lock()
+
+
+def _stats_key(endpoint):
+    return re.sub(r"/\d+", "/{id}", endpoint)
+
+
+def _record_call(endpoint, elapsed_ms, retries, ok):
+    with _stats_lock:
+        st = _call_stats.setdefault(_stats_key(endpoint), {"calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0})
+        st["calls"] += 1
+        st["retries"] += retries
+        st["errors"] += 0 if ok else 1
+        st["total_ms"] += elapsed_ms
+        st["max_ms"] = max(st["max_ms"], elapsed_ms)
+
+
+def get_call_stats():
+    """Tiempos por endpoint desde que arrancó el proceso (incluye reintentos)."""
+    with _stats_lock:
+        return {k: dict(v, avg_ms=v["total_ms"] / v["calls"]) for k, v in _call_stats.items()}
+
+
+def _backoff_delay(attempt, response):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    # Exponential backoff with jitter (so concurrent pages don't retry in lockstep)
+    cap = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(cap / 2, cap)
+
+
+def _request(endpoint, params=None):
+    """
+    GET con reintentos ante 429/5xx y errores de conexión (backoff exponencial con jitter,
+    respeta Retry-After). Returns la última respuesta; relanza el error de red si se agotan.
+    """
+    attempt = 0
+    started = time.perf_counter()
+    while True:
+        try:
+            response, error = wcapi.get(endpoint, params=params), None
+        except requests.RequestException as e:
+            response, error = None, e
+        status = response.status_code if response is not None else None
+        if (error is None and status not in RETRY_STATUS) or attempt >= MAX_RETRIES:
+            break
+        delay = _backoff_delay(attempt, response)
+        logger.warning(f"[WooCommerce] GET {endpoint} → {status or error}; reintento {attempt + 1}/{MAX_RETRIES} en {delay:.1f}s")
+        time.sleep(delay)
+        attempt += 1
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _record_call(endpoint, elapsed_ms, attempt, status == 200)
+    page = f" p{params['page']}" if params and "page" in params else ""
+    logger.info(f"[WooCommerce] GET {endpoint}{page} → {status or 'error'} en {elapsed_ms:.0f}ms"
+                + (f" ({attempt} reintentos)" if attempt else ""))
+    if error is not None:
+        raise error
+    return response
+
+
+def _get_page(endpoint, params, page):
+    response = _request(endpoint, {**params, "page": page})
+    if response.status_code != 200:
+        raise RuntimeError(f"WooCommerce API Error en {endpoint} (página {page}): {response.status_code} {response.text[:200]}")
+    items = response.json()
+    if not isinstance(items, list):
+        raise RuntimeError(f"{endpoint}: respuesta inesperada (no es lista): {type(items)}")
+    return items, int(response.headers.get("X-WP-TotalPages") or 1)
+
+
+def iter_pages(endpoint, params, limit=None, concurrency=PAGE_CONCURRENCY):
+    """
+    Generador de todos los items de un listado paginado, en orden.
+    La primera página dice cuántas hay (X-WP-TotalPages); el resto se pide en paralelo con un
+    pool acotado. Con `limit` solo se piden las páginas necesarias. Lanza RuntimeError si falla
+    una página (después de los reintentos).
+    """
+    per_page = min(limit, MAX_PER_PAGE) if limit else MAX_PER_PAGE
+    params = {**params, "per_page": per_page}
+    remaining = limit if limit else float("inf")
+
+    items, total_pages = _get_page(endpoint, params, 1)
+    for item in items[:remaining] if limit else items:
+        yield item
+    remaining -= len(items)
+    if limit:
+        total_pages = min(total_pages, -(-limit // per_page))
+    if total_pages <= 1 or remaining <= 0:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, total_pages - 1)), thread_name_prefix="wc-page") as pool:
+        futures = [pool.submit(_get_page, endpoint, params, page) for page in range(2, total_pages + 1)]
+        try:
+            for future in futures:
+                items, _ = future.result()
+                for item in items[:remaining] if limit else items:
+                    yield item
+                remaining -= len(items)
+                if remaining <= 0:
+                    return
+        finally:
+            for future in futures:
+                future.cancel()
+
 def get_recent_products(days=7, limit=10):
     """
     Fetch recently added products from WooCommerce.
@@ -33,41 +168,22 @@ def get_recent_products(days=7, limit=10):
         # Calculate date threshold
         date_threshold = (datetime.now() - timedelta(days=days)).isoformat()
         
-        # Fetch products
-        response = wcapi.get("products", params={
-            "after": date_threshold,
-            "per_page": limit,
-            "orderby": "date",
-            "order": "desc",
-            "status": "publish",
-            "stock_status": "instock"
-        })
-        
-        if response.status_code != 200:
-            print(f"WooCommerce API Error: {response.status_code}")
-            print(f"Response: {response.text}")
+        # Fetch products (all pages up to `limit`)
+        try:
+            products = list(iter_pages("products", {
+                "after": date_threshold,
+                "orderby": "date",
+                "order": "desc",
+                "status": "publish",
+                "stock_status": "instock",
+                "_fields": LIST_FIELDS
+            }, limit=limit))
+        except RuntimeError as api_err:
+            print(api_err)
             return []
         
-        products = response.json()
-        
         # Extract relevant information
-        product_list = []
-        for product in products:
-            product_data = {
-                "id": product.get("id"),
-                "name": product.get("name"),
-                "price": product.get("price"),
-                "regular_price": product.get("regular_price"),
-                "sale_price": product.get("sale_price"),
-                "description": product.get("description", ""),
-                "short_description": product.get("short_description", ""),
-                "categories": [cat["name"] for cat in product.get("categories", [])],
-                "images": [img["src"] for img in product.get("images", [])],
-                "permalink": product.get("permalink"),
-                "stock_status": product.get("stock_status"),
-                "date_created": product.get("date_created")
-            }
-            product_list.append(product_data)
+        product_list = [ProductRecord.from_api(product).to_dict() for product in products]
         
         print(f"[OK] Fetched {len(product_list)} products from WooCommerce")
         return product_list
@@ -88,41 +204,21 @@ def search_products(query, limit=20):
         return []
 
     try:
-        response = wcapi.get("products", params={
-            "search": safe_query,
-            "per_page": min(limit, 100),  # Limitar máximo permitido por WC
-            "status": "publish",
-            "stock_status": "instock"
-        })
-        
-        if response.status_code != 200:
-            logger.error(f"WooCommerce API Error en search_products: {response.status_code}")
-            return []
-        
         try:
-            products = response.json()
-        except Exception as json_err:
-            logger.error(f"search_products: respuesta JSON malformada: {json_err}")
+            products = list(iter_pages("products", {
+                "search": safe_query,
+                "status": "publish",
+                "stock_status": "instock",
+                "_fields": LIST_FIELDS
+            }, limit=limit))
+        except RuntimeError as api_err:
+            logger.error(f"search_products: {api_err}")
             return []
-
-        if not isinstance(products, list):
-            logger.warning(f"search_products: respuesta inesperada (no es lista): {type(products)}")
+        except ValueError as json_err:
+            logger.error(f"search_products: respuesta JSON malformada: {json_err}")
             return []
 
-        product_list = []
-        for product in products:
-            product_data = {
-                "id": product.get("id"),
-                "name": product.get("name"),
-                "price": product.get("price"),
-                "description": product.get("description", ""),
-                "short_description": product.get("short_description", ""),
-                "categories": [cat["name"] for cat in product.get("categories", []) if isinstance(cat, dict)],
-                "images": [img["src"] for img in product.get("images", []) if isinstance(img, dict) and img.get("src")],
-                "permalink": product.get("permalink"),
-                "stock_status": product.get("stock_status")
-            }
-            product_list.append(product_data)
+        product_list = [ProductRecord.from_api(product).to_dict() for product in products]
         
         logger.info(f"search_products: '{safe_query}' → {len(product_list)} productos")
         return product_list
@@ -138,16 +234,14 @@ def get_categories(limit=100):
         List of category dicts with id, name, slug, count
     """
     try:
-        response = wcapi.get("products/categories", params={
-            "per_page": limit,
-            "hide_empty": True
-        })
-        
-        if response.status_code != 200:
-            print(f"WooCommerce Categories API Error: {response.status_code}")
+        try:
+            categories = list(iter_pages("products/categories", {
+                "hide_empty": True,
+                "_fields": CATEGORY_FIELDS
+            }, limit=limit))
+        except RuntimeError as api_err:
+            print(f"WooCommerce Categories API Error: {api_err}")
             return []
-        
-        categories = response.json()
         cat_list = []
         for cat in categories:
             cat_list.append({
@@ -175,32 +269,17 @@ def get_products_by_category(category_id, limit=50):
         List of product dictionaries
     """
     try:
-        response = wcapi.get("products", params={
-            "category": category_id,
-            "per_page": limit,
-            "status": "publish",
-            "stock_status": "instock"
-        })
-        
-        if response.status_code != 200:
-            print(f"WooCommerce API Error: {response.status_code}")
+        try:
+            products = list(iter_pages("products", {
+                "category": category_id,
+                "status": "publish",
+                "stock_status": "instock",
+                "_fields": LIST_FIELDS
+            }, limit=limit))
+        except RuntimeError as api_err:
+            print(api_err)
             return []
-        
-        products = response.json()
-        product_list = []
-        for product in products:
-            product_data = {
-                "id": product.get("id"),
-                "name": product.get("name"),
-                "price": product.get("price"),
-                "description": product.get("description", ""),
-                "short_description": product.get("short_description", ""),
-                "categories": [cat["name"] for cat in product.get("categories", [])],
-                "images": [img["src"] for img in product.get("images", [])],
-                "permalink": product.get("permalink"),
-                "stock_status": product.get("stock_status")
-            }
-            product_list.append(product_data)
+        product_list = [ProductRecord.from_api(product).to_dict() for product in products]
         
         print(f"[OK] Category {category_id}: found {len(product_list)} products")
         return product_list
@@ -220,7 +299,7 @@ def get_product_by_id(product_id):
         return None
 
     try:
-        response = wcapi.get(f"products/{safe_id}")
+        response = _request(f"products/{safe_id}", {"_fields": PRODUCT_FIELDS})
         
         if response.status_code != 200:
             logger.error(f"WooCommerce API Error en get_product_by_id({safe_id}): {response.status_code}")
@@ -236,24 +315,30 @@ def get_product_by_id(product_id):
             logger.warning(f"get_product_by_id: respuesta inesperada para ID {safe_id}")
             return None
         
-        return {
-            "id": product.get("id"),
-            "name": product.get("name"),
-            "price": product.get("price"),
-            "regular_price": product.get("regular_price"),
-            "sale_price": product.get("sale_price"),
-            "description": product.get("description", ""),
-            "short_description": product.get("short_description", ""),
-            "categories": [cat["name"] for cat in product.get("categories", []) if isinstance(cat, dict)],
-            "images": [img["src"] for img in product.get("images", []) if isinstance(img, dict) and img.get("src")],
-            "permalink": product.get("permalink"),
-            "stock_status": product.get("stock_status")
-        }
+        return ProductRecord.from_api(product).to_dict(include_description=True)
         
     except Exception as e:
         logger.error(f"Error en get_product_by_id({safe_id}): {e}")
         return None
 
+def iter_all_products(modified_after=None, status="any"):
+    """
+    Recorre TODAS las páginas de productos (cualquier estado, con o sin stock), opcionalmente
+    solo los modificados después de `modified_after` (ISO, GMT). Lo usa product_catalog.
+    status="any" no incluye la papelera: para esos, status="trash".
+    Lanza RuntimeError si una página falla, para no dar por buena una sync incompleta.
+    """
+    params = {
+        "status": status,
+        "orderby": "id",
+        "order": "asc",
+        "dates_are_gmt": "true",
+        "_fields": PRODUCT_FIELDS,
+    }
+    if modified_after:
+        params["modified_after"] = modified_after
+    yield from iter_pages("products", params)
+
 if __name__ == "__main__":
     # Test the WooCommerce connection
     print("Testing WooCommerce API connection...")